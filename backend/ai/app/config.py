@@ -9,6 +9,15 @@ class Settings(BaseSettings):
 
 	# Whisper
 	WHISPER_MODE: str = Field("api", description="api|local")
+	# Local faster-whisper engine (WHISPER_MODE=local)
+	WHISPER_LOCAL_MODEL: str = "base"
+	WHISPER_DEVICE: str = "cpu"
+	WHISPER_COMPUTE_TYPE: str = "int8"
+	WHISPER_POOL_SIZE: int = 0  # model instances; 0 = cores // cpu_threads
+	WHISPER_CPU_THREADS: int = 0  # threads per instance; 0 = cores // pool size
+	WHISPER_NUM_WORKERS: int = 1
+	WHISPER_BATCH_SIZE: int = 0  # >0 wraps instances in BatchedInferencePipeline
+	WHISPER_PRELOAD: bool = False  # load local models at startup instead of first request
 	OPENAI_API_KEY: str | None = None  # used for Whisper API and OpenAI LLM
 
 	# LLMs
@@ -18,12 +27,142 @@ class Settings(BaseSettings):
 	# Map to the real Groq model id you want to use (maverick variant)
 	GROQ_MODEL: str = "meta-llama/llama-4-maverick-17b-128e-instruct"
 
+	# Compiled form schemas (validator, prompt headers, heuristic tables) kept in an LRU
+	SCHEMA_CACHE_MAX_ENTRIES: int = 128
+	SCHEMA_REGISTRY_PATH: str | None = None  # SQLite file for registered schemas, e.g. "cache/schemas.sqlite3"
+
+	# Upload ingestion: streamed in blocks into a per-request scratch directory that is
+	# removed when the request (and any run sharing it) finishes
+	UPLOAD_SCRATCH_DIR: str | None = None  # default: <system temp>/tattara-uploads
+	UPLOAD_SCRATCH_STALE_SECONDS: int = 3600  # purge leftovers of dead processes at start-up
+	UPLOAD_IN_MEMORY_MAX_MB: int = 8  # smaller uploads skip the scratch file and go to providers from memory
+	MAX_AUDIO_UPLOAD_MB: int = 200
+	MAX_IMAGE_UPLOAD_MB: int = 20  # per image
+	MAX_IMAGE_UPLOAD_TOTAL_MB: int = 100  # all images in one request
+
+	# In-flight coalescing of duplicate /process/* requests (Idempotency-Key header,
+	# else a hash of the form, parameters and uploaded content); results are replayed
+	# for the retention window
+	COALESCE_ENABLED: bool = True
+	COALESCE_BY_CONTENT: bool = True  # without an Idempotency-Key, match on the content hash
+	COALESCE_RETENTION_SECONDS: int = 600
+	COALESCE_MAX_ENTRIES: int = 512
+
+	# Bulk /process/bulk: many independent documents for one schema
+	BULK_MAX_ITEMS: int = 500
+	BULK_CONCURRENCY: int = 8  # documents processed at once per bulk request
+	MAX_BULK_UPLOAD_TOTAL_MB: int = 500  # all files in one /process/bulk/files request
+
+	# Asynchronous jobs (/jobs/*): queued in SQLite, run by background workers
+	JOBS_ENABLED: bool = False
+	# Holds the queue (jobs.sqlite3) and the uploads kept until each job finishes (files/), so both
+	# survive restarts together. None = in-memory queue and <system temp>/tattara-jobs (lost on restart)
+	JOBS_DATA_DIR: str | None = None
+	JOBS_WORKERS: int = 2
+	JOBS_MAX_ATTEMPTS: int = 3
+	JOBS_RETRY_BACKOFF_SECONDS: float = 5.0  # doubled after every failed attempt
+	JOBS_RETENTION_SECONDS: int = 7 * 24 * 3600  # finished jobs and their results are purged after this
+	# Hosts (and their subdomains) callback_url may point at, e.g. ["hooks.example.org"]; empty = any
+	# host resolving to public addresses only (no loopback, private or link-local/metadata ranges)
+	JOBS_CALLBACK_ALLOWED_HOSTS: list[str] = []
+
+	# Deferred extraction through provider batch APIs (/batch/*), billed at batch pricing
+	BATCH_MODE_ENABLED: bool = False
+	BATCH_BACKEND: str = "openai"  # openai (OpenAI/Groq Batch API) | local (in-process stand-in for testing)
+	BATCH_DB_PATH: str | None = None  # e.g. "cache/batches.sqlite3"; required for openai; None = in memory (local only)
+	BATCH_MAX_REQUESTS_PER_FILE: int = 5000
+	BATCH_FLUSH_SECONDS: float = 300.0  # submit a partial batch file once its oldest item waited this long
+	BATCH_POLL_SECONDS: float = 60.0
+	BATCH_COMPLETION_WINDOW: str = "24h"
+	BATCH_PRICE_RATIO: float = 0.5  # batch price / synchronous price
+
+	# Prompt layout: "cache_prefix" sends schema instructions as a stable system-message
+	# prefix with the source text last (enables provider prompt caching); "legacy" keeps
+	# the old single-message prompt.
+	PROMPT_LAYOUT: str = "cache_prefix"
+	PROMPT_CACHE_PRICE_RATIO: float = 0.5  # cached input price / input price when not listed per model
+
+	# Multi-row (/process/*/batch) documents longer than ROW_CHUNK_MAX_CHARS are split on
+	# row boundaries and extracted in concurrent chunks; rows are merged with seam duplicates removed.
+	# Opt-in: it changes the output of those endpoints for long documents
+	ROW_CHUNKING_ENABLED: bool = False
+	ROW_CHUNK_MAX_CHARS: int = 4000
+	ROW_CHUNK_OVERLAP_ROWS: int = 2  # rows repeated at the start of the next chunk
+	ROW_CHUNK_CONCURRENCY: int = 4  # chunks extracted at once per document
+	IMAGE_BATCH_PER_PAGE: bool = False  # /process/image/batch: OCR and extract each page as soon as it is ready
+
+	# Micro-batching of /process/text: concurrent requests for the same schema and model
+	# are held briefly and packed into one completion (schema instructions sent once)
+	MICRO_BATCH_ENABLED: bool = False
+	MICRO_BATCH_WINDOW_MS: int = 20
+	MICRO_BATCH_MAX_ITEMS: int = 8
+
+	# Extraction result cache (keyed by schema, source text, provider, model, prompt version)
+	EXTRACTION_CACHE_ENABLED: bool = True
+	EXTRACTION_CACHE_MAX_ENTRIES: int = 2048
+	EXTRACTION_CACHE_TTL_SECONDS: int = 24 * 3600
+	EXTRACTION_CACHE_DISK_PATH: str | None = None  # e.g. "cache/extraction.sqlite3" to survive restarts
+
 	# Vision/OCR
 	OCR_ENABLED: bool = True
+	VISION_MAX_CONCURRENCY: int = 4  # images OCR'd in parallel per request
+	OCR_CACHE_ENABLED: bool = True  # keyed by SHA-256 of the image bytes
+	OCR_CACHE_MAX_ENTRIES: int = 512
+	OCR_CACHE_TTL_SECONDS: int = 24 * 3600
+	# Pre-processing before upload to the vision model (EXIF rotate, downscale, re-encode)
+	IMAGE_PREPROCESS_ENABLED: bool = True
+	IMAGE_MAX_EDGE_PX: int = 2048  # longest side after downscaling; 0 disables resizing
+	IMAGE_GRAYSCALE: bool = False
+	IMAGE_OUTPUT_FORMAT: str = "jpeg"  # "jpeg" or "webp"
+	IMAGE_JPEG_QUALITY: int = 85
+	IMAGE_WEBP_QUALITY: int = 80
 
 	# Spitch ASR (multilingual)
 	SPITCH_API_KEY: str | None = None
 
+	# Shared upstream HTTP pools (OpenAI, Groq, Spitch); HTTP/2 needs the 'h2' package
+	HTTP_TIMEOUT_SECONDS: float = 120.0
+	HTTP_CONNECT_TIMEOUT_SECONDS: float = 10.0
+	HTTP_MAX_CONNECTIONS: int = 100  # per upstream
+	HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20  # per upstream
+	HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+	HTTP_MAX_RETRIES: int = 2
+	HTTP2_ENABLED: bool = True
+	# Per-provider pacing of LLM and OCR calls, e.g. {"openai": 500, "groq": 30}; unset = unlimited
+	PROVIDER_RPM_LIMITS: dict = {}
+	PROVIDER_MAX_CONCURRENCY: dict = {}
+
+	# ASR executor (Whisper/Spitch calls run off the event loop)
+	ASR_EXECUTOR_WORKERS: int = 4  # raised to the local Whisper pool size when larger
+	ASR_DISCONNECT_POLL_SECONDS: float = 0.5  # how often a pending ASR job checks the client
+
+	# Transcript cache (audio SHA-256 + language -> transcript and Spitch English translation)
+	ASR_CACHE_ENABLED: bool = True
+	ASR_CACHE_MAX_ENTRIES: int = 256
+	ASR_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+	ASR_CACHE_DISK_PATH: str | None = None  # e.g. "cache/transcripts.sqlite3"
+
+	# Long-audio chunking: split on silence, transcribe segments concurrently, stitch
+	AUDIO_CHUNKING_ENABLED: bool = False
+	AUDIO_CHUNK_SECONDS: float = 60.0
+	AUDIO_CHUNK_OVERLAP_SECONDS: float = 1.0
+	AUDIO_CHUNK_MIN_SECONDS: float = 120.0  # only chunk recordings longer than this
+	AUDIO_CHUNK_CONCURRENCY: int = 4  # segments in flight per request
+
+	# Live dictation over WebSocket (/ws/audio)
+	LIVE_AUDIO_ENABLED: bool = True
+	LIVE_AUDIO_SEGMENT_SECONDS: float = 5.0  # audio transcribed per ASR call
+	LIVE_AUDIO_EXTRACT_SECONDS: float = 10.0  # minimum interval between partial extractions
+	LIVE_AUDIO_SILENCE_DBFS: float = -45.0  # segments quieter than this are not transcribed
+	LIVE_AUDIO_MAX_SECONDS: int = 1800  # a session stops taking audio after this much
+	# Audio pre-processing before ASR: 16 kHz mono, VAD silence trim, compact re-encode
+	AUDIO_PREPROCESS_ENABLED: bool = True  # needs 'av' and 'numpy'; otherwise the upload is sent as-is
+	AUDIO_OUTPUT_FORMAT: str = "flac"  # wav|flac|ogg|mp3
+	AUDIO_TRIM_SILENCE: bool = True
+	AUDIO_SILENCE_THRESHOLD_DB: float = -35.0  # frames this far below the loudest frame are silence
+	AUDIO_MAX_SILENCE_SECONDS: float = 1.0  # longer internal pauses are shortened to this
+	AUDIO_SILENCE_PADDING_SECONDS: float = 0.2  # kept around speech
+
 	# Spitch & Whisper pricing
 	SPITCH_PRICE_TRANSCRIPTION_PER_SEC: float = 0.00042  # $ per second
 	SPITCH_PRICE_TRANSLATION_PER_10K_WORDS: float = 1.0   # $ per 10,000 words
@@ -36,13 +175,14 @@ class Settings(BaseSettings):
 	PRICE_GROQ_PER_1K_INPUT: float = 0.00011
 	PRICE_GROQ_PER_1K_OUTPUT: float = 0.00034
 
-	# Per-model pricing (per 1K tokens): input and output
+	# Per-model pricing (per 1K tokens): input, output and optional cached_input
+	# (prompt-cache hits); without cached_input, input * PROMPT_CACHE_PRICE_RATIO is used.
 	# Keys are normalized model identifiers used by the router/providers.
 	MODEL_PRICING: dict = {
 		# OpenAI models
-		"gpt-4o": {"input": 0.0025, "output": 0.01},
-		"gpt-4o-mini": {"input": 0.00015, "output": 0.0006},
-		"gpt-5": {"input": 0.00125, "output": 0.001},
+		"gpt-4o": {"input": 0.0025, "cached_input": 0.00125, "output": 0.01},
+		"gpt-4o-mini": {"input": 0.00015, "cached_input": 0.000075, "output": 0.0006},
+		"gpt-5": {"input": 0.00125, "cached_input": 0.000125, "output": 0.001},
 		# Groq-hosted models
 		"meta-llama/llama-4-maverick-17b-128e-instruct": {"input": 0.0002, "output": 0.0006},
 		"meta-llama/llama-4-scout-17b-16e-instruct": {"input": 0.00011, "output": 0.00034},
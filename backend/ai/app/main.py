@@ -1,7 +1,11 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query
-import json, re, unicodedata
-from typing import Optional, List, Dict, Any
-import tempfile
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+import json
+from typing import Optional, List, Dict, Any, Tuple, Callable, Awaitable, Union
+import asyncio
+import functools
+import shutil
+import uuid
+from enum import Enum
 from .config import settings
 from .models import (
     TextRequest,
@@ -10,22 +14,56 @@ from .models import (
     ExtractionMetrics,
     ModelPreference,
     LanguagePreference,
+    StreamFormat,
     MultiRowExtractionResponse,
     ExtractedRow,
+    SchemaRegistration,
+    RegisteredSchemaInfo,
+    BulkTextRequest,
+    BulkItemResult,
+    BulkResponse,
+    JobInfo,
+    DeferredItem,
+    DeferredSubmission,
 )
 from .services.whisper_service import WhisperService
 from .services.spitch_service import SpitchService
+from .services.asr_executor import ASRExecutor, ASRCancelled
+from .services.audio_chunking import (
+    AudioChunk,
+    chunk_samples,
+    chunking_available,
+    encode_wav,
+    plan_chunks,
+    prepare_audio,
+    stitch_transcripts,
+)
+from .services.cache import TieredCache, file_sha256, make_cache_key
+from .services import http_clients
+from .services.coalescer import DisconnectCheck, IdempotencyConflict, RequestCoalescer
+from .services.uploads import ScratchArea, ScratchSession, StoredUpload, UploadTooLarge
 from .services.translation_service import TranslationService
 from .services.vision_service import VisionService
 from .services.extraction_router import ExtractionRouter
-from .services.validator import SchemaValidator
+from .services.metrics import estimate_tokens, timer
+from .services.utils import safe_json_parse
+from .services.rate_limit import provider_limiter
+from .services.micro_batcher import MicroBatcher
+from .services.live_audio import ENCODINGS as LIVE_AUDIO_ENCODINGS, LiveAudioBuffer, live_audio_available
+from .services.row_chunking import SeamMerger, merge_chunk_rows, merge_page_rows, split_rows
+from .services.row_stream import row_sink
+from .services.batch_api import BatchItem, BatchStore, DeferredExtractor, LocalBatchBackend, OpenAIBatchBackend
+from .services.jobs import (
+    Job, JobError, JobRunner, JobStore, check_callback_url, job_db_path, job_files_root, report_stage,
+)
+from .services.schema_compiler import CompiledSchema, compile_schema, compiled_schema_stats
+from .services.schema_registry import RegisteredSchema, SchemaRegistry, SchemaNotFound, SchemaConflict
 from .services.providers.openai_provider import OpenAIProvider
 import warnings
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .utils.schema import ensure_demo_schema, BadFormSchema
-from datetime import datetime
-from .utils.prompting import build_extraction_header, build_multi_row_extraction_header
+from .utils.schema import BadFormSchema
+from .utils.heuristics import heuristic_extract_from_text, generic_heuristic_extract
 
 # Suppress pkg_resources deprecation warning emitted by some dependencies (ctranslate2)
 warnings.filterwarnings(
@@ -52,6 +90,30 @@ app.add_middleware(
 )
 
 
+_MB = 1 << 20
+
+
+def _body_limit(path: str) -> Optional[int]:
+    # Multipart bodies also carry the form fields; allow 1 MiB on top of the files
+    if path.startswith(("/process/audio", "/jobs/audio")):
+        return (settings.MAX_AUDIO_UPLOAD_MB + 1) * _MB
+    if path.startswith(("/process/image", "/jobs/image")):
+        return (settings.MAX_IMAGE_UPLOAD_TOTAL_MB + 1) * _MB
+    if path.startswith("/process/bulk/files"):
+        return (settings.MAX_BULK_UPLOAD_TOTAL_MB + 1) * _MB
+    return None
+
+
+@app.middleware("http")
+async def _reject_oversized_uploads(request: Request, call_next):
+    """Refuse declared-oversize uploads before the multipart body is spooled."""
+    limit = _body_limit(request.url.path)
+    length = request.headers.get("content-length")
+    if limit is not None and length and length.isdigit() and int(length) > limit:
+        return JSONResponse(status_code=413, content={"detail": f"Request body exceeds {limit // _MB} MiB"})
+    return await call_next(request)
+
+
 # Redirect root to Swagger UI
 @app.get("/", include_in_schema=False)
 def index():
@@ -73,10 +135,86 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics/asr", tags=["Utility"])
+def asr_metrics():
+    """ASR executor queue depth and job counters, plus local Whisper pool usage."""
+    stats: Dict[str, Any] = asr_executor.stats()
+    pool = whisper_service.stats()
+    if pool is not None:
+        stats["whisper_pool"] = pool
+    return stats
+
+
+@app.get("/metrics/cache", tags=["Utility"])
+def cache_metrics():
+    """Entry counts and hit/miss counters for the result caches."""
+    return {
+        "extraction": router.cache.stats() if router.cache else None,
+        "ocr": vision_service.cache.stats() if vision_service.cache else None,
+        "transcript": transcript_cache.stats() if transcript_cache else None,
+        "compiled_schemas": compiled_schema_stats(),
+        "schema_registry": schema_registry.stats(),
+        "coalescer": coalescer.stats() if coalescer else None,
+    }
+
+
+@app.get("/metrics/jobs", tags=["Utility"])
+def job_metrics():
+    """Asynchronous jobs by status."""
+    return job_store.stats() if job_store is not None else {}
+
+
+@app.get("/metrics/batch", tags=["Utility"])
+def batch_metrics():
+    """Deferred (batch API) items and batches by status."""
+    if deferred_extractor is None:
+        return {}
+    return {**deferred_extractor.store.stats(), "last_error": deferred_extractor.last_error}
+
+
+@app.get("/metrics/http", tags=["Utility"])
+def http_metrics():
+    """Shared upstream HTTP connection pools, HTTP/2 use, per-provider rate limiting and micro-batching."""
+    return {
+        **http_clients.pool_stats(),
+        "rate_limits": provider_limiter.stats(),
+        "micro_batch": micro_batcher.stats() if micro_batcher else None,
+    }
+
+
 whisper_service = WhisperService()
+asr_executor = ASRExecutor(
+    # enough threads to keep every local Whisper instance busy
+    max_workers=max(settings.ASR_EXECUTOR_WORKERS, (whisper_service.stats() or {}).get("size", 0)),
+    poll_interval=settings.ASR_DISCONNECT_POLL_SECONDS,
+)
+transcript_cache: Optional[TieredCache] = (
+    TieredCache.build(
+        max_entries=settings.ASR_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.ASR_CACHE_TTL_SECONDS,
+        disk_path=settings.ASR_CACHE_DISK_PATH,
+    )
+    if settings.ASR_CACHE_ENABLED
+    else None
+)
 vision_service = VisionService()
 router = ExtractionRouter()
+micro_batcher: Optional[MicroBatcher] = (
+    MicroBatcher(router, settings.MICRO_BATCH_WINDOW_MS, settings.MICRO_BATCH_MAX_ITEMS)
+    if settings.MICRO_BATCH_ENABLED
+    else None
+)
+schema_registry = SchemaRegistry(settings.SCHEMA_REGISTRY_PATH)
 translator = TranslationService(router)
+upload_scratch = ScratchArea(settings.UPLOAD_SCRATCH_DIR, settings.UPLOAD_SCRATCH_STALE_SECONDS)
+coalescer: Optional[RequestCoalescer] = (
+    RequestCoalescer(
+        retention_seconds=settings.COALESCE_RETENTION_SECONDS,
+        max_entries=settings.COALESCE_MAX_ENTRIES,
+    )
+    if settings.COALESCE_ENABLED
+    else None
+)
 
 # provider instances for image forwarding (uses settings values)
 default_openai_provider = OpenAIProvider(
@@ -84,675 +222,943 @@ default_openai_provider = OpenAIProvider(
 )
 
 
-@app.post(
-    "/process/text",
-    response_model=ExtractionResponse,
-    response_model_exclude_none=True,
-    tags=["AI"],
-)
-async def process_text(
-    req: TextRequest, model_preference: Optional[ModelPreference] = Query(None)
+async def _extract(
+    provider_name: str,
+    form_schema: Dict[str, Any],
+    text_blob: str,
+    ocr_blocks: Optional[List[dict]] = None,
+    locale: Optional[str] = None,
+    model_override: Optional[str] = None,
+    header: Optional[str] = None,
+    batch_key: Optional[str] = None,
 ):
+    """Await the router's LLM extraction, mapping provider failures to HTTP 502.
+
+    With `batch_key` (the compiled schema hash) a plain single-object extraction may
+    be packed with concurrent ones by the micro-batcher when it is enabled.
     """
-    Extract Structured Fields from Raw Text
+    report_stage("llm")
+    try:
+        if micro_batcher is not None and batch_key and not (ocr_blocks or locale or header):
+            result = await micro_batcher.extract(provider_name, form_schema, batch_key, text_blob, model_override)
+        else:
+            result = await router.extract(
+                provider_name=provider_name,
+                form_schema=form_schema,
+                text_blob=text_blob,
+                images=None,
+                ocr_blocks=ocr_blocks,
+                locale=locale,
+                model_override=model_override,
+                header=header,
+            )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
+    # Heuristic merge and schema validation follow in the pipelines
+    report_stage("validation")
+    return result
 
-    Overview:
-    - Parses free-form text and maps values to your form schema fields.
-    - Uses LLM plus lightweight heuristics to improve accuracy for common fields.
 
-    Request:
-    - form_id: Identifier of your form/template.
-    - form_schema: JSON object with "fields" (id, type, required).
-    - text: The raw text to analyze.
-    - model_preference: Optional model hint (e.g., "gpt-4o").
+def _rows_from_llm(data: Any) -> List[Dict[str, Any]]:
+    """The row objects of a multi-row LLM response, whatever shape it came back in."""
+    rows_data: List[Dict[str, Any]] = []
+    if isinstance(data, dict):
+        # Check for "rows" key (expected format)
+        if "rows" in data and isinstance(data["rows"], list):
+            rows_data = data["rows"]
+        # Check for "extracted" that might be a list
+        elif "extracted" in data and isinstance(data["extracted"], list):
+            rows_data = data["extracted"]
+        # If it's a single extraction (no rows detected), wrap it as a single-row response
+        elif "extracted" in data and isinstance(data["extracted"], dict):
+            rows_data = [data["extracted"]]
+        # If data itself looks like a single row dict (not wrapped)
+        elif not any(k in data for k in ["rows", "extracted", "total_rows"]):
+            rows_data = [data]
+    elif isinstance(data, list):
+        rows_data = data
+    return rows_data
 
-    Demo Form:
 
-        {
-            "form_id": "demo_form1",
-            "form_schema": {
-                "fields": [
-                { "id": "patientName", "type": "text", "required": true },
-                { "id": "patientAge", "type": "number", "required": true },
-                { "id": "patientGender", "type": "select", "required": true },
-                { "id": "symptomsDate", "type": "date", "required": true },
-                { "id": "reportedSymptoms", "type": "multiselect", "required": false },
-                { "id": "testResult", "type": "select", "required": true },
-                { "id": "treatmentProvided", "type": "select", "required": false },
-                { "id": "healthWorkerId", "type": "text", "required": true },
-                { "id": "location", "type": "text", "required": true },
-                { "id": "followUpRequired", "type": "boolean", "required": false },
-                { "id": "notes", "type": "textarea", "required": false }
-                ]
-            },
-            "text": "The patient name is Janet Yakubu. She is a 29-year-old trader, who was seen at Ketu Clinic, Lagos on 2025-09-21 with fever, headache, and cough; the rapid test result was Positive, treatment provided included paracetamol and rest, attended by health worker ID HW-9321; follow-up is required; notes: patient stable and asked to return in 3 days.",
-            "provider_preference": null,
-            "model_preference": null
-        }
+async def _extract_rows(
+    provider_name: str,
+    compiled: CompiledSchema,
+    text_blob: str,
+    ocr_blocks: Optional[List[dict]] = None,
+    locale: Optional[str] = None,
+    model_override: Optional[str] = None,
+):
+    """Multi-row extraction of `text_blob`, chunked on row boundaries when it is long.
+
+    Short documents take a single _extract call with the multi-row header. Longer
+    ones (over ROW_CHUNK_MAX_CHARS) are split by split_rows, the chunks are
+    extracted concurrently and their rows merged in order with seam duplicates
+    removed, so wall-clock time follows the chunk size rather than the register
+    length and no single completion has to hold every row. Returns the _extract
+    tuple with data {"rows": [...]}; usage and cost are summed over the chunks,
+    llm_ms is the wall-clock time and info["row_chunks"] the number of chunks.
+    """
+    chunks = (
+        split_rows(
+            text_blob or "", settings.ROW_CHUNK_MAX_CHARS, settings.ROW_CHUNK_OVERLAP_ROWS, compiled.alias_map
+        )
+        if settings.ROW_CHUNKING_ENABLED
+        else [text_blob]
+    )
+    sink = row_sink.get()
+    if sink is not None:
+        return await _stream_rows(provider_name, compiled, chunks, sink, ocr_blocks, locale, model_override)
+    if len(chunks) == 1:
+        return await _extract(
+            provider_name=provider_name,
+            form_schema=compiled.schema,
+            text_blob=text_blob,
+            header=compiled.multi_row_header,
+            ocr_blocks=ocr_blocks,
+            locale=locale,
+            model_override=model_override,
+        )
+
+    sem = asyncio.Semaphore(max(settings.ROW_CHUNK_CONCURRENCY, 1))
+
+    async def _chunk(chunk: str):
+        async with sem:
+            return await _extract(
+                provider_name=provider_name,
+                form_schema=compiled.schema,
+                text_blob=chunk,
+                header=compiled.multi_row_header,
+                ocr_blocks=ocr_blocks,
+                locale=locale,
+                model_override=model_override,
+            )
 
+    with timer() as t_wall:
+        results = await asyncio.gather(*(_chunk(c) for c in chunks))
+    rows = merge_chunk_rows(
+        [_rows_from_llm(r[0]) for r in results], compiled.field_ids, settings.ROW_CHUNK_OVERLAP_ROWS + 1
+    )
+    confidence: Dict[str, float] = {}
+    for r in results:
+        confidence.update(r[1])
+    info = {
+        "cache_hit": all(r[7].get("cache_hit") for r in results),
+        "cached_tokens": sum(r[7].get("cached_tokens") or 0 for r in results),
+        "row_chunks": len(chunks),
+    }
+    return (
+        {"rows": rows},
+        confidence,
+        t_wall(),
+        sum(r[3] for r in results),
+        sum(r[4] for r in results),
+        sum(r[5] for r in results),
+        results[0][6],
+        info,
+    )
 
-    Process:
-    1. Validate schema.
-    2. Run extraction with the configured model.
-    3. Apply heuristics for:
-       - patientName, patientAge, patientGender, symptomsDate
-       - reportedSymptoms, testResult, treatmentProvided
-       - healthWorkerId, location, followUpRequired, notes
 
-    Returns:
-    - extracted: Dict of field_id -> value
-    - missing_required: List of missing required fields
-    - metrics: Timing/cost/model metadata
+async def _stream_rows(
+    provider_name: str,
+    compiled: CompiledSchema,
+    chunks: List[str],
+    sink: Callable[[Dict[str, Any]], None],
+    ocr_blocks: Optional[List[dict]] = None,
+    locale: Optional[str] = None,
+    model_override: Optional[str] = None,
+):
+    """Streaming form of _extract_rows: each row goes to `sink` as soon as the model closes it.
 
-    Error Handling:
-    - 400 for invalid schema
-    - 502 for provider errors
+    Chunks stream concurrently, but a chunk's rows are held back until the chunks
+    before it are finished so rows reach `sink` in document order with seam
+    duplicates already folded. Returns the same tuple as _extract_rows.
     """
-    need_vision = False
-    # Prefer an explicit query-selection over the body value when provided
-    preferred = model_preference or req.model_preference
-    _pick = router.pick(preferred, need_vision)
-    if isinstance(_pick, tuple):
-        provider_name, model_override = _pick
-    else:
-        provider_name = _pick
-        model_override = None
+    report_stage("llm")
+    queues: List[asyncio.Queue] = [asyncio.Queue() for _ in chunks]
+    sem = asyncio.Semaphore(max(settings.ROW_CHUNK_CONCURRENCY, 1))
+
+    async def _chunk(i: int):
+        async with sem:
+            return await router.extract_stream(
+                provider_name,
+                compiled.schema,
+                chunks[i],
+                queues[i].put_nowait,
+                # OCR blocks describe the whole document, so they are not sent with chunks
+                ocr_blocks=ocr_blocks,
+                locale=locale,
+                model_override=model_override,
+                header=compiled.multi_row_header,
+            )
 
-    # Coerce/validate form_schema to the demo_form1 shape
-    try:
-        schema = ensure_demo_schema(req.form_schema)
-    except BadFormSchema as e:
-        raise HTTPException(status_code=422, detail=str(e))
+    merger = SeamMerger(compiled.field_ids, settings.ROW_CHUNK_OVERLAP_ROWS + 1)
+    results = []
+    with timer() as t_wall:
+        tasks = [asyncio.ensure_future(_chunk(i)) for i in range(len(chunks))]
+        for task, queue in zip(tasks, queues):
+            task.add_done_callback(lambda t, q=queue: q.put_nowait(None))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            for task, queue in zip(tasks, queues):
+                merger.next_chunk()
+                streamed = False
+                while (row := await queue.get()) is not None:
+                    streamed = True
+                    if merger.add(row):
+                        sink(row)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
+                if not streamed:
+                    # Not a streamed rows array (cache hit or another answer shape)
+                    for row in _rows_from_llm(result[0]):
+                        if isinstance(row, dict) and merger.add(row):
+                            sink(row)
+                results.append(result)
+        finally:
+            for task in tasks:
+                task.cancel()
+        wall_ms = t_wall()
+    report_stage("validation")
+
+    confidence: Dict[str, float] = {}
+    for r in results:
+        confidence.update(r[1])
+    info = {
+        "cache_hit": all(r[7].get("cache_hit") for r in results),
+        "cached_tokens": sum(r[7].get("cached_tokens") or 0 for r in results),
+        "row_chunks": len(chunks) if len(chunks) > 1 else None,
+    }
+    return (
+        {"rows": merger.rows},
+        confidence,
+        wall_ms,
+        sum(r[3] for r in results),
+        sum(r[4] for r in results),
+        sum(r[5] for r in results),
+        results[0][6],
+        info,
+    )
 
-    try:
-        data, confidence, llm_ms, tokens_in, tokens_out, cost, model = router.extract(
-            provider_name=provider_name,
-            form_schema=schema,
-            text_blob=req.text,
-            images=None,
-            ocr_blocks=None,
-            locale=None,
-            model_override=model_override,
-        )
-    except TypeError as e:
-        # Running process may have an older in-memory ExtractionRouter.extract that
-        # doesn't accept model_override (dev reloader inconsistencies). Retry without
-        # the kwarg to preserve service availability during reloads.
-        if "model_override" in str(e):
-            data, confidence, llm_ms, tokens_in, tokens_out, cost, model = (
-                router.extract(
-                    provider_name=provider_name,
-                    form_schema=schema,
-                    text_blob=req.text,
-                    images=None,
-                    ocr_blocks=None,
-                    locale=None,
-                )
-            )
-        else:
-            raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
 
-    # Heuristic fallback/merge for the medical schema
-    heur = heuristic_extract_from_text(req.text or "", schema)
-    if not isinstance(data, dict):
-        data = {}
-    for k, v in heur.items():
-        if k not in data or data[k] in (None, "", [], {}):
-            data[k] = v
+def _resolve_schema(
+    form_id: str, form_schema: Any, form_version: Optional[str] = None
+) -> Tuple[CompiledSchema, Optional[str]]:
+    """Compile an inline form_schema, or look up the registered one when it is omitted.
 
-    validator = SchemaValidator(schema)
-    missing = validator.validate_and_report(data)
+    Returns: (compiled, form_version). Raises 422 for an invalid inline schema and
+    404 when nothing is registered under form_id / form_version.
+    """
+    if form_schema in (None, ""):
+        try:
+            entry = schema_registry.get(form_id, form_version)
+        except SchemaNotFound as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        return entry.compiled, entry.form_version
+    try:
+        return compile_schema(form_schema), form_version
+    except BadFormSchema as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
-    metrics = ExtractionMetrics(
-        asr_seconds=round(0 / 1000, 2),
-        vision_seconds=round(0 / 1000, 2),
-        llm_seconds=round(llm_ms / 1000, 2) if llm_ms is not None else None,
-        total_seconds=round(llm_ms / 1000, 2) if llm_ms is not None else None,
-        tokens_in=tokens_in,
-        tokens_out=tokens_out,
-        cost_usd=round(cost, 6),
-        provider=provider_name,
-        model=model,
-    )
 
-    return ExtractionResponse(
-        form_id=req.form_id,
-        extracted=data,
-        confidence=confidence,
-        spans={},
-        missing_required=missing,
-        metrics=metrics,
+def _schema_info(entry: RegisteredSchema, created: Optional[bool] = None, include_schema: bool = False):
+    compiled = entry.compiled
+    return RegisteredSchemaInfo(
+        form_id=entry.form_id,
+        form_version=entry.form_version,
+        schema_hash=compiled.schema_hash,
+        field_count=len(compiled.fields),
+        required_fields=compiled.required_ids,
+        registered_at=entry.registered_at,
+        created=created,
+        form_schema=compiled.schema if include_schema else None,
     )
 
 
 @app.post(
-    "/process/text/batch",
-    response_model=MultiRowExtractionResponse,
+    "/schemas",
+    response_model=RegisteredSchemaInfo,
     response_model_exclude_none=True,
-    tags=["AI"],
+    tags=["Schemas"],
 )
-async def process_text_batch(
-    req: TextBatchRequest, model_preference: Optional[ModelPreference] = Query(None)
-):
+def register_schema(req: SchemaRegistration):
     """
-    Extract Multiple Rows/Entries from Raw Text
-
-    Overview:
-    - Parses text containing MULTIPLE entries/rows (e.g., a list of patients, records, etc.)
-    - Returns an array of extracted entries instead of a single object.
-
-    Use this endpoint when your text contains multiple records like:
-    - "Patient 1: John, 29 years old. Patient 2: Jane, 35 years old. Patient 3: Bob, 42 years old."
-    - Tabular data in text form
-    - Multiple form submissions in one text block
+    Register a Form Schema
 
-    Request:
-    - form_id: Identifier of your form/template.
-    - form_schema: JSON object with "fields" (id, type, required).
-    - text: The raw text containing multiple entries.
-    - model_preference: Optional model hint (e.g., "gpt-4o").
+    Uploads a schema once under form_id + form_version and compiles it eagerly
+    (validator, prompt headers, heuristic tables). /process/* calls may then omit
+    form_schema and send form_id (and optionally form_version; latest otherwise).
 
-    Returns:
-    - total_rows: Number of entries extracted
-    - rows: Array of extracted entries
-    - confidence: Field confidence scores (applies to all rows)
-    - metrics: Timing/cost/model metadata
+    Errors:
+    - 409: form_version already registered with a different schema
+    - 422: invalid form_schema
     """
-    need_vision = False
-    preferred = model_preference or req.model_preference
-    _pick = router.pick(preferred, need_vision)
-    if isinstance(_pick, tuple):
-        provider_name, model_override = _pick
-    else:
-        provider_name = _pick
-        model_override = None
-
     try:
-        schema = ensure_demo_schema(req.form_schema)
+        entry, created = schema_registry.register(req.form_id, req.form_version, req.form_schema)
     except BadFormSchema as e:
         raise HTTPException(status_code=422, detail=str(e))
+    except SchemaConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _schema_info(entry, created=created)
 
-    # Use multi-row extraction header
-    header = build_multi_row_extraction_header(schema)
-    combined_text = f"{header}\n\n---\nSOURCE TEXT:\n{req.text}"
 
+@app.get(
+    "/schemas/{form_id}",
+    response_model=RegisteredSchemaInfo,
+    response_model_exclude_none=True,
+    tags=["Schemas"],
+)
+def get_schema(form_id: str, form_version: Optional[str] = Query(None)):
+    """Return a registered schema (the latest version unless form_version is given)."""
     try:
-        data, confidence, llm_ms, tokens_in, tokens_out, cost, model = router.extract(
-            provider_name=provider_name,
-            form_schema=schema,
-            text_blob=combined_text,
-            images=None,
-            ocr_blocks=None,
-            locale=req.locale,
-            model_override=model_override,
-        )
-    except TypeError as e:
-        if "model_override" in str(e):
-            data, confidence, llm_ms, tokens_in, tokens_out, cost, model = (
-                router.extract(
-                    provider_name=provider_name,
-                    form_schema=schema,
-                    text_blob=combined_text,
-                    images=None,
-                    ocr_blocks=None,
-                    locale=req.locale,
-                )
-            )
-        else:
-            raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
+        entry = schema_registry.get(form_id, form_version)
+    except SchemaNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return _schema_info(entry, include_schema=True)
 
-    # Parse multi-row response
-    rows_data: List[Dict[str, Any]] = []
-    if isinstance(data, dict):
-        if "rows" in data and isinstance(data["rows"], list):
-            rows_data = data["rows"]
-        elif "extracted" in data and isinstance(data["extracted"], list):
-            rows_data = data["extracted"]
-        elif "extracted" in data and isinstance(data["extracted"], dict):
-            rows_data = [data["extracted"]]
-        elif not any(k in data for k in ["rows", "extracted", "total_rows"]):
-            rows_data = [data]
-    elif isinstance(data, list):
-        rows_data = data
 
-    validator = SchemaValidator(schema)
-    extracted_rows: List[ExtractedRow] = []
-    all_field_ids: set = set()
+@app.get(
+    "/schemas/{form_id}/versions",
+    response_model=List[RegisteredSchemaInfo],
+    response_model_exclude_none=True,
+    tags=["Schemas"],
+)
+def list_schema_versions(form_id: str):
+    """List every registered version of a form, oldest first."""
+    return [_schema_info(e) for e in schema_registry.versions(form_id)]
 
-    for idx, row_data in enumerate(rows_data):
-        if not isinstance(row_data, dict):
-            continue
 
-        merged_row: Dict[str, Any] = {}
-        for fdef in schema.get("fields", []):
-            fid = fdef.get("id")
-            if fid in row_data and row_data[fid] not in (None, "", [], {}):
-                merged_row[fid] = row_data[fid]
-                all_field_ids.add(fid)
-            else:
-                merged_row[fid] = row_data.get(fid)
+def _holding_scratch(scratch: ScratchSession, factory):
+    def start(is_disconnected):
+        # Claimed synchronously, before the request handler can release its own hold
+        scratch.hold()
+        return _release_after(factory(is_disconnected), scratch)
 
-        missing = validator.validate_and_report(merged_row)
-        extracted_rows.append(
-            ExtractedRow(
-                row_index=idx,
-                extracted=merged_row,
-                missing_required=missing,
-            )
+    return start
+
+
+async def _release_after(work: Awaitable[Any], scratch: ScratchSession) -> Any:
+    try:
+        return await work
+    finally:
+        scratch.release()
+
+
+async def _store_upload(
+    scratch: ScratchSession,
+    upload: UploadFile,
+    max_mb: int,
+    max_total_mb: Optional[int] = None,
+    in_memory: bool = True,
+) -> StoredUpload:
+    """Ingest an UploadFile, hashing it on the way.
+
+    Uploads up to UPLOAD_IN_MEMORY_MAX_MB stay in memory and go to the providers
+    as-is (unless `in_memory` is False); larger ones are streamed into `scratch`
+    in blocks.
+    """
+    try:
+        return await asyncio.to_thread(
+            scratch.store,
+            upload.file,
+            upload.filename,
+            max_mb * _MB,
+            max_total_mb * _MB if max_total_mb else None,
+            size_hint=getattr(upload, "size", None),
+            memory_max_bytes=settings.UPLOAD_IN_MEMORY_MAX_MB * _MB if in_memory else 0,
         )
+    finally:
+        await upload.close()
 
-    field_confidence: Dict[str, float] = {fid: 0.8 for fid in all_field_ids}
 
-    metrics = ExtractionMetrics(
-        asr_seconds=0.0,
-        vision_seconds=0.0,
-        llm_seconds=round(llm_ms / 1000, 2) if llm_ms is not None else None,
-        total_seconds=round(llm_ms / 1000, 2) if llm_ms is not None else None,
-        tokens_in=tokens_in,
-        tokens_out=tokens_out,
-        cost_usd=round(cost, 6),
-        provider=provider_name,
-        model=model,
-    )
+async def _coalesced(
+    request: Request,
+    response: Response,
+    key_parts: List[Any],
+    factory: Callable[[Optional[DisconnectCheck]], Awaitable[Any]],
+    scratch: Optional[ScratchSession] = None,
+):
+    """Run a /process/* pipeline through the request coalescer.
 
-    return MultiRowExtractionResponse(
-        form_id=req.form_id,
-        form_version=None,
-        total_rows=len(extracted_rows),
-        rows=extracted_rows,
-        confidence=field_confidence if field_confidence else None,
-        metrics=metrics,
-        meta={"text_length": len(req.text)},
+    Requests carrying the same Idempotency-Key (or, without one, the same content
+    key) share one in-flight run, and a finished result is replayed for
+    COALESCE_RETENTION_SECONDS. `X-Coalesced: joined|replayed` marks shared results.
+    A run started from this request keeps `scratch` alive until it finishes, even
+    if this request goes away while others are still waiting on it.
+    """
+    if scratch is not None:
+        factory = _holding_scratch(scratch, factory)
+    if coalescer is None:
+        return await factory(request.is_disconnected)
+    fingerprint = make_cache_key(request.url.path, *key_parts)
+    idem_key = request.headers.get("Idempotency-Key")
+    if idem_key:
+        key = make_cache_key("idempotency", request.url.path, idem_key)
+    elif settings.COALESCE_BY_CONTENT:
+        key = fingerprint
+    else:
+        return await factory(request.is_disconnected)
+    result, status = await coalescer.run(
+        key, factory, is_disconnected=request.is_disconnected, fingerprint=fingerprint
     )
+    if status != "started":
+        response.headers["X-Coalesced"] = status
+    return result
+
+
+def _stream_format(request: Request, stream: Optional[StreamFormat]) -> Optional[StreamFormat]:
+    """The requested streaming format: the `stream` query parameter, else the Accept header."""
+    if stream is not None:
+        return stream
+    accept = request.headers.get("accept", "")
+    if "text/event-stream" in accept:
+        return StreamFormat.sse
+    if "application/x-ndjson" in accept:
+        return StreamFormat.ndjson
+    return None
 
 
-@app.post(
-    "/process/audio",
-    response_model=ExtractionResponse,
-    response_model_exclude_none=True,
-    tags=["AI"],
-)
-async def process_audio(
-    form_id: str = Form(...),
-    form_schema: str = Form(...),  # JSON string
-    language: LanguagePreference = Form(
-        LanguagePreference.English,
-        description="ASR language: English, Igbo, Hausa, Yoruba",
-    ),
-    model_preference: Optional[ModelPreference] = Form(None),
-    audio_file: UploadFile = File(...),
-):
+def _frame(fmt: StreamFormat, event: str, payload: Dict[str, Any]) -> str:
+    if fmt == StreamFormat.sse:
+        return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+    return json.dumps({"event": event, "data": payload}, default=str) + "\n"
+
+
+def _streamed(
+    request: Request,
+    fmt: StreamFormat,
+    compiled: CompiledSchema,
+    factory: Callable[[Optional[DisconnectCheck]], Awaitable[MultiRowExtractionResponse]],
+    scratch: Optional[ScratchSession] = None,
+) -> StreamingResponse:
+    """Run a multi-row pipeline and stream its rows as NDJSON lines or Server-Sent Events.
+
+    Each row is sent as a "row" frame (an ExtractedRow, validated) as soon as the
+    model has written it; a final "result" frame carries the response without its
+    rows (total_rows, metrics, meta), or an "error" frame carries status_code and
+    detail. Streamed requests are not coalesced. `scratch` is held until the
+    pipeline finishes.
     """
-    Audio Transcription and Form Extraction
+    if scratch is not None:
+        factory = _holding_scratch(scratch, factory)
+    frames: asyncio.Queue = asyncio.Queue()
+    emitted = 0
+
+    def on_row(row: Dict[str, Any]) -> None:
+        nonlocal emitted
+        merged_row = {fid: row.get(fid) for fid in compiled.field_ids}
+        frames.put_nowait(
+            ExtractedRow(
+                row_index=emitted,
+                extracted=merged_row,
+                missing_required=compiled.validator.validate_and_report(merged_row),
+            )
+        )
+        emitted += 1
 
-    Overview:
-    - Upload an audio file (WAV/MP3) for transcription.
-    - Extracts structured data using your form schema.
+    # Started right away so the pipeline claims `scratch` before the handler releases it
+    work = factory(request.is_disconnected)
 
-    Request (multipart/form-data):
-    - form_id: Your form identifier.
-    - form_schema: JSON string of the fields object:
-    - language: Optional language code (e.g., "en", "fr").
-    - provider_preference: e.g., "openai".
-    - audio_file: The audio file to transcribe (WAV/MP3).
+    async def run() -> MultiRowExtractionResponse:
+        # The sink is only visible to this task and the tasks it starts
+        row_sink.set(on_row)
+        return await work
 
+    task = asyncio.ensure_future(run())
+    task.add_done_callback(lambda t: frames.put_nowait(None))
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
-    Demo Form Schema:
+    async def body():
+        try:
+            while (row := await frames.get()) is not None:
+                yield _frame(fmt, "row", row.model_dump(exclude_none=True))
+            try:
+                result = task.result()
+            except HTTPException as e:
+                yield _frame(fmt, "error", {"status_code": e.status_code, "detail": e.detail})
+                return
+            except Exception as e:
+                yield _frame(fmt, "error", {"status_code": 500, "detail": f"{type(e).__name__}: {e}"})
+                return
+            yield _frame(fmt, "result", result.model_dump(exclude_none=True, exclude={"rows"}))
+        finally:
+            if not task.done():
+                task.cancel()
+
+    media_type = "text/event-stream" if fmt == StreamFormat.sse else "application/x-ndjson"
+    return StreamingResponse(
+        body(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-            {
-                "fields": [
-                { "id": "patientName", "type": "text", "required": true },
-                { "id": "patientAge", "type": "number", "required": true },
-                { "id": "patientGender", "type": "select", "required": true },
-                { "id": "symptomsDate", "type": "date", "required": true },
-                { "id": "reportedSymptoms", "type": "multiselect", "required": false },
-                { "id": "testResult", "type": "select", "required": true },
-                { "id": "treatmentProvided", "type": "select", "required": false },
-                { "id": "healthWorkerId", "type": "text", "required": true },
-                { "id": "location", "type": "text", "required": true },
-                { "id": "followUpRequired", "type": "boolean", "required": false },
-                { "id": "notes", "type": "textarea", "required": false }
-                ]
-            }
 
-    Process:
-    1. Parse and validate form_schema.
-    2. Transcribe audio to text using Whisper ASR.
-    3. Run extraction on the transcribed text with the configured model.
-    4. Apply heuristics for the medical fields listed above.
+@app.on_event("startup")
+def _purge_stale_uploads() -> None:
+    upload_scratch.purge_stale()
 
-    Returns:
-    - extracted: Filled fields
-    - missing_required: Any required but missing fields
-    - metrics: ASR/LLM timings and model info
 
-    Errors:
-    - 400: Invalid form_schema or audio file
-    - 502: Transcription/provider error (with details)
+@app.on_event("startup")
+async def _warm_up_asr() -> None:
+    if settings.WHISPER_PRELOAD:
+        await asyncio.get_running_loop().run_in_executor(None, whisper_service.warm_up)
+
+
+@app.on_event("shutdown")
+async def _shutdown_executors() -> None:
+    asr_executor.shutdown()
+    await http_clients.aclose_all()
+    upload_scratch.cleanup()
+
+
+_SPITCH_LANG_CODES = {"Igbo": "ig", "Hausa": "ha", "Yoruba": "yo"}
+
+
+async def _transcribe_chunks(
+    is_disconnected: Optional[DisconnectCheck], asr_fn, chunks: List[AudioChunk]
+) -> tuple[str, int, int, List[Dict[str, Any]]]:
+    """Transcribe chunks concurrently and stitch them back in order.
+
+    Returns (transcript, wall_ms, queue_wait_ms, per_chunk_timings).
     """
-    # Enforce demo_form1 shape
-    try:
-        schema = ensure_demo_schema(form_schema)
-    except BadFormSchema as e:
-        raise HTTPException(status_code=422, detail=str(e))
+    sem = asyncio.Semaphore(max(1, settings.AUDIO_CHUNK_CONCURRENCY))
+
+    async def _one(chunk: AudioChunk):
+        async with sem:
+            return await asr_executor.run(
+                asr_fn,
+                chunk.wav_bytes,
+                filename=f"chunk_{chunk.index:03d}.wav",
+                is_disconnected=is_disconnected,
+            )
 
-    suffix = f"_{audio_file.filename}"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        content = await audio_file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    with timer() as t:
+        results = await asyncio.gather(*(_one(c) for c in chunks))
+        wall_ms = t()
 
-    # Transcription: Spitch for selected languages; Whisper for English
-    try:
-        if language != LanguagePreference.English:
-            # Map friendly label to Spitch language code
-            lang_map = {"Igbo": "ig", "Hausa": "ha", "Yoruba": "yo"}
-            src_code = lang_map.get(language.value)
-            if not src_code:
-                raise HTTPException(
-                    status_code=400, detail=f"Unsupported language: {language.value}"
-                )
-            transcript, asr_ms = SpitchService.transcribe(tmp_path, src_code)
-            asr_provider = "spitch"
-            lang_used = language.value
-        else:
-            transcript, asr_ms = whisper_service.transcribe(tmp_path, language=None)
-            asr_provider = "whisper"
-            lang_used = "English"
-    except Exception as e:
-        # No fallback for Igbo/Hausa/Yoruba
-        if language != LanguagePreference.English:
-            raise HTTPException(status_code=502, detail=f"Spitch ASR error: {e}")
-        # For auto, just surface the original error
-        raise HTTPException(status_code=502, detail=f"ASR error: {e}")
+    timings = [
+        {
+            "index": c.index,
+            "start_seconds": c.start,
+            "end_seconds": c.end,
+            "asr_seconds": round(ms / 1000, 2),
+            "queue_wait_seconds": round(q_ms / 1000, 2),
+        }
+        for c, ((_, ms), q_ms) in zip(chunks, results)
+    ]
+    transcript = stitch_transcripts([text for (text, _), _ in results])
+    return transcript, wall_ms, sum(q_ms for _, q_ms in results), timings
 
-    _pick = router.pick(model_preference, need_vision=False)
-    if isinstance(_pick, tuple):
-        provider_name, model_override = _pick
-    else:
-        provider_name = _pick
-        model_override = None
 
-    # Translate to English using Spitch when a specific non-auto language is chosen
+def _asr_function(language: LanguagePreference) -> tuple[Callable[..., Any], Optional[str], str, str, str]:
+    """Pick the ASR engine for `language`: Spitch for Igbo/Hausa/Yoruba, Whisper for English.
+
+    Returns (asr_fn, spitch_source_code, asr_provider, language_label, engine_id); the
+    source code is None for English. Raises 400 for an unsupported language.
+    """
     if language != LanguagePreference.English:
-        try:
-            lang_map = {"Igbo": "ig", "Hausa": "ha", "Yoruba": "yo"}
-            src_code = lang_map.get(language.value)
-            translated_text, _tr_ms = SpitchService.translate(
-                transcript, source=src_code, target="en"
-            )
-            if translated_text:
-                transcript = translated_text
-        except Exception as e:
-            # No fallback – Spitch must be used for translation for ig/ha/yo
+        src_code = _SPITCH_LANG_CODES.get(language.value)
+        if not src_code:
             raise HTTPException(
-                status_code=502, detail=f"Spitch translation error: {e}"
+                status_code=400, detail=f"Unsupported language: {language.value}"
             )
+        return functools.partial(SpitchService.transcribe, lang_code=src_code), src_code, "spitch", language.value, "spitch"
+    asr_engine = f"whisper:{settings.WHISPER_MODE}:{settings.WHISPER_LOCAL_MODEL if settings.WHISPER_MODE == 'local' else 'whisper-1'}"
+    return functools.partial(whisper_service.transcribe, language=None), None, "whisper", "English", asr_engine
+
+
+async def _transcribe_audio(
+    is_disconnected: Optional[DisconnectCheck],
+    source: Union[str, bytes],
+    language: LanguagePreference,
+    chunk_audio: Optional[bool] = None,
+    digest: Optional[str] = None,
+    filename: str = "audio.wav",
+) -> tuple[str, int, str, str, Dict[str, Any]]:
+    """Transcribe (and for ig/ha/yo, translate) on the ASR executor.
+
+    Spitch handles Igbo/Hausa/Yoruba, Whisper handles English. Audio is first
+    decoded to 16 kHz mono, silence-trimmed and re-encoded when pre-processing is
+    enabled; meta then carries the real durations (`audio_seconds` is what ASR is
+    billed for). Long recordings are split on silence and transcribed concurrently
+    when chunking is enabled. The
+    transcript and English translation are cached by audio SHA-256 + language, so
+    re-extracting the same recording costs only the LLM call.
+    Returns (transcript_en, asr_ms, asr_provider, language_label, asr_meta).
+    """
+    asr_fn, src_code, asr_provider, lang_used, asr_engine = _asr_function(language)
+
+    asr_meta: Dict[str, Any] = {"transcript_cache_hit": False}
+    cache_key = None
+    cached: Optional[Dict[str, Any]] = None
+    if transcript_cache is not None:
+        if digest is None:
+            digest = await asyncio.to_thread(file_sha256, source)
+        cache_key = make_cache_key("asr", asr_engine, src_code or "en", digest)
+        cached = transcript_cache.get(cache_key)
+
+    queue_ms = 0
+    if cached is not None:
+        transcript, asr_ms = cached["transcript"], 0
+        asr_meta["transcript_cache_hit"] = True
+    else:
+        report_stage("asr")
+        use_chunks = settings.AUDIO_CHUNKING_ENABLED if chunk_audio is None else chunk_audio
+        try:
+            prepared = None
+            if settings.AUDIO_PREPROCESS_ENABLED and chunking_available():
+                prepared, queue_ms = await asr_executor.run(
+                    prepare_audio,
+                    source,
+                    settings.AUDIO_OUTPUT_FORMAT,
+                    settings.AUDIO_TRIM_SILENCE,
+                    settings.AUDIO_SILENCE_THRESHOLD_DB,
+                    settings.AUDIO_MAX_SILENCE_SECONDS,
+                    settings.AUDIO_SILENCE_PADDING_SECONDS,
+                    filename,
+                    is_disconnected=is_disconnected,
+                )
+            if prepared is not None:
+                asr_meta["audio_duration_seconds"] = prepared.duration_seconds
+                asr_meta["audio_seconds"] = prepared.speech_seconds
+                asr_meta["audio_bytes_before"] = prepared.bytes_before
+                asr_meta["audio_bytes_after"] = prepared.bytes_after
+            chunks = None
+            if use_chunks:
+                if prepared is not None:
+                    chunks, _ = await asr_executor.run(
+                        chunk_samples,
+                        prepared.samples,
+                        settings.AUDIO_CHUNK_SECONDS,
+                        settings.AUDIO_CHUNK_OVERLAP_SECONDS,
+                        settings.AUDIO_CHUNK_MIN_SECONDS,
+                        is_disconnected=is_disconnected,
+                    )
+                else:
+                    chunks, _ = await asr_executor.run(
+                        plan_chunks,
+                        source,
+                        settings.AUDIO_CHUNK_SECONDS,
+                        settings.AUDIO_CHUNK_OVERLAP_SECONDS,
+                        settings.AUDIO_CHUNK_MIN_SECONDS,
+                        is_disconnected=is_disconnected,
+                    )
+            if chunks:
+                transcript, asr_ms, chunk_queue_ms, timings = await _transcribe_chunks(
+                    is_disconnected, asr_fn, chunks
+                )
+                queue_ms += chunk_queue_ms
+                asr_meta["asr_chunks"] = timings
+                # Overlaps are billed too
+                asr_meta["audio_seconds"] = round(sum(c.end - c.start for c in chunks), 3)
+            elif prepared is not None:
+                (transcript, asr_ms), asr_queue_ms = await asr_executor.run(
+                    asr_fn, prepared.data, filename=prepared.filename, is_disconnected=is_disconnected
+                )
+                queue_ms += asr_queue_ms
+            else:
+                (transcript, asr_ms), asr_queue_ms = await asr_executor.run(
+                    asr_fn, source, filename=filename, is_disconnected=is_disconnected
+                )
+                queue_ms += asr_queue_ms
+        except ASRCancelled:
+            raise
+        except Exception as e:
+            # No fallback for Igbo/Hausa/Yoruba
+            if src_code:
+                raise HTTPException(status_code=502, detail=f"Spitch ASR error: {e}")
+            raise HTTPException(status_code=502, detail=f"ASR error: {e}")
+        cached = {"transcript": transcript, "translation": None}
+        if cache_key is not None:
+            transcript_cache.set(cache_key, cached)
+
+    # Translate to English using Spitch when a specific non-English language is chosen
+    if src_code:
+        asr_meta["translation_cache_hit"] = bool(cached.get("translation"))
+        if cached.get("translation"):
+            transcript = cached["translation"]
+        else:
+            report_stage("translation")
+            try:
+                (translated_text, _tr_ms), tr_queue_ms = await asr_executor.run(
+                    SpitchService.translate,
+                    transcript,
+                    source=src_code,
+                    target="en",
+                    is_disconnected=is_disconnected,
+                )
+                queue_ms += tr_queue_ms
+                if translated_text:
+                    transcript = translated_text
+                    if cache_key is not None:
+                        transcript_cache.set(cache_key, {**cached, "translation": translated_text})
+            except ASRCancelled:
+                raise
+            except Exception as e:
+                # No fallback – Spitch must be used for translation for ig/ha/yo
+                raise HTTPException(
+                    status_code=502, detail=f"Spitch translation error: {e}"
+                )
 
-    # --- Costing for ASR and Translation ---
+    asr_meta["asr_queue_wait_seconds"] = round(queue_ms / 1000, 2)
+    return transcript, asr_ms, asr_provider, lang_used, asr_meta
+
+
+def _asr_costs(
+    asr_provider: str, asr_ms: int, transcript: str, asr_meta: Dict[str, Any]
+) -> tuple[float, float]:
+    """Estimate (asr_cost, translation_cost) in USD; cache hits cost nothing.
+
+    ASR is priced on the audio duration sent (`asr_meta["audio_seconds"]`); when the
+    upload could not be decoded locally, ASR wall-clock time is the fallback.
+    """
     asr_cost = 0.0
     translation_cost = 0.0
+    audio_seconds = asr_meta.get("audio_seconds")
+    if audio_seconds is None:
+        audio_seconds = (asr_ms or 0) / 1000.0
     try:
         if asr_provider == "spitch":
             # $0.00042 per second for transcription
-            asr_cost = ((asr_ms or 0) / 1000.0) * getattr(
+            asr_cost = audio_seconds * getattr(
                 settings, "SPITCH_PRICE_TRANSCRIPTION_PER_SEC", 0.0
             )
             # $1 per 10,000 words for translation (count on English transcript)
-            word_count = len((transcript or "").split())
-            translation_cost = (word_count / 10000.0) * getattr(
-                settings, "SPITCH_PRICE_TRANSLATION_PER_10K_WORDS", 0.0
-            )
+            if not asr_meta.get("translation_cache_hit"):
+                word_count = len((transcript or "").split())
+                translation_cost = (word_count / 10000.0) * getattr(
+                    settings, "SPITCH_PRICE_TRANSLATION_PER_10K_WORDS", 0.0
+                )
         elif (
             asr_provider == "whisper"
             and getattr(settings, "WHISPER_MODE", "api") == "api"
         ):
             # Whisper API: $0.17 per hour
-            hours = (asr_ms or 0) / 1000.0 / 3600.0
+            hours = audio_seconds / 3600.0
             asr_cost = hours * getattr(settings, "WHISPER_API_PRICE_PER_HOUR", 0.0)
     except Exception:
         # Never fail the request due to cost math; leave additional costs as zero on error
         asr_cost = asr_cost or 0.0
         translation_cost = translation_cost or 0.0
+    return asr_cost, translation_cost
 
-    try:
-        data, confidence, llm_ms, tokens_in, tokens_out, cost, model = router.extract(
-            provider_name=provider_name,
-            form_schema=schema,
-            text_blob=transcript,
-            images=None,
-            ocr_blocks=None,
-            locale=None,
-            model_override=model_override,
-        )
-    except TypeError as e:
-        if "model_override" in str(e):
-            data, confidence, llm_ms, tokens_in, tokens_out, cost, model = (
-                router.extract(
-                    provider_name=provider_name,
-                    form_schema=schema,
-                    text_blob=transcript,
-                    images=None,
-                    ocr_blocks=None,
-                    locale=None,
-                )
-            )
-        else:
-            raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
 
-    # Heuristic fallback/merge
-    heur = heuristic_extract_from_text(transcript or "", schema)
+@app.exception_handler(UploadTooLarge)
+async def _upload_too_large_handler(request: Request, exc: UploadTooLarge):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
+
+@app.exception_handler(IdempotencyConflict)
+async def _idempotency_conflict_handler(request: Request, exc: IdempotencyConflict):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
+
+
+@app.exception_handler(ASRCancelled)
+async def _asr_cancelled_handler(request: Request, exc: ASRCancelled):
+    # The client is gone; nginx-style 499 keeps this out of the 5xx error rates
+    return JSONResponse(status_code=499, content={"detail": str(exc)})
+
+
+async def _text_pipeline(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    text: str,
+    preferred: Optional[ModelPreference],
+) -> ExtractionResponse:
+    """LLM extraction plus medical heuristics for /process/text."""
+    need_vision = False
+    _pick = router.pick(preferred, need_vision)
+    if isinstance(_pick, tuple):
+        provider_name, model_override = _pick
+    else:
+        provider_name = _pick
+        model_override = None
+
+    schema = compiled.schema
+
+    data, confidence, llm_ms, tokens_in, tokens_out, cost, model, llm_info = await _extract(
+        provider_name=provider_name,
+        form_schema=schema,
+        text_blob=text,
+        model_override=model_override,
+        batch_key=compiled.schema_hash,
+    )
+    meta = {k: llm_info[k] for k in ("micro_batch_size", "micro_batch_fallback") if llm_info.get(k)}
+    return _text_response(
+        compiled, form_id, form_version, text, data, confidence, llm_ms, tokens_in, tokens_out, cost,
+        provider_name, model, llm_info, meta=meta or None,
+    )
+
+
+def _text_response(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    text: str,
+    data: Any,
+    confidence: Dict[str, float],
+    llm_ms: Optional[int],
+    tokens_in: int,
+    tokens_out: int,
+    cost: float,
+    provider_name: str,
+    model: str,
+    llm_info: Dict[str, Any],
+    meta: Optional[Dict[str, Any]] = None,
+) -> ExtractionResponse:
+    """Merge heuristics into an LLM result, validate it and build the /process/text response."""
+    schema = compiled.schema
+
+    # Heuristic fallback/merge for the medical schema
+    heur = heuristic_extract_from_text(text or "", schema)
     if not isinstance(data, dict):
         data = {}
     for k, v in heur.items():
         if k not in data or data[k] in (None, "", [], {}):
             data[k] = v
 
-    validator = SchemaValidator(schema)
+    validator = compiled.validator
     missing = validator.validate_and_report(data)
 
-    total_ms = (asr_ms or 0) + (llm_ms or 0)
-
-    total_cost = (cost or 0.0) + asr_cost + translation_cost
     metrics = ExtractionMetrics(
-        asr_seconds=round((asr_ms or 0) / 1000, 2),
+        asr_seconds=round(0 / 1000, 2),
         vision_seconds=round(0 / 1000, 2),
-        llm_seconds=round((llm_ms or 0) / 1000, 2),
-        total_seconds=round(total_ms / 1000, 2),
+        llm_seconds=round(llm_ms / 1000, 2) if llm_ms is not None else None,
+        total_seconds=round(llm_ms / 1000, 2) if llm_ms is not None else None,
         tokens_in=tokens_in,
         tokens_out=tokens_out,
-        cost_usd=round(total_cost, 6),
+        cost_usd=round(cost, 6),
         provider=provider_name,
         model=model,
+        cache_hit=llm_info.get("cache_hit"),
+        cached_tokens_in=llm_info.get("cached_tokens"),
     )
 
     return ExtractionResponse(
         form_id=form_id,
+        form_version=form_version,
         extracted=data,
         confidence=confidence,
         spans={},
         missing_required=missing,
         metrics=metrics,
-        meta={
-            "asr_provider": asr_provider,
-            "language": lang_used,
-            "cost_breakdown": {
-                "asr_cost_usd": round(asr_cost, 6),
-                "translation_cost_usd": round(translation_cost, 6),
-                "llm_cost_usd": round(cost or 0.0, 6),
-            },
-        },
+        meta=meta,
     )
 
 
 @app.post(
-    "/process/audio/batch",
-    response_model=MultiRowExtractionResponse,
+    "/process/text",
+    response_model=ExtractionResponse,
     response_model_exclude_none=True,
     tags=["AI"],
 )
-async def process_audio_batch(
-    form_id: str = Form(...),
-    form_schema: str = Form(...),
-    language: LanguagePreference = Form(
-        LanguagePreference.English,
-        description="ASR language: English, Igbo, Hausa, Yoruba",
-    ),
-    model_preference: Optional[ModelPreference] = Form(None),
-    audio_file: UploadFile = File(...),
+async def process_text(
+    req: TextRequest,
+    request: Request,
+    response: Response,
+    model_preference: Optional[ModelPreference] = Query(None),
 ):
     """
-    Audio Transcription and Multi-Row Form Extraction
+    Extract Structured Fields from Raw Text
 
     Overview:
-    - Upload an audio file (WAV/MP3) containing MULTIPLE entries/records.
-    - Transcribes and extracts multiple rows of structured data.
-
-    Use this endpoint when your audio contains multiple records like:
-    - "First patient: John Doe, age 29, positive result. Second patient: Jane Smith, age 35, negative result."
-    - Multiple form entries dictated sequentially
+    - Parses free-form text and maps values to your form schema fields.
+    - Uses LLM plus lightweight heuristics to improve accuracy for common fields.
 
-    Request (multipart/form-data):
-    - form_id: Your form identifier.
-    - form_schema: JSON string of the fields object.
-    - language: Language code (English, Igbo, Hausa, Yoruba).
-    - model_preference: Optional model hint.
-    - audio_file: The audio file to transcribe (WAV/MP3).
+    Request:
+    - form_id: Identifier of your form/template.
+    - form_schema: JSON object with "fields" (id, type, required); omit to use the schema registered via POST /schemas.
+    - form_version: Optional registered schema version (latest when omitted).
+    - text: The raw text to analyze.
+    - model_preference: Optional model hint (e.g., "gpt-4o").
 
-    Returns:
-    - total_rows: Number of entries extracted
-    - rows: Array of extracted entries
-    - confidence: Field confidence scores (applies to all rows)
-    - metrics: ASR/LLM timings and model info
-    """
-    try:
-        schema = ensure_demo_schema(form_schema)
-    except BadFormSchema as e:
-        raise HTTPException(status_code=422, detail=str(e))
+    Demo Form:
 
-    suffix = f"_{audio_file.filename}"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        content = await audio_file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+        {
+            "form_id": "demo_form1",
+            "form_schema": {
+                "fields": [
+                { "id": "patientName", "type": "text", "required": true },
+                { "id": "patientAge", "type": "number", "required": true },
+                { "id": "patientGender", "type": "select", "required": true },
+                { "id": "symptomsDate", "type": "date", "required": true },
+                { "id": "reportedSymptoms", "type": "multiselect", "required": false },
+                { "id": "testResult", "type": "select", "required": true },
+                { "id": "treatmentProvided", "type": "select", "required": false },
+                { "id": "healthWorkerId", "type": "text", "required": true },
+                { "id": "location", "type": "text", "required": true },
+                { "id": "followUpRequired", "type": "boolean", "required": false },
+                { "id": "notes", "type": "textarea", "required": false }
+                ]
+            },
+            "text": "The patient name is Janet Yakubu. She is a 29-year-old trader, who was seen at Ketu Clinic, Lagos on 2025-09-21 with fever, headache, and cough; the rapid test result was Positive, treatment provided included paracetamol and rest, attended by health worker ID HW-9321; follow-up is required; notes: patient stable and asked to return in 3 days.",
+            "provider_preference": null,
+            "model_preference": null
+        }
 
-    # Transcription
-    try:
-        if language != LanguagePreference.English:
-            lang_map = {"Igbo": "ig", "Hausa": "ha", "Yoruba": "yo"}
-            src_code = lang_map.get(language.value)
-            if not src_code:
-                raise HTTPException(
-                    status_code=400, detail=f"Unsupported language: {language.value}"
-                )
-            transcript, asr_ms = SpitchService.transcribe(tmp_path, src_code)
-            asr_provider = "spitch"
-            lang_used = language.value
-        else:
-            transcript, asr_ms = whisper_service.transcribe(tmp_path, language=None)
-            asr_provider = "whisper"
-            lang_used = "English"
-    except Exception as e:
-        if language != LanguagePreference.English:
-            raise HTTPException(status_code=502, detail=f"Spitch ASR error: {e}")
-        raise HTTPException(status_code=502, detail=f"ASR error: {e}")
 
-    _pick = router.pick(model_preference, need_vision=False)
-    if isinstance(_pick, tuple):
+    Process:
+    1. Validate schema.
+    2. Run extraction with the configured model.
+    3. Apply heuristics for:
+       - patientName, patientAge, patientGender, symptomsDate
+       - reportedSymptoms, testResult, treatmentProvided
+       - healthWorkerId, location, followUpRequired, notes
+
+    Returns:
+    - extracted: Dict of field_id -> value
+    - missing_required: List of missing required fields
+    - metrics: Timing/cost/model metadata
+
+    Error Handling:
+    - 400 for invalid schema
+    - 502 for provider errors
+    """
+    # Prefer an explicit query-selection over the body value when provided
+    preferred = model_preference or req.model_preference
+    # Coerce/validate form_schema to the demo_form1 shape
+    compiled, form_version = _resolve_schema(req.form_id, req.form_schema, req.form_version)
+    return await _coalesced(
+        request,
+        response,
+        ["text", req.form_id, form_version, compiled.schema_hash, preferred, req.text],
+        lambda is_disconnected: _text_pipeline(compiled, req.form_id, form_version, req.text, preferred),
+    )
+
+
+async def _text_batch_pipeline(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    text: str,
+    preferred: Optional[ModelPreference],
+    locale: Optional[str],
+) -> MultiRowExtractionResponse:
+    """Multi-row LLM extraction for /process/text/batch."""
+    need_vision = False
+    _pick = router.pick(preferred, need_vision)
+    if isinstance(_pick, tuple):
         provider_name, model_override = _pick
     else:
         provider_name = _pick
         model_override = None
 
-    # Translate to English if needed
-    if language != LanguagePreference.English:
-        try:
-            lang_map = {"Igbo": "ig", "Hausa": "ha", "Yoruba": "yo"}
-            src_code = lang_map.get(language.value)
-            translated_text, _tr_ms = SpitchService.translate(
-                transcript, source=src_code, target="en"
-            )
-            if translated_text:
-                transcript = translated_text
-        except Exception as e:
-            raise HTTPException(
-                status_code=502, detail=f"Spitch translation error: {e}"
-            )
-
-    # ASR and translation costing
-    asr_cost = 0.0
-    translation_cost = 0.0
-    try:
-        if asr_provider == "spitch":
-            asr_cost = ((asr_ms or 0) / 1000.0) * getattr(
-                settings, "SPITCH_PRICE_TRANSCRIPTION_PER_SEC", 0.0
-            )
-            word_count = len((transcript or "").split())
-            translation_cost = (word_count / 10000.0) * getattr(
-                settings, "SPITCH_PRICE_TRANSLATION_PER_10K_WORDS", 0.0
-            )
-        elif (
-            asr_provider == "whisper"
-            and getattr(settings, "WHISPER_MODE", "api") == "api"
-        ):
-            hours = (asr_ms or 0) / 1000.0 / 3600.0
-            asr_cost = hours * getattr(settings, "WHISPER_API_PRICE_PER_HOUR", 0.0)
-    except Exception:
-        asr_cost = asr_cost or 0.0
-        translation_cost = translation_cost or 0.0
-
-    # Use multi-row extraction header
-    header = build_multi_row_extraction_header(schema)
-    combined_text = f"{header}\n\n---\nSOURCE TEXT:\n{transcript}"
+    schema = compiled.schema
 
-    try:
-        data, confidence, llm_ms, tokens_in, tokens_out, cost, model = router.extract(
-            provider_name=provider_name,
-            form_schema=schema,
-            text_blob=combined_text,
-            images=None,
-            ocr_blocks=None,
-            locale=None,
-            model_override=model_override,
-        )
-    except TypeError as e:
-        if "model_override" in str(e):
-            data, confidence, llm_ms, tokens_in, tokens_out, cost, model = (
-                router.extract(
-                    provider_name=provider_name,
-                    form_schema=schema,
-                    text_blob=combined_text,
-                    images=None,
-                    ocr_blocks=None,
-                    locale=None,
-                )
-            )
-        else:
-            raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
+    # Static multi-row header goes in the cacheable prompt prefix, source text last;
+    # long texts are extracted in concurrent row chunks
+    data, confidence, llm_ms, tokens_in, tokens_out, cost, model, llm_info = await _extract_rows(
+        provider_name=provider_name,
+        compiled=compiled,
+        text_blob=text,
+        locale=locale,
+        model_override=model_override,
+    )
 
     # Parse multi-row response
-    rows_data: List[Dict[str, Any]] = []
-    if isinstance(data, dict):
-        if "rows" in data and isinstance(data["rows"], list):
-            rows_data = data["rows"]
-        elif "extracted" in data and isinstance(data["extracted"], list):
-            rows_data = data["extracted"]
-        elif "extracted" in data and isinstance(data["extracted"], dict):
-            rows_data = [data["extracted"]]
-        elif not any(k in data for k in ["rows", "extracted", "total_rows"]):
-            rows_data = [data]
-    elif isinstance(data, list):
-        rows_data = data
+    rows_data = _rows_from_llm(data)
 
-    validator = SchemaValidator(schema)
+    validator = compiled.validator
     extracted_rows: List[ExtractedRow] = []
     all_field_ids: set = set()
 
@@ -780,326 +1186,317 @@ async def process_audio_batch(
 
     field_confidence: Dict[str, float] = {fid: 0.8 for fid in all_field_ids}
 
-    total_ms = (asr_ms or 0) + (llm_ms or 0)
-    total_cost = (cost or 0.0) + asr_cost + translation_cost
-
     metrics = ExtractionMetrics(
-        asr_seconds=round((asr_ms or 0) / 1000, 2),
+        asr_seconds=0.0,
         vision_seconds=0.0,
-        llm_seconds=round((llm_ms or 0) / 1000, 2),
-        total_seconds=round(total_ms / 1000, 2),
+        llm_seconds=round(llm_ms / 1000, 2) if llm_ms is not None else None,
+        total_seconds=round(llm_ms / 1000, 2) if llm_ms is not None else None,
         tokens_in=tokens_in,
         tokens_out=tokens_out,
-        cost_usd=round(total_cost, 6),
+        cost_usd=round(cost, 6),
         provider=provider_name,
         model=model,
+        cache_hit=llm_info.get("cache_hit"),
+        cached_tokens_in=llm_info.get("cached_tokens"),
     )
 
     return MultiRowExtractionResponse(
         form_id=form_id,
-        form_version=None,
+        form_version=form_version,
         total_rows=len(extracted_rows),
         rows=extracted_rows,
         confidence=field_confidence if field_confidence else None,
         metrics=metrics,
-        meta={
-            "asr_provider": asr_provider,
-            "language": lang_used,
-            "transcript_length": len(transcript or ""),
-            "cost_breakdown": {
-                "asr_cost_usd": round(asr_cost, 6),
-                "translation_cost_usd": round(translation_cost, 6),
-                "llm_cost_usd": round(cost or 0.0, 6),
-            },
-        },
+        meta={"text_length": len(text), "row_chunks": llm_info.get("row_chunks")},
     )
 
 
 @app.post(
-    "/process/image",
-    response_model=ExtractionResponse,
+    "/process/text/batch",
+    response_model=MultiRowExtractionResponse,
     response_model_exclude_none=True,
     tags=["AI"],
 )
-async def process_image(
-    form_id: str = Form(...),
-    form_schema: str = Form(...),
-    use_vision: bool = Form(True),
-    model_preference: Optional[ModelPreference] = Form(None),
-    images: List[UploadFile] = File(...),
+async def process_text_batch(
+    req: TextBatchRequest,
+    request: Request,
+    response: Response,
+    model_preference: Optional[ModelPreference] = Query(None),
+    stream: Optional[StreamFormat] = Query(None, description="Stream rows as they are extracted: ndjson or sse"),
 ):
-    """OCR + Extraction (schema-agnostic heuristics + LLM merge).
-
-    Flow:
-      1. OCR each uploaded image (vision provider).
-      2. Build an instruction header + OCR text and call LLM.
-      3. Run generic key:value heuristics (any schema) + medical heuristics (legacy).
-      4. Merge results (LLM > generic > medical > defaults) and validate.
     """
-    # Normalize/validate schema
-    try:
-        schema = ensure_demo_schema(form_schema)
-    except BadFormSchema as e:
-        raise HTTPException(status_code=422, detail=str(e))
+    Extract Multiple Rows/Entries from Raw Text
 
-    # Persist temp files for OCR
-    tmp_paths: List[str] = []
-    for img in images:
-        suffix = f"_{img.filename}"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            content = await img.read()
-            tmp.write(content)
-            tmp_paths.append(tmp.name)
-
-    ocr_texts: List[str] = []
-    all_blocks: List[dict] = []
-    vision_ms_total = 0
-    for p in tmp_paths:
-        ocr_text, blocks, vision_ms = vision_service.ocr(
-            p, provider_client=default_openai_provider
-        )
-        ocr_texts.append(ocr_text)
-        all_blocks.extend(blocks)
-        vision_ms_total += vision_ms
+    Overview:
+    - Parses text containing MULTIPLE entries/rows (e.g., a list of patients, records, etc.)
+    - Returns an array of extracted entries instead of a single object.
 
-    raw_ocr_text = "\n".join(ocr_texts)
+    Use this endpoint when your text contains multiple records like:
+    - "Patient 1: John, 29 years old. Patient 2: Jane, 35 years old. Patient 3: Bob, 42 years old."
+    - Tabular data in text form
+    - Multiple form submissions in one text block
 
-    header = build_extraction_header(schema)
-    combined_text = f"{header}\n\n---\nSOURCE TEXT:\n{raw_ocr_text}"
+    Request:
+    - form_id: Identifier of your form/template.
+    - form_schema: JSON object with "fields" (id, type, required); omit to use the schema registered via POST /schemas.
+    - form_version: Optional registered schema version (latest when omitted).
+    - text: The raw text containing multiple entries.
+    - model_preference: Optional model hint (e.g., "gpt-4o").
+    - stream: Optional "ndjson" or "sse" (or send Accept: application/x-ndjson / text/event-stream).
 
-    _pick = router.pick(model_preference, need_vision=use_vision)
+    Returns:
+    - total_rows: Number of entries extracted
+    - rows: Array of extracted entries
+    - confidence: Field confidence scores (applies to all rows)
+    - metrics: Timing/cost/model metadata
+
+    Streaming: each validated row is sent as a "row" frame as soon as the model has
+    written it, followed by one "result" frame (the response without rows) or an
+    "error" frame.
+    """
+    preferred = model_preference or req.model_preference
+    compiled, form_version = _resolve_schema(req.form_id, req.form_schema, req.form_version)
+
+    def factory(is_disconnected):
+        return _text_batch_pipeline(compiled, req.form_id, form_version, req.text, preferred, req.locale)
+
+    fmt = _stream_format(request, stream)
+    if fmt is not None:
+        return _streamed(request, fmt, compiled, factory)
+    return await _coalesced(
+        request,
+        response,
+        ["text_batch", req.form_id, form_version, compiled.schema_hash, preferred, req.locale, req.text],
+        factory,
+    )
+
+
+async def _audio_pipeline(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    audio: StoredUpload,
+    language: LanguagePreference,
+    model_preference: Optional[ModelPreference],
+    chunk_audio: Optional[bool],
+    is_disconnected: Optional[DisconnectCheck] = None,
+) -> ExtractionResponse:
+    """ASR (+ translation) then extraction for /process/audio."""
+    schema = compiled.schema
+
+    transcript, asr_ms, asr_provider, lang_used, asr_meta = await _transcribe_audio(
+        is_disconnected,
+        audio.source,
+        language,
+        chunk_audio,
+        digest=audio.sha256,
+        filename=audio.filename,
+    )
+
+    _pick = router.pick(model_preference, need_vision=False)
     if isinstance(_pick, tuple):
         provider_name, model_override = _pick
     else:
         provider_name = _pick
         model_override = None
-    try:
-        data, confidence, llm_ms, tokens_in, tokens_out, cost, model = router.extract(
-            provider_name=provider_name,
-            form_schema=schema,
-            text_blob=combined_text,
-            images=None,
-            ocr_blocks=all_blocks,
-            locale=None,
-            model_override=model_override,
-        )
-    except TypeError as e:
-        if "model_override" in str(e):
-            data, confidence, llm_ms, tokens_in, tokens_out, cost, model = (
-                router.extract(
-                    provider_name=provider_name,
-                    form_schema=schema,
-                    text_blob=combined_text,
-                    images=None,
-                    ocr_blocks=all_blocks,
-                    locale=None,
-                )
-            )
-        else:
-            raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
 
-    # Normalise possible wrapper
-    if isinstance(data, dict) and isinstance(data.get("extracted"), dict):
-        llm_fields = data.get("extracted", {})
-    elif isinstance(data, dict):
-        llm_fields = data
-    else:
-        llm_fields = {}
+    asr_cost, translation_cost = _asr_costs(asr_provider, asr_ms, transcript, asr_meta)
 
-    generic_fields = generic_heuristic_extract(raw_ocr_text, schema)
-    medical_fields = heuristic_extract_from_text(raw_ocr_text, schema)
+    data, confidence, llm_ms, tokens_in, tokens_out, cost, model, llm_info = await _extract(
+        provider_name=provider_name,
+        form_schema=schema,
+        text_blob=transcript,
+        model_override=model_override,
+    )
 
-    merged: Dict[str, Any] = {}
-    for fdef in schema.get("fields", []):
-        fid = fdef.get("id")
-        if fid in llm_fields and llm_fields[fid] not in (None, "", [], {}):
-            merged[fid] = llm_fields[fid]
-        elif fid in generic_fields and generic_fields[fid] not in (None, "", [], {}):
-            merged[fid] = generic_fields[fid]
-        elif fid in medical_fields and medical_fields[fid] not in (None, "", [], {}):
-            merged[fid] = medical_fields[fid]
-        else:
-            merged[fid] = generic_fields.get(fid)
+    # Heuristic fallback/merge
+    heur = heuristic_extract_from_text(transcript or "", schema)
+    if not isinstance(data, dict):
+        data = {}
+    for k, v in heur.items():
+        if k not in data or data[k] in (None, "", [], {}):
+            data[k] = v
 
-    validator = SchemaValidator(schema)
-    missing = validator.validate_and_report(merged)
+    validator = compiled.validator
+    missing = validator.validate_and_report(data)
+
+    total_ms = (asr_ms or 0) + (llm_ms or 0)
 
-    total_ms = (vision_ms_total or 0) + (llm_ms or 0)
+    total_cost = (cost or 0.0) + asr_cost + translation_cost
     metrics = ExtractionMetrics(
-        asr_seconds=0.0,
-        vision_seconds=round((vision_ms_total or 0) / 1000, 2),
+        asr_seconds=round((asr_ms or 0) / 1000, 2),
+        vision_seconds=round(0 / 1000, 2),
         llm_seconds=round((llm_ms or 0) / 1000, 2),
         total_seconds=round(total_ms / 1000, 2),
         tokens_in=tokens_in,
         tokens_out=tokens_out,
-        cost_usd=round(cost, 6),
+        cost_usd=round(total_cost, 6),
         provider=provider_name,
         model=model,
+        cache_hit=llm_info.get("cache_hit"),
+        cached_tokens_in=llm_info.get("cached_tokens"),
     )
 
     return ExtractionResponse(
         form_id=form_id,
-        form_version=None,
-        extracted=merged,
-        confidence={k: 0.8 for k in merged.keys()},
+        form_version=form_version,
+        extracted=data,
+        confidence=confidence,
         spans={},
         missing_required=missing,
         metrics=metrics,
+        meta={
+            "asr_provider": asr_provider,
+            "language": lang_used,
+            **asr_meta,
+            "cost_breakdown": {
+                "asr_cost_usd": round(asr_cost, 6),
+                "translation_cost_usd": round(translation_cost, 6),
+                "llm_cost_usd": round(cost or 0.0, 6),
+            },
+        },
     )
-    """Debug endpoint to see raw OCR output"""
-    temp_paths = []
-    for img in images:
-        suffix = f"_{img.filename}"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            content = await img.read()
-            tmp.write(content)
-            temp_paths.append(tmp.name)
-
-    ocr_results = []
-    for p in temp_paths:
-        ocr_text, blocks, vision_ms = vision_service.ocr(
-            p, provider_client=default_openai_provider
-        )
-        ocr_results.append(
-            {
-                "path": p,
-                "ocr_text": ocr_text,
-                "blocks_count": len(blocks),
-                "vision_ms": vision_ms,
-            }
-        )
-
-    return {"ocr_results": ocr_results}
 
 
 @app.post(
-    "/process/image/batch",
-    response_model=MultiRowExtractionResponse,
+    "/process/audio",
+    response_model=ExtractionResponse,
     response_model_exclude_none=True,
     tags=["AI"],
 )
-async def process_image_batch(
+async def process_audio(
+    request: Request,
+    response: Response,
     form_id: str = Form(...),
-    form_schema: str = Form(...),
-    use_vision: bool = Form(True),
+    form_schema: Optional[str] = Form(None),  # JSON string; omit to use the registered schema
+    form_version: Optional[str] = Form(None),
+    language: LanguagePreference = Form(
+        LanguagePreference.English,
+        description="ASR language: English, Igbo, Hausa, Yoruba",
+    ),
     model_preference: Optional[ModelPreference] = Form(None),
-    images: List[UploadFile] = File(...),
+    chunk_audio: Optional[bool] = Form(
+        None,
+        description="Split long audio on silence and transcribe segments in parallel (default: server setting)",
+    ),
+    audio_file: UploadFile = File(...),
 ):
-    """OCR + Multi-Row Extraction for documents with multiple entries/rows.
-
-    Use this endpoint when the image contains a TABLE, LOG, or REGISTER with
-    multiple entries/records that should be extracted as an array.
-
-    Flow:
-      1. OCR each uploaded image (vision provider).
-      2. Build a multi-row instruction header + OCR text and call LLM.
-      3. Parse the LLM response to extract an array of rows.
-      4. Validate each row against the schema.
-
-    Returns:
-      - total_rows: Number of rows/entries extracted
-      - rows: Array of extracted entries, each with its own fields and missing_required
-      - metrics: Timing/cost/model metadata
     """
-    # Normalize/validate schema
-    try:
-        schema = ensure_demo_schema(form_schema)
-    except BadFormSchema as e:
-        raise HTTPException(status_code=422, detail=str(e))
+    Audio Transcription and Form Extraction
 
-    # Persist temp files for OCR
-    tmp_paths: List[str] = []
-    for img in images:
-        suffix = f"_{img.filename}"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            content = await img.read()
-            tmp.write(content)
-            tmp_paths.append(tmp.name)
-
-    ocr_texts: List[str] = []
-    all_blocks: List[dict] = []
-    vision_ms_total = 0
-    for p in tmp_paths:
-        ocr_text, blocks, vision_ms = vision_service.ocr(
-            p, provider_client=default_openai_provider
-        )
-        ocr_texts.append(ocr_text)
-        all_blocks.extend(blocks)
-        vision_ms_total += vision_ms
+    Overview:
+    - Upload an audio file (WAV/MP3) for transcription.
+    - Extracts structured data using your form schema.
 
-    raw_ocr_text = "\n".join(ocr_texts)
+    Request (multipart/form-data):
+    - form_id: Your form identifier.
+    - form_schema: JSON string of the fields object (omit to use the registered schema):
+    - form_version: Optional registered schema version (latest when omitted).
+    - language: Optional language code (e.g., "en", "fr").
+    - provider_preference: e.g., "openai".
+    - chunk_audio: Optional; split long recordings on silence and transcribe segments in parallel.
+    - audio_file: The audio file to transcribe (WAV/MP3).
 
-    # Use the multi-row extraction header
-    header = build_multi_row_extraction_header(schema)
-    combined_text = f"{header}\n\n---\nSOURCE TEXT:\n{raw_ocr_text}"
 
-    _pick = router.pick(model_preference, need_vision=use_vision)
-    if isinstance(_pick, tuple):
-        provider_name, model_override = _pick
-    else:
-        provider_name = _pick
-        model_override = None
+    Demo Form Schema:
 
-    try:
-        data, confidence, llm_ms, tokens_in, tokens_out, cost, model = router.extract(
-            provider_name=provider_name,
-            form_schema=schema,
-            text_blob=combined_text,
-            images=None,
-            ocr_blocks=all_blocks,
-            locale=None,
-            model_override=model_override,
+            {
+                "fields": [
+                { "id": "patientName", "type": "text", "required": true },
+                { "id": "patientAge", "type": "number", "required": true },
+                { "id": "patientGender", "type": "select", "required": true },
+                { "id": "symptomsDate", "type": "date", "required": true },
+                { "id": "reportedSymptoms", "type": "multiselect", "required": false },
+                { "id": "testResult", "type": "select", "required": true },
+                { "id": "treatmentProvided", "type": "select", "required": false },
+                { "id": "healthWorkerId", "type": "text", "required": true },
+                { "id": "location", "type": "text", "required": true },
+                { "id": "followUpRequired", "type": "boolean", "required": false },
+                { "id": "notes", "type": "textarea", "required": false }
+                ]
+            }
+
+    Process:
+    1. Parse and validate form_schema.
+    2. Transcribe audio to text using Whisper ASR.
+    3. Run extraction on the transcribed text with the configured model.
+    4. Apply heuristics for the medical fields listed above.
+
+    Returns:
+    - extracted: Filled fields
+    - missing_required: Any required but missing fields
+    - metrics: ASR/LLM timings and model info
+
+    Errors:
+    - 400: Invalid form_schema or audio file
+    - 502: Transcription/provider error (with details)
+    """
+    compiled, form_version = _resolve_schema(form_id, form_schema, form_version)
+
+    with upload_scratch.session() as scratch:
+        audio = await _store_upload(scratch, audio_file, settings.MAX_AUDIO_UPLOAD_MB)
+        return await _coalesced(
+            request,
+            response,
+            ["audio", form_id, form_version, compiled.schema_hash, language, model_preference, chunk_audio, audio.sha256],
+            lambda is_disconnected: _audio_pipeline(
+                compiled, form_id, form_version, audio, language, model_preference, chunk_audio, is_disconnected
+            ),
+            scratch=scratch,
         )
-    except TypeError as e:
-        if "model_override" in str(e):
-            data, confidence, llm_ms, tokens_in, tokens_out, cost, model = (
-                router.extract(
-                    provider_name=provider_name,
-                    form_schema=schema,
-                    text_blob=combined_text,
-                    images=None,
-                    ocr_blocks=all_blocks,
-                    locale=None,
-                )
-            )
-        else:
-            raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Extraction error: {e}")
 
-    # Parse the LLM response for multi-row format
-    rows_data: List[Dict[str, Any]] = []
 
-    if isinstance(data, dict):
-        # Check for "rows" key (expected format)
-        if "rows" in data and isinstance(data["rows"], list):
-            rows_data = data["rows"]
-        # Check for "extracted" that might be a list
-        elif "extracted" in data and isinstance(data["extracted"], list):
-            rows_data = data["extracted"]
-        # If it's a single extraction (no rows detected), wrap it as a single-row response
-        elif "extracted" in data and isinstance(data["extracted"], dict):
-            rows_data = [data["extracted"]]
-        # If data itself looks like a single row dict (not wrapped)
-        elif not any(k in data for k in ["rows", "extracted", "total_rows"]):
-            rows_data = [data]
-    elif isinstance(data, list):
-        rows_data = data
+async def _audio_batch_pipeline(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    audio: StoredUpload,
+    language: LanguagePreference,
+    model_preference: Optional[ModelPreference],
+    chunk_audio: Optional[bool],
+    is_disconnected: Optional[DisconnectCheck] = None,
+) -> MultiRowExtractionResponse:
+    """ASR (+ translation) then multi-row extraction for /process/audio/batch."""
+    schema = compiled.schema
+
+    transcript, asr_ms, asr_provider, lang_used, asr_meta = await _transcribe_audio(
+        is_disconnected,
+        audio.source,
+        language,
+        chunk_audio,
+        digest=audio.sha256,
+        filename=audio.filename,
+    )
 
-    # Validate each row and build ExtractedRow objects
-    validator = SchemaValidator(schema)
-    extracted_rows: List[ExtractedRow] = []
+    _pick = router.pick(model_preference, need_vision=False)
+    if isinstance(_pick, tuple):
+        provider_name, model_override = _pick
+    else:
+        provider_name = _pick
+        model_override = None
+
+    asr_cost, translation_cost = _asr_costs(asr_provider, asr_ms, transcript, asr_meta)
+
+    # Static multi-row header goes in the cacheable prompt prefix, source text last;
+    # long transcripts are extracted in concurrent row chunks
+    data, confidence, llm_ms, tokens_in, tokens_out, cost, model, llm_info = await _extract_rows(
+        provider_name=provider_name,
+        compiled=compiled,
+        text_blob=transcript,
+        model_override=model_override,
+    )
 
-    # Collect all field IDs for top-level confidence
+    # Parse multi-row response
+    rows_data = _rows_from_llm(data)
+
+    validator = compiled.validator
+    extracted_rows: List[ExtractedRow] = []
     all_field_ids: set = set()
 
     for idx, row_data in enumerate(rows_data):
         if not isinstance(row_data, dict):
             continue
 
-        # Merge with heuristics for each row (optional enhancement)
         merged_row: Dict[str, Any] = {}
         for fdef in schema.get("fields", []):
             fid = fdef.get("id")
@@ -1110,7 +1507,6 @@ async def process_image_batch(
                 merged_row[fid] = row_data.get(fid)
 
         missing = validator.validate_and_report(merged_row)
-
         extracted_rows.append(
             ExtractedRow(
                 row_index=idx,
@@ -1119,420 +1515,1531 @@ async def process_image_batch(
             )
         )
 
-    # Build top-level confidence (same for all fields)
     field_confidence: Dict[str, float] = {fid: 0.8 for fid in all_field_ids}
 
-    total_ms = (vision_ms_total or 0) + (llm_ms or 0)
+    total_ms = (asr_ms or 0) + (llm_ms or 0)
+    total_cost = (cost or 0.0) + asr_cost + translation_cost
+
     metrics = ExtractionMetrics(
-        asr_seconds=0.0,
-        vision_seconds=round((vision_ms_total or 0) / 1000, 2),
+        asr_seconds=round((asr_ms or 0) / 1000, 2),
+        vision_seconds=0.0,
         llm_seconds=round((llm_ms or 0) / 1000, 2),
         total_seconds=round(total_ms / 1000, 2),
         tokens_in=tokens_in,
         tokens_out=tokens_out,
-        cost_usd=round(cost, 6),
+        cost_usd=round(total_cost, 6),
         provider=provider_name,
         model=model,
+        cache_hit=llm_info.get("cache_hit"),
+        cached_tokens_in=llm_info.get("cached_tokens"),
     )
 
     return MultiRowExtractionResponse(
         form_id=form_id,
-        form_version=None,
+        form_version=form_version,
         total_rows=len(extracted_rows),
         rows=extracted_rows,
         confidence=field_confidence if field_confidence else None,
         metrics=metrics,
-        meta={"raw_ocr_length": len(raw_ocr_text), "images_processed": len(tmp_paths)},
+        meta={
+            "asr_provider": asr_provider,
+            "language": lang_used,
+            **asr_meta,
+            "transcript_length": len(transcript or ""),
+            "row_chunks": llm_info.get("row_chunks"),
+            "cost_breakdown": {
+                "asr_cost_usd": round(asr_cost, 6),
+                "translation_cost_usd": round(translation_cost, 6),
+                "llm_cost_usd": round(cost or 0.0, 6),
+            },
+        },
     )
 
 
-# --- Heuristic helpers for the medical schema ---
+@app.post(
+    "/process/audio/batch",
+    response_model=MultiRowExtractionResponse,
+    response_model_exclude_none=True,
+    tags=["AI"],
+)
+async def process_audio_batch(
+    request: Request,
+    response: Response,
+    form_id: str = Form(...),
+    form_schema: Optional[str] = Form(None),
+    form_version: Optional[str] = Form(None),
+    language: LanguagePreference = Form(
+        LanguagePreference.English,
+        description="ASR language: English, Igbo, Hausa, Yoruba",
+    ),
+    model_preference: Optional[ModelPreference] = Form(None),
+    chunk_audio: Optional[bool] = Form(
+        None,
+        description="Split long audio on silence and transcribe segments in parallel (default: server setting)",
+    ),
+    audio_file: UploadFile = File(...),
+    stream: Optional[StreamFormat] = Query(None, description="Stream rows as they are extracted: ndjson or sse"),
+):
+    """
+    Audio Transcription and Multi-Row Form Extraction
 
+    Overview:
+    - Upload an audio file (WAV/MP3) containing MULTIPLE entries/records.
+    - Transcribes and extracts multiple rows of structured data.
 
-def _norm_line(s: str) -> str:
-    s = unicodedata.normalize("NFKC", s or "")
-    return s.strip("•·-—–*☒☐✓✔✗[]() \t\r\n")
+    Use this endpoint when your audio contains multiple records like:
+    - "First patient: John Doe, age 29, positive result. Second patient: Jane Smith, age 35, negative result."
+    - Multiple form entries dictated sequentially
 
+    Request (multipart/form-data):
+    - form_id: Your form identifier.
+    - form_schema: JSON string of the fields object; omit to use the registered schema.
+    - form_version: Optional registered schema version (latest when omitted).
+    - language: Language code (English, Igbo, Hausa, Yoruba).
+    - model_preference: Optional model hint.
+    - chunk_audio: Optional; split long recordings on silence and transcribe segments in parallel.
+    - audio_file: The audio file to transcribe (WAV/MP3).
+    - stream: Optional "ndjson" or "sse" query parameter; rows are streamed as in /process/text/batch.
 
-def _parse_bool(v: Optional[str]) -> Optional[bool]:
-    if not v:
-        return None
-    x = v.strip().lower()
-    if x in {"yes", "y", "true", "t", "1"}:
-        return True
-    if x in {"no", "n", "false", "f", "0"}:
-        return False
-    return None
+    Returns:
+    - total_rows: Number of entries extracted
+    - rows: Array of extracted entries
+    - confidence: Field confidence scores (applies to all rows)
+    - metrics: ASR/LLM timings and model info
+    """
+    compiled, form_version = _resolve_schema(form_id, form_schema, form_version)
 
+    with upload_scratch.session() as scratch:
+        audio = await _store_upload(scratch, audio_file, settings.MAX_AUDIO_UPLOAD_MB)
 
-def _parse_date_any(s: str) -> Optional[str]:
-    s = s or ""
-    s = s.strip()
-    # 2025-09-21 / 2025/09/21
-    m = re.search(r"\b(\d{4})[-/](\d{1,2})[-/](\d{1,2})\b", s)
-    if m:
-        y, mo, d = map(int, m.groups())
-        try:
-            return datetime(y, mo, d).strftime("%Y-%m-%d")
-        except Exception:
-            pass
-    # 21/09/2025 or 09/21/2025
-    m = re.search(r"\b(\d{1,2})[-/](\d{1,2})[-/](\d{4})\b", s)
-    if m:
-        a, b, y = map(int, m.groups())
+        def factory(is_disconnected):
+            return _audio_batch_pipeline(
+                compiled, form_id, form_version, audio, language, model_preference, chunk_audio, is_disconnected
+            )
+
+        fmt = _stream_format(request, stream)
+        if fmt is not None:
+            return _streamed(request, fmt, compiled, factory, scratch=scratch)
+        return await _coalesced(
+            request,
+            response,
+            ["audio_batch", form_id, form_version, compiled.schema_hash, language, model_preference, chunk_audio, audio.sha256],
+            factory,
+            scratch=scratch,
+        )
+
+
+class _LiveSession:
+    """State of one /ws/audio connection: transcript so far plus running usage totals."""
+
+    def __init__(self, websocket: WebSocket, compiled: CompiledSchema, config: Dict[str, Any]) -> None:
+        self.websocket = websocket
+        self.compiled = compiled
+        self.form_id: str = config["form_id"]
+        self.form_version: Optional[str] = config.get("form_version")
+        self.language = LanguagePreference(config.get("language") or LanguagePreference.English.value)
+        self.preferred = ModelPreference(config["model_preference"]) if config.get("model_preference") else None
+        self.asr_fn, self.src_code, self.asr_provider, self.lang_used, _ = _asr_function(self.language)
+        self.buffer = LiveAudioBuffer(
+            encoding=config["encoding"],
+            sample_rate=config["sample_rate"],
+            segment_seconds=settings.LIVE_AUDIO_SEGMENT_SECONDS,
+            silence_dbfs=settings.LIVE_AUDIO_SILENCE_DBFS,
+        )
+        self.segments: List[str] = []
+        self.asr_ms = 0
+        self.audio_seconds = 0.0
+        self.llm_runs: List[ExtractionResponse] = []
+        self.extracted_for = -1  # number of segments the last extraction covered
+        self.last_extracted: Optional[Dict[str, Any]] = None
+        self.stopped = False
+        self.closed = False
+        self.wakeup = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(t for t in self.segments if t)
+
+    async def is_disconnected(self) -> bool:
+        return self.closed
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        if self.closed:
+            return
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message, default=str))
+
+    async def receive(self) -> None:
+        """Read audio frames and control messages until the client stops or leaves."""
         try:
-            if a > 12:
-                d, mo = a, b
-            else:
-                mo, d = a, b
-            return datetime(y, mo, d).strftime("%Y-%m-%d")
-        except Exception:
-            pass
-    # 21 Sep 2025 / September 21, 2025
-    m = re.search(r"\b(\d{1,2})\s+([A-Za-z]{3,})\s*,?\s*(\d{4})\b", s)
-    if m:
-        d, mon, y = int(m.group(1)), m.group(2), int(m.group(3))
-        for fmt in ("%d %B %Y", "%d %b %Y"):
+            while not self.stopped:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    self.closed = True
+                    break
+                if message.get("bytes"):
+                    self.buffer.append(message["bytes"])
+                    if self.buffer.received_seconds > settings.LIVE_AUDIO_MAX_SECONDS:
+                        self.stopped = True
+                elif message.get("text"):
+                    try:
+                        control = json.loads(message["text"])
+                    except ValueError:
+                        control = {}
+                    if control.get("type") == "stop":
+                        self.stopped = True
+                self.wakeup.set()
+        except WebSocketDisconnect:
+            self.closed = True
+        finally:
+            self.wakeup.set()
+
+    async def transcribe_pending(self, final: bool = False) -> None:
+        """Transcribe (and translate) every segment the buffer has ready, in order."""
+        while not self.closed:
+            segment, _ = await asr_executor.run(self.buffer.next_segment, final, is_disconnected=self.is_disconnected)
+            if segment is None:
+                return
+            start, end, samples = segment
+            report_stage("asr")
             try:
-                return datetime.strptime(f"{d} {mon} {y}", fmt).strftime("%Y-%m-%d")
-            except Exception:
+                (text, ms), _ = await asr_executor.run(
+                    self.asr_fn,
+                    encode_wav(samples),
+                    filename=f"live_{len(self.segments):03d}.wav",
+                    is_disconnected=self.is_disconnected,
+                )
+                if self.src_code and text:
+                    (translated, _tr_ms), _ = await asr_executor.run(
+                        SpitchService.translate, text, source=self.src_code, target="en",
+                        is_disconnected=self.is_disconnected,
+                    )
+                    text = translated or text
+            except ASRCancelled:
+                raise
+            except Exception as e:
+                await self.send({"type": "error", "status_code": 502, "detail": f"ASR error: {e}", "final": False})
                 continue
-    return None
-
+            self.segments.append((text or "").strip())
+            self.asr_ms += ms
+            self.audio_seconds += end - start
+            await self.send(
+                {
+                    "type": "transcript",
+                    "segment": len(self.segments) - 1,
+                    "start_seconds": start,
+                    "end_seconds": end,
+                    "text": self.segments[-1],
+                    "transcript": self.transcript,
+                }
+            )
 
-_SYMPTOM_VOCAB = {
-    "fever",
-    "headache",
-    "chills",
-    "cough",
-    "nausea",
-    "vomiting",
-    "diarrhea",
-    "fatigue",
-    "body pain",
-    "muscle pain",
-    "sore throat",
-    "loss of appetite",
-    "sweats",
-    "weakness",
-    "dizziness",
-}
-
-
-def _split_symptoms(s: str) -> List[str]:
-    s = (s or "").lower()
-    parts = re.split(r"[;,]", s)
-    out: List[str] = []
-    for p in parts:
-        p = p.strip()
-        if not p:
-            continue
-        if p in _SYMPTOM_VOCAB:
-            out.append(p)
+    async def extract(self) -> Optional[ExtractionResponse]:
+        """Re-run extraction over the whole transcript and push what changed."""
+        covered = len(self.segments)
+        transcript = self.transcript
+        if covered == self.extracted_for or not transcript:
+            return self.llm_runs[-1] if self.llm_runs else None
+        self.extracted_for = covered
+        try:
+            result = await _text_pipeline(self.compiled, self.form_id, self.form_version, transcript, self.preferred)
+        except HTTPException as e:
+            await self.send({"type": "error", "status_code": e.status_code, "detail": e.detail, "final": False})
+            return None
+        self.llm_runs.append(result)
+        previous = self.last_extracted or {}
+        changed = [k for k, v in result.extracted.items() if previous.get(k) != v]
+        self.last_extracted = result.extracted
+        if changed:
+            await self.send(
+                {
+                    "type": "partial",
+                    "extracted": result.extracted,
+                    "missing_required": result.missing_required,
+                    "changed": changed,
+                    "segments": covered,
+                }
+            )
+        return result
+
+    def final_response(self, result: ExtractionResponse) -> ExtractionResponse:
+        """The last extraction with ASR and every extraction call of the session accounted for."""
+        asr_meta = {"audio_seconds": round(self.audio_seconds, 3)}
+        asr_cost, translation_cost = _asr_costs(self.asr_provider, self.asr_ms, self.transcript, asr_meta)
+        llm_cost = sum(r.metrics.cost_usd or 0.0 for r in self.llm_runs)
+        llm_ms = sum((r.metrics.llm_seconds or 0.0) for r in self.llm_runs) * 1000
+        result.metrics = (result.metrics or ExtractionMetrics()).model_copy(
+            update={
+                "asr_seconds": round(self.asr_ms / 1000, 2),
+                "llm_seconds": round(llm_ms / 1000, 2),
+                "total_seconds": round((self.asr_ms + llm_ms) / 1000, 2),
+                "tokens_in": sum(r.metrics.tokens_in or 0 for r in self.llm_runs),
+                "tokens_out": sum(r.metrics.tokens_out or 0 for r in self.llm_runs),
+                "cost_usd": round(llm_cost + asr_cost + translation_cost, 6),
+            }
+        )
+        result.meta = {
+            **(result.meta or {}),
+            "live": True,
+            "asr_provider": self.asr_provider,
+            "language": self.lang_used,
+            "audio_received_seconds": round(self.buffer.received_seconds, 3),
+            "audio_seconds": round(self.audio_seconds, 3),
+            "silence_skipped_seconds": round(self.buffer.skipped_seconds, 3),
+            "segments": len(self.segments),
+            "extraction_runs": len(self.llm_runs),
+            "transcript": self.transcript,
+            "cost_breakdown": {
+                "asr_cost_usd": round(asr_cost, 6),
+                "translation_cost_usd": round(translation_cost, 6),
+                "llm_cost_usd": round(llm_cost, 6),
+            },
+        }
+        return result
+
+
+@app.websocket("/ws/audio")
+async def live_audio(websocket: WebSocket):
+    """Live dictation: stream audio in, get the form filled in as it is spoken.
+
+    Protocol (all control messages are JSON text frames):
+    1. Client sends {"form_id", "form_schema"?, "form_version"?, "language"?,
+       "model_preference"?, "encoding"?: "pcm_s16le" | "container", "sample_rate"?}.
+       The server answers {"type": "ready"}.
+    2. Client streams binary audio frames: 16-bit mono PCM at sample_rate (default
+       16000), or consecutive pieces of one container stream (e.g. WebM/Opus from
+       MediaRecorder) with encoding "container".
+    3. Every LIVE_AUDIO_SEGMENT_SECONDS of audio is transcribed as it arrives
+       ({"type": "transcript", ...}); at most every LIVE_AUDIO_EXTRACT_SECONDS the
+       transcript so far is extracted again and changed fields are pushed as
+       {"type": "partial", "extracted", "missing_required", "changed"}.
+    4. Client sends {"type": "stop"}; the rest of the audio is transcribed and the
+       server sends {"type": "final", "result": <ExtractionResponse>} and closes.
+    Errors are sent as {"type": "error", "status_code", "detail", "final"}.
+    """
+    await websocket.accept()
+    try:
+        config = await websocket.receive_json()
+        if not isinstance(config, dict) or not config.get("form_id"):
+            raise HTTPException(status_code=422, detail="first message must be a JSON object with form_id")
+        if not settings.LIVE_AUDIO_ENABLED:
+            raise HTTPException(status_code=404, detail="Live audio is disabled")
+        encoding = config.get("encoding") or "pcm_s16le"
+        if encoding not in LIVE_AUDIO_ENCODINGS:
+            raise HTTPException(status_code=422, detail=f"encoding must be one of {', '.join(LIVE_AUDIO_ENCODINGS)}")
+        sample_rate = config.get("sample_rate")
+        sample_rate = 16000 if sample_rate is None else sample_rate
+        if isinstance(sample_rate, bool) or not isinstance(sample_rate, int) or not 8000 <= sample_rate <= 48000:
+            raise HTTPException(status_code=422, detail="sample_rate must be an integer between 8000 and 48000")
+        if not live_audio_available(encoding):
+            raise HTTPException(status_code=501, detail="Live audio requires the 'numpy' (and for containers 'av') packages")
+        compiled, form_version = _resolve_schema(config["form_id"], config.get("form_schema"), config.get("form_version"))
+        session = _LiveSession(
+            websocket,
+            compiled,
+            {**config, "encoding": encoding, "sample_rate": sample_rate, "form_version": form_version},
+        )
+    except (HTTPException, ValueError) as e:
+        status = e.status_code if isinstance(e, HTTPException) else 422
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        await websocket.send_text(json.dumps({"type": "error", "status_code": status, "detail": detail, "final": True}))
+        await websocket.close(code=1008)
+        return
+    except WebSocketDisconnect:
+        return
+
+    await session.send({"type": "ready", "form_id": session.form_id, "form_version": form_version})
+    receiver = asyncio.ensure_future(session.receive())
+    extraction: Optional[asyncio.Task] = None
+    last_extraction = 0.0
+    try:
+        while not session.closed:
+            await session.wakeup.wait()
+            session.wakeup.clear()
+            await session.transcribe_pending()
+            if session.stopped or session.closed:
+                break
+            now = asyncio.get_running_loop().time()
+            if (extraction is None or extraction.done()) and now - last_extraction >= settings.LIVE_AUDIO_EXTRACT_SECONDS:
+                # Runs alongside further ASR; the next one waits until this one is done
+                extraction = asyncio.ensure_future(session.extract())
+                last_extraction = now
+        if session.closed:
+            return
+        await session.transcribe_pending(final=True)
+        if extraction is not None:
+            await extraction
+        result = await session.extract()
+        if result is None:
+            detail = "No speech was transcribed"
+            if session.buffer.decode_error:
+                detail += f" (audio could not be decoded: {session.buffer.decode_error})"
+            await session.send({"type": "error", "status_code": 422, "detail": detail, "final": True})
         else:
-            for vocab in _SYMPTOM_VOCAB:
-                if vocab in p and vocab not in out:
-                    out.append(vocab)
-    return out
-
-
-def heuristic_extract_from_text(text: str, form_schema: dict) -> dict:
-    # Initialize defaults based on schema
-    fields = {}
-    for f in form_schema.get("fields", []):
-        fid = f.get("id")
-        ftype = (f.get("type") or "").lower()
-        if not isinstance(fid, str):
-            continue
-        if ftype == "number":
-            fields[fid] = None
-        elif ftype == "multiselect":
-            fields[fid] = []
-        elif ftype == "boolean":
-            fields[fid] = None
+            await session.send({"type": "final", "result": session.final_response(result).model_dump(exclude_none=True)})
+        await websocket.close()
+    except ASRCancelled:
+        return
+    except WebSocketDisconnect:
+        session.closed = True
+    finally:
+        receiver.cancel()
+        session.buffer.close()
+        if extraction is not None and not extraction.done():
+            extraction.cancel()
+
+
+async def _image_pipeline(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    uploads: List[StoredUpload],
+    use_vision: bool,
+    model_preference: Optional[ModelPreference],
+) -> ExtractionResponse:
+    """OCR, LLM extraction and heuristic merge for /process/image."""
+    schema = compiled.schema
+
+    # OCR all pages concurrently; texts come back in upload order
+    report_stage("ocr")
+    ocr_texts, all_blocks, vision_ms_total, vision_wall_ms, ocr_info = (
+        await vision_service.ocr_many(
+            [u.source for u in uploads],
+            provider_client=default_openai_provider,
+            digests=[u.sha256 for u in uploads],
+            filenames=[u.filename for u in uploads],
+        )
+    )
+
+    raw_ocr_text = "\n".join(ocr_texts)
+
+    # Static header goes in the cacheable prompt prefix, source text last
+    header = compiled.extraction_header
+
+    _pick = router.pick(model_preference, need_vision=use_vision)
+    if isinstance(_pick, tuple):
+        provider_name, model_override = _pick
+    else:
+        provider_name = _pick
+        model_override = None
+    data, confidence, llm_ms, tokens_in, tokens_out, cost, model, llm_info = await _extract(
+        provider_name=provider_name,
+        form_schema=schema,
+        text_blob=raw_ocr_text,
+        header=header,
+        ocr_blocks=all_blocks,
+        model_override=model_override,
+    )
+
+    # Normalise possible wrapper
+    if isinstance(data, dict) and isinstance(data.get("extracted"), dict):
+        llm_fields = data.get("extracted", {})
+    elif isinstance(data, dict):
+        llm_fields = data
+    else:
+        llm_fields = {}
+
+    generic_fields = generic_heuristic_extract(raw_ocr_text, schema, compiled.heuristic_tables)
+    medical_fields = heuristic_extract_from_text(raw_ocr_text, schema)
+
+    merged: Dict[str, Any] = {}
+    for fdef in schema.get("fields", []):
+        fid = fdef.get("id")
+        if fid in llm_fields and llm_fields[fid] not in (None, "", [], {}):
+            merged[fid] = llm_fields[fid]
+        elif fid in generic_fields and generic_fields[fid] not in (None, "", [], {}):
+            merged[fid] = generic_fields[fid]
+        elif fid in medical_fields and medical_fields[fid] not in (None, "", [], {}):
+            merged[fid] = medical_fields[fid]
         else:
-            fields[fid] = ""
+            merged[fid] = generic_fields.get(fid)
 
-    # Pass 1: key:value style lines
-    for raw in (text or "").splitlines():
-        line = _norm_line(raw)
-        if not line:
-            continue
-        key, value = (line.split(":", 1) + [""])[:2] if ":" in line else (line, "")
-        key = key.strip().lower()
-        value = value.strip()
-
-        if "patient name" in key or key == "name":
-            if "patientName" in fields and value:
-                fields["patientName"] = value
-        elif "age" in key:
-            if "patientAge" in fields:
-                m = re.search(r"\b(\d{1,3})\b", value or line)
-                if m:
-                    fields["patientAge"] = int(m.group(1))
-        elif "gender" in key or "sex" in key:
-            if "patientGender" in fields:
-                v = (value or line).lower()
-                if "female" in v or v.strip() in {"f"}:
-                    fields["patientGender"] = "Female"
-                elif "male" in v or v.strip() in {"m"}:
-                    fields["patientGender"] = "Male"
-        elif (
-            "symptoms date" in key
-            or "date of symptoms" in key
-            or key == "date"
-            or "onset date" in key
-        ):
-            if "symptomsDate" in fields:
-                d = _parse_date_any(value or line)
-                if d:
-                    fields["symptomsDate"] = d
-        elif "reported symptoms" in key or key == "symptoms":
-            if "reportedSymptoms" in fields:
-                vals = _split_symptoms(value or "")
-                if vals:
-                    fields["reportedSymptoms"] = vals
-        elif "test result" in key or key == "result":
-            if "testResult" in fields:
-                v = (value or line).lower()
-                if "positive" in v:
-                    fields["testResult"] = "Positive"
-                elif "negative" in v:
-                    fields["testResult"] = "Negative"
-                elif "inconclusive" in v:
-                    fields["testResult"] = "Inconclusive"
-                else:
-                    fields["testResult"] = value
-        elif (
-            "treatment provided" in key
-            or key == "treatment"
-            or "therapy" in key
-            or "medication" in key
-        ):
-            if "treatmentProvided" in fields:
-                fields["treatmentProvided"] = value or fields["treatmentProvided"]
-        elif (
-            "health worker id" in key
-            or "hw id" in key
-            or "staff id" in key
-            or "worker id" in key
-        ):
-            if "healthWorkerId" in fields:
-                v = re.sub(r"[^A-Za-z0-9\-_]", "", value or "")
-                fields["healthWorkerId"] = v
-        elif "location" in key:
-            if "location" in fields:
-                fields["location"] = value or fields["location"]
-        elif "follow up" in key or "follow-up" in key or "followup" in key:
-            if "followUpRequired" in fields:
-                b = _parse_bool(value or line)
-                if b is not None:
-                    fields["followUpRequired"] = b
-        elif (
-            "notes" in key
-            or "remarks" in key
-            or "comments" in key
-            or "observation" in key
-        ):
-            if "notes" in fields:
-                fields["notes"] = value or fields["notes"]
-
-    # Pass 2: fallbacks from free text
-    if "patientName" in fields and not fields["patientName"]:
-        m = re.search(
-            r"\b(Patient\s+Name|Name)\s*:\s*([A-Za-z][A-Za-z.'-]+\s+[A-Za-z][A-Za-z.'-]+)",
-            text,
-            re.IGNORECASE,
+    validator = compiled.validator
+    missing = validator.validate_and_report(merged)
+
+    total_ms = (vision_wall_ms or 0) + (llm_ms or 0)
+    metrics = ExtractionMetrics(
+        asr_seconds=0.0,
+        vision_seconds=round((vision_ms_total or 0) / 1000, 2),
+        vision_wall_seconds=round((vision_wall_ms or 0) / 1000, 2),
+        llm_seconds=round((llm_ms or 0) / 1000, 2),
+        total_seconds=round(total_ms / 1000, 2),
+        tokens_in=tokens_in,
+        tokens_out=tokens_out,
+        cost_usd=round(cost, 6),
+        provider=provider_name,
+        model=model,
+        cache_hit=llm_info.get("cache_hit"),
+        cached_tokens_in=llm_info.get("cached_tokens"),
+    )
+
+    return ExtractionResponse(
+        form_id=form_id,
+        form_version=form_version,
+        extracted=merged,
+        confidence={k: 0.8 for k in merged.keys()},
+        spans={},
+        missing_required=missing,
+        metrics=metrics,
+        meta={
+            "images_processed": len(uploads),
+            "ocr_cache_hits": ocr_info["cache_hits"],
+            "duplicate_images": ocr_info["duplicate_images"],
+            "image_bytes_before": ocr_info["image_bytes_before"],
+            "image_bytes_after": ocr_info["image_bytes_after"],
+        },
+    )
+
+
+@app.post(
+    "/process/image",
+    response_model=ExtractionResponse,
+    response_model_exclude_none=True,
+    tags=["AI"],
+)
+async def process_image(
+    request: Request,
+    response: Response,
+    form_id: str = Form(...),
+    form_schema: Optional[str] = Form(None),
+    form_version: Optional[str] = Form(None),
+    use_vision: bool = Form(True),
+    model_preference: Optional[ModelPreference] = Form(None),
+    images: List[UploadFile] = File(...),
+):
+    """OCR + Extraction (schema-agnostic heuristics + LLM merge).
+
+    Flow:
+      1. OCR all uploaded images concurrently (vision provider).
+      2. Build an instruction header + OCR text and call LLM.
+      3. Run generic key:value heuristics (any schema) + medical heuristics (legacy).
+      4. Merge results (LLM > generic > medical > defaults) and validate.
+    """
+    # Normalize/validate schema
+    compiled, form_version = _resolve_schema(form_id, form_schema, form_version)
+
+    # Stream uploads into this request's scratch area for OCR
+    with upload_scratch.session() as scratch:
+        uploads: List[StoredUpload] = []
+        for img in images:
+            uploads.append(
+                await _store_upload(
+                    scratch, img, settings.MAX_IMAGE_UPLOAD_MB, settings.MAX_IMAGE_UPLOAD_TOTAL_MB
+                )
+            )
+        return await _coalesced(
+            request,
+            response,
+            ["image", form_id, form_version, compiled.schema_hash, use_vision, model_preference,
+             [u.sha256 for u in uploads]],
+            lambda is_disconnected: _image_pipeline(
+                compiled, form_id, form_version, uploads, use_vision, model_preference
+            ),
+            scratch=scratch,
         )
-        if m:
-            fields["patientName"] = m.group(2).strip()
-
-    if "patientAge" in fields and fields["patientAge"] is None:
-        m = re.search(r"\bAge\s*:\s*(\d{1,3})\b", text, re.IGNORECASE)
-        if m:
-            fields["patientAge"] = int(m.group(1))
-
-    if "patientGender" in fields and not fields["patientGender"]:
-        m = re.search(r"\b(Gender|Sex)\s*:\s*(Male|Female|M|F)\b", text, re.IGNORECASE)
-        if m:
-            v = m.group(2).lower()
-            fields["patientGender"] = "Female" if v.startswith("f") else "Male"
-
-    if "symptomsDate" in fields and not fields["symptomsDate"]:
-        d = _parse_date_any(text)
-        if d:
-            fields["symptomsDate"] = d
-
-    if "reportedSymptoms" in fields and not fields["reportedSymptoms"]:
-        fields["reportedSymptoms"] = _split_symptoms(text)
-
-    if "followUpRequired" in fields and fields["followUpRequired"] is None:
-        b = _parse_bool(text)
-        if b is not None:
-            fields["followUpRequired"] = b
-
-    return fields
-
-
-# ---------------- Generic (schema-agnostic) heuristic extraction utilities -----------------
-
-
-def _generate_field_aliases(field_id: str) -> List[str]:
-    """Generate alias candidates for fuzzy key matching of arbitrary schema field IDs."""
-    base = field_id.strip()
-    aliases = set()
-    simple = re.sub(r"[^A-Za-z0-9]", "", base).lower()
-    if simple:
-        aliases.add(simple)
-    tokens = re.findall(r"[A-Z]?[a-z]+|[0-9]+", base)
-    if not tokens:
-        tokens = [base]
-    tokens_lower = [t.lower() for t in tokens]
-    spaced = " ".join(tokens_lower)
-    aliases.add(spaced)
-    aliases.add("".join(tokens_lower))
-    if spaced.endswith(" id"):
-        aliases.add(spaced[:-3])
-    if spaced.endswith(" date"):
-        aliases.add(spaced[:-5])
-    if "date" in tokens_lower and "birth" in tokens_lower:
-        aliases.add("dob")
-        aliases.add("birth date")
-    if tokens_lower[-1] == "name" and len(tokens_lower) > 1:
-        aliases.add("name")
-    if tokens_lower[-1] == "id" and len(tokens_lower) > 1:
-        aliases.add("id")
-    return list(aliases)
-
-
-def _best_field_match(
-    key_norm: str, field_alias_map: Dict[str, List[str]]
-) -> Optional[str]:
-    best_id = None
-    best_score = 0
-    for fid, aliases in field_alias_map.items():
-        for a in aliases:
-            if not a:
-                continue
-            score = 0
-            if key_norm == a:
-                score = 100
-            elif a in key_norm or key_norm in a:
-                score = 80
-            else:
-                toks_a = set(a.split())
-                toks_k = set(key_norm.split())
-                if toks_a and toks_k:
-                    overlap = len(toks_a & toks_k) / len(toks_a | toks_k)
-                    score = int(overlap * 60)
-            if score > best_score:
-                best_score = score
-                best_id = fid
-    return best_id if best_score >= 40 else None
-
-
-def generic_heuristic_extract(text: str, form_schema: dict) -> Dict[str, Any]:
-    """Schema-agnostic extraction using fuzzy key:value line parsing."""
-    fields_def = form_schema.get("fields", [])
-    out: Dict[str, Any] = {}
-    for f in fields_def:
-        fid = f.get("id")
-        ftype = (f.get("type") or "").lower()
-        if ftype == "number":
-            out[fid] = None
-        elif ftype == "multiselect":
-            out[fid] = []
-        elif ftype == "boolean":
-            out[fid] = None
-        else:
-            out[fid] = ""
 
-    alias_map: Dict[str, List[str]] = {
-        f.get("id"): _generate_field_aliases(f.get("id"))
-        for f in fields_def
-        if f.get("id")
-    }
-    options_map: Dict[str, List[str]] = {}
-    for f in fields_def:
-        fid = f.get("id")
-        opts = f.get("options") or []
-        if isinstance(opts, list):
-            options_map[fid] = [str(o) for o in opts]
-
-    line_re = re.compile(r"^\s*([A-Za-z0-9 ._/()\-]{1,64})\s*[:=\-]\s*(.+)$")
-    for raw in (text or "").splitlines():
-        raw = raw.strip()
-        if not raw:
-            continue
-        m = line_re.match(raw)
-        if not m:
-            continue
-        key_raw, val_raw = m.group(1).strip(), m.group(2).strip()
-        key_norm = re.sub(r"[^a-z0-9 ]", "", key_raw.lower())
-        fid = _best_field_match(key_norm, alias_map)
-        if not fid:
-            continue
-        fdef = next((fd for fd in fields_def if fd.get("id") == fid), {})
-        ftype = (fdef.get("type") or "").lower()
-        if ftype == "number":
-            mnum = re.search(r"\b\d+(?:\.\d+)?\b", val_raw)
-            if mnum:
-                try:
-                    out[fid] = (
-                        float(mnum.group(0))
-                        if "." in mnum.group(0)
-                        else int(mnum.group(0))
-                    )
-                except Exception:
-                    pass
-        elif ftype == "boolean":
-            b = _parse_bool(val_raw)
-            if b is not None:
-                out[fid] = b
-        elif ftype == "date":
-            d = _parse_date_any(val_raw)
-            if d:
-                out[fid] = d
-        elif ftype == "multiselect":
-            parts = [p.strip() for p in re.split(r"[;,]", val_raw) if p.strip()]
-            opts = options_map.get(fid)
-            if opts:
-                norm_opts = {o.lower(): o for o in opts}
-                matched = []
-                for p in parts:
-                    pl = p.lower()
-                    if pl in norm_opts:
-                        matched.append(norm_opts[pl])
-                    else:
-                        for ol, orig in norm_opts.items():
-                            if pl in ol or ol in pl:
-                                matched.append(orig)
-                                break
-                if matched:
-                    out[fid] = matched
+
+def _build_image_rows(
+    compiled: CompiledSchema,
+    rows_data: List[Any],
+    source_pages: Optional[List[int]] = None,
+) -> Tuple[List[ExtractedRow], set]:
+    """Validate extracted rows into ExtractedRow objects.
+
+    Returns the rows and the ids of every field filled in at least one row.
+    ``source_pages`` (1-based, parallel to ``rows_data``) tags each row with its page.
+    """
+    schema = compiled.schema
+    validator = compiled.validator
+    extracted_rows: List[ExtractedRow] = []
+    all_field_ids: set = set()
+
+    for idx, row_data in enumerate(rows_data):
+        if not isinstance(row_data, dict):
+            continue
+
+        merged_row: Dict[str, Any] = {}
+        for fdef in schema.get("fields", []):
+            fid = fdef.get("id")
+            if fid in row_data and row_data[fid] not in (None, "", [], {}):
+                merged_row[fid] = row_data[fid]
+                all_field_ids.add(fid)
             else:
-                if parts:
-                    out[fid] = parts
-        elif ftype == "select":
-            opts = options_map.get(fid)
-            if opts:
-                vl = val_raw.lower()
-                chosen = None
-                for o in opts:
-                    if o.lower() == vl:
-                        chosen = o
-                        break
-                if not chosen:
-                    for o in opts:
-                        if o.lower() in vl or vl in o.lower():
-                            chosen = o
-                            break
-                out[fid] = chosen if chosen else val_raw
+                merged_row[fid] = row_data.get(fid)
+
+        missing = validator.validate_and_report(merged_row)
+        extracted_rows.append(
+            ExtractedRow(
+                row_index=idx,
+                extracted=merged_row,
+                missing_required=missing,
+                source_page=source_pages[idx] if source_pages is not None else None,
+            )
+        )
+
+    return extracted_rows, all_field_ids
+
+
+async def _image_batch_pipeline(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    uploads: List[StoredUpload],
+    use_vision: bool,
+    model_preference: Optional[ModelPreference],
+    per_page: Optional[bool] = None,
+) -> MultiRowExtractionResponse:
+    """OCR then multi-row LLM extraction for /process/image/batch."""
+    if settings.IMAGE_BATCH_PER_PAGE if per_page is None else per_page:
+        return await _image_pages_pipeline(compiled, form_id, form_version, uploads, use_vision, model_preference)
+
+    # OCR all pages concurrently; texts come back in upload order
+    report_stage("ocr")
+    ocr_texts, all_blocks, vision_ms_total, vision_wall_ms, ocr_info = (
+        await vision_service.ocr_many(
+            [u.source for u in uploads],
+            provider_client=default_openai_provider,
+            digests=[u.sha256 for u in uploads],
+            filenames=[u.filename for u in uploads],
+        )
+    )
+
+    raw_ocr_text = "\n".join(ocr_texts)
+
+    _pick = router.pick(model_preference, need_vision=use_vision)
+    if isinstance(_pick, tuple):
+        provider_name, model_override = _pick
+    else:
+        provider_name = _pick
+        model_override = None
+
+    # Static multi-row header goes in the cacheable prompt prefix, source text last;
+    # long OCR text is extracted in concurrent row chunks
+    data, confidence, llm_ms, tokens_in, tokens_out, cost, model, llm_info = await _extract_rows(
+        provider_name=provider_name,
+        compiled=compiled,
+        text_blob=raw_ocr_text,
+        ocr_blocks=all_blocks,
+        model_override=model_override,
+    )
+
+    # Parse the LLM response for multi-row format
+    rows_data = _rows_from_llm(data)
+
+    # Validate each row and build ExtractedRow objects
+    extracted_rows, all_field_ids = _build_image_rows(compiled, rows_data)
+
+    # Build top-level confidence (same for all fields)
+    field_confidence: Dict[str, float] = {fid: 0.8 for fid in all_field_ids}
+
+    total_ms = (vision_wall_ms or 0) + (llm_ms or 0)
+    metrics = ExtractionMetrics(
+        asr_seconds=0.0,
+        vision_seconds=round((vision_ms_total or 0) / 1000, 2),
+        vision_wall_seconds=round((vision_wall_ms or 0) / 1000, 2),
+        llm_seconds=round((llm_ms or 0) / 1000, 2),
+        total_seconds=round(total_ms / 1000, 2),
+        tokens_in=tokens_in,
+        tokens_out=tokens_out,
+        cost_usd=round(cost, 6),
+        provider=provider_name,
+        model=model,
+        cache_hit=llm_info.get("cache_hit"),
+        cached_tokens_in=llm_info.get("cached_tokens"),
+    )
+
+    return MultiRowExtractionResponse(
+        form_id=form_id,
+        form_version=form_version,
+        total_rows=len(extracted_rows),
+        rows=extracted_rows,
+        confidence=field_confidence if field_confidence else None,
+        metrics=metrics,
+        meta={
+            "raw_ocr_length": len(raw_ocr_text),
+            "row_chunks": llm_info.get("row_chunks"),
+            "images_processed": len(uploads),
+            "ocr_cache_hits": ocr_info["cache_hits"],
+            "duplicate_images": ocr_info["duplicate_images"],
+            "image_bytes_before": ocr_info["image_bytes_before"],
+            "image_bytes_after": ocr_info["image_bytes_after"],
+        },
+    )
+
+
+async def _image_pages_pipeline(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    uploads: List[StoredUpload],
+    use_vision: bool,
+    model_preference: Optional[ModelPreference],
+) -> MultiRowExtractionResponse:
+    """Per-page variant of the /process/image/batch pipeline.
+
+    Every page is OCR'd and row-extracted on its own as soon as its text is ready,
+    so extraction of the first pages overlaps OCR of the later ones. Rows are then
+    merged across page breaks (continuation rows stitched, repeated heading rows
+    dropped) and tagged with their source page.
+    """
+    _pick = router.pick(model_preference, need_vision=use_vision)
+    if isinstance(_pick, tuple):
+        provider_name, model_override = _pick
+    else:
+        provider_name = _pick
+        model_override = None
+
+    # Byte-identical pages are read and extracted once
+    first_seen: Dict[str, int] = {}
+    for i, u in enumerate(uploads):
+        first_seen.setdefault(u.sha256, i)
+    pages = sorted(first_seen.values())
+    ocr_slots = asyncio.Semaphore(max(1, settings.VISION_MAX_CONCURRENCY))
+
+    async def _page(i: int):
+        upload = uploads[i]
+        async with ocr_slots:
+            texts, blocks, vision_ms, _, info = await vision_service.ocr_many(
+                [upload.source],
+                provider_client=default_openai_provider,
+                digests=[upload.sha256],
+                filenames=[upload.filename],
+            )
+        text = texts[0] if texts else ""
+        if not text.strip():
+            return text, None, vision_ms, info
+        result = await _extract_rows(
+            provider_name=provider_name,
+            compiled=compiled,
+            text_blob=text,
+            ocr_blocks=blocks,
+            model_override=model_override,
+        )
+        return text, result, vision_ms, info
+
+    report_stage("ocr")
+    with timer() as t_wall:
+        outcomes = await asyncio.gather(*(_page(i) for i in pages))
+        wall_ms = t_wall()
+
+    extracted = [r for _, r, _, _ in outcomes if r is not None]
+    merged, merge_counts = merge_page_rows(
+        [_rows_from_llm(r[0]) if r is not None else [] for _, r, _, _ in outcomes],
+        compiled.field_ids,
+        compiled.required_ids,
+        compiled.alias_map,
+    )
+
+    extracted_rows, all_field_ids = _build_image_rows(
+        compiled,
+        [row_data for _, row_data in merged],
+        source_pages=[pages[page] + 1 for page, _ in merged],
+    )
+
+    field_confidence: Dict[str, float] = {fid: 0.8 for fid in all_field_ids}
+
+    vision_ms_total = sum(ms for _, _, ms, _ in outcomes)
+    llm_ms = sum(r[2] or 0 for r in extracted)
+    cost = sum(r[5] for r in extracted)
+    metrics = ExtractionMetrics(
+        asr_seconds=0.0,
+        vision_seconds=round(vision_ms_total / 1000, 2),
+        llm_seconds=round(llm_ms / 1000, 2),
+        # OCR and extraction overlap, so the total is the wall-clock time of the whole run
+        total_seconds=round(wall_ms / 1000, 2),
+        tokens_in=sum(r[3] for r in extracted),
+        tokens_out=sum(r[4] for r in extracted),
+        cost_usd=round(cost, 6),
+        provider=provider_name,
+        model=extracted[0][6] if extracted else None,
+        cache_hit=all(r[7].get("cache_hit") for r in extracted) if extracted else None,
+        cached_tokens_in=sum(r[7].get("cached_tokens") or 0 for r in extracted),
+    )
+
+    sent = [info for _, _, _, info in outcomes if info["cache_hits"] == 0]
+    return MultiRowExtractionResponse(
+        form_id=form_id,
+        form_version=form_version,
+        total_rows=len(extracted_rows),
+        rows=extracted_rows,
+        confidence=field_confidence if field_confidence else None,
+        metrics=metrics,
+        meta={
+            "per_page": True,
+            "raw_ocr_length": sum(len(text) for text, _, _, _ in outcomes),
+            "images_processed": len(uploads),
+            "pages_extracted": len(extracted),
+            "ocr_cache_hits": len(outcomes) - len(sent),
+            "duplicate_images": len(uploads) - len(pages),
+            "image_bytes_before": sum(i["image_bytes_before"] for i in sent),
+            "image_bytes_after": sum(i["image_bytes_after"] for i in sent),
+            **merge_counts,
+        },
+    )
+
+
+@app.post(
+    "/process/image/batch",
+    response_model=MultiRowExtractionResponse,
+    response_model_exclude_none=True,
+    tags=["AI"],
+)
+async def process_image_batch(
+    request: Request,
+    response: Response,
+    form_id: str = Form(...),
+    form_schema: Optional[str] = Form(None),
+    form_version: Optional[str] = Form(None),
+    use_vision: bool = Form(True),
+    model_preference: Optional[ModelPreference] = Form(None),
+    per_page: Optional[bool] = Form(
+        None, description="Extract each page as soon as it is OCR'd and merge rows across pages (default: IMAGE_BATCH_PER_PAGE)"
+    ),
+    images: List[UploadFile] = File(...),
+    stream: Optional[StreamFormat] = Query(None, description="Stream rows as they are extracted: ndjson or sse"),
+):
+    """OCR + Multi-Row Extraction for documents with multiple entries/rows.
+
+    Use this endpoint when the image contains a TABLE, LOG, or REGISTER with
+    multiple entries/records that should be extracted as an array.
+
+    Flow:
+      1. OCR all uploaded images concurrently (vision provider).
+      2. Build a multi-row instruction header + OCR text and call LLM.
+      3. Parse the LLM response to extract an array of rows.
+      4. Validate each row against the schema.
+
+    With per_page, steps 1-3 run for each page independently and in parallel;
+    rows continuing across a page break are stitched, repeated heading rows are
+    dropped and every row carries its source_page.
+
+    With stream ("ndjson" or "sse" query parameter) rows are streamed as in
+    /process/text/batch; streamed requests always use the single-document flow.
+
+    Returns:
+      - total_rows: Number of rows/entries extracted
+      - rows: Array of extracted entries, each with its own fields and missing_required
+      - metrics: Timing/cost/model metadata
+    """
+    # Normalize/validate schema
+    compiled, form_version = _resolve_schema(form_id, form_schema, form_version)
+
+    # Stream uploads into this request's scratch area for OCR
+    with upload_scratch.session() as scratch:
+        uploads: List[StoredUpload] = []
+        for img in images:
+            uploads.append(
+                await _store_upload(
+                    scratch, img, settings.MAX_IMAGE_UPLOAD_MB, settings.MAX_IMAGE_UPLOAD_TOTAL_MB
+                )
+            )
+        fmt = _stream_format(request, stream)
+        if fmt is not None:
+            # Per-page rows are only final after the cross-page merge, so streams read the pages as one document
+            return _streamed(
+                request,
+                fmt,
+                compiled,
+                lambda is_disconnected: _image_batch_pipeline(
+                    compiled, form_id, form_version, uploads, use_vision, model_preference, False
+                ),
+                scratch=scratch,
+            )
+        return await _coalesced(
+            request,
+            response,
+            ["image_batch", form_id, form_version, compiled.schema_hash, use_vision, model_preference, per_page,
+             [u.sha256 for u in uploads]],
+            lambda is_disconnected: _image_batch_pipeline(
+                compiled, form_id, form_version, uploads, use_vision, model_preference, per_page
+            ),
+            scratch=scratch,
+        )
+
+
+def _sum_metrics(items: List[ExtractionMetrics], wall_ms: int) -> ExtractionMetrics:
+    """Add up per-document metrics; total_seconds is the bulk request's wall-clock time."""
+
+    def total(attr: str, digits: Optional[int] = None):
+        vals = [getattr(m, attr) for m in items if getattr(m, attr) is not None]
+        if not vals:
+            return None
+        return round(sum(vals), digits) if digits is not None else sum(vals)
+
+    providers = {m.provider for m in items if m.provider}
+    models = {m.model for m in items if m.model}
+    return ExtractionMetrics(
+        asr_seconds=total("asr_seconds", 2),
+        vision_seconds=total("vision_seconds", 2),
+        llm_seconds=total("llm_seconds", 2),
+        total_seconds=round(wall_ms / 1000, 2),
+        tokens_in=total("tokens_in"),
+        tokens_out=total("tokens_out"),
+        cached_tokens_in=total("cached_tokens_in"),
+        cost_usd=total("cost_usd", 6),
+        provider=providers.pop() if len(providers) == 1 else None,
+        model=models.pop() if len(models) == 1 else None,
+    )
+
+
+async def _bulk_item(index: int, item_id: Optional[str], work: Awaitable[ExtractionResponse]) -> BulkItemResult:
+    try:
+        result = await work
+    except ASRCancelled:
+        raise
+    except HTTPException as e:
+        return BulkItemResult(index=index, id=item_id, ok=False, error=str(e.detail), status_code=e.status_code)
+    except Exception as e:
+        return BulkItemResult(index=index, id=item_id, ok=False, error=f"{type(e).__name__}: {e}", status_code=500)
+    return BulkItemResult(index=index, id=item_id, ok=True, result=result)
+
+
+async def _run_bulk(
+    form_id: str,
+    form_version: Optional[str],
+    jobs: List[Tuple[Optional[str], Callable[[], Awaitable[ExtractionResponse]]]],
+    max_concurrency: Optional[int],
+) -> BulkResponse:
+    """Run independent document pipelines with at most `max_concurrency` in flight.
+
+    A failing document becomes an error entry instead of failing the request.
+    Provider calls made by the pipelines are additionally paced per provider by
+    PROVIDER_RPM_LIMITS / PROVIDER_MAX_CONCURRENCY.
+    """
+    limit = max(1, min(max_concurrency or settings.BULK_CONCURRENCY, settings.BULK_CONCURRENCY))
+    sem = asyncio.Semaphore(limit)
+
+    async def _one(index: int, item_id: Optional[str], start):
+        async with sem:
+            return await _bulk_item(index, item_id, start())
+
+    with timer() as t:
+        results = await asyncio.gather(*(_one(i, item_id, start) for i, (item_id, start) in enumerate(jobs)))
+        wall_ms = t()
+
+    done = [r.result for r in results if r.ok]
+    return BulkResponse(
+        form_id=form_id,
+        form_version=form_version,
+        total=len(results),
+        succeeded=len(done),
+        failed=len(results) - len(done),
+        results=results,
+        metrics=_sum_metrics([r.metrics for r in done if r.metrics], wall_ms),
+        meta={
+            "concurrency": limit,
+            "llm_cache_hits": sum(1 for r in done if r.metrics and r.metrics.cache_hit),
+        },
+    )
+
+
+def _check_bulk_size(count: int) -> None:
+    if count == 0:
+        raise HTTPException(status_code=422, detail="at least one document is required")
+    if count > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"{count} documents exceed the limit of {settings.BULK_MAX_ITEMS} per bulk request"
+        )
+
+
+@app.post(
+    "/process/bulk",
+    response_model=BulkResponse,
+    response_model_exclude_none=True,
+    tags=["AI"],
+)
+async def process_bulk(req: BulkTextRequest):
+    """Extract many independent text documents against one schema.
+
+    The schema is resolved and compiled once for the whole batch. Documents run
+    concurrently (up to `max_concurrency`, capped by BULK_CONCURRENCY) through the
+    same pipeline as /process/text. Each entry in `results` holds that document's
+    ExtractionResponse or its error; `metrics` sums tokens and cost over all
+    documents, with `total_seconds` being the wall-clock time of the batch.
+    """
+    _check_bulk_size(len(req.items))
+    compiled, form_version = _resolve_schema(req.form_id, req.form_schema, req.form_version)
+    jobs = [
+        (
+            item.id,
+            functools.partial(_text_pipeline, compiled, req.form_id, form_version, item.text, req.model_preference),
+        )
+        for item in req.items
+    ]
+    return await _run_bulk(req.form_id, form_version, jobs, req.max_concurrency)
+
+
+_AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".ogg", ".oga", ".opus", ".flac", ".aac", ".amr", ".webm", ".3gp")
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".heic", ".bmp", ".tif", ".tiff", ".gif")
+
+
+def _document_kind(upload: UploadFile) -> Optional[str]:
+    """Classify an uploaded document as "image", "audio" or "text" (None if unknown)."""
+    ctype = (upload.content_type or "").lower()
+    name = (upload.filename or "").lower()
+    if ctype.startswith("image/") or name.endswith(_IMAGE_EXTENSIONS):
+        return "image"
+    if ctype.startswith(("audio/", "video/")) or name.endswith(_AUDIO_EXTENSIONS):
+        return "audio"
+    if ctype.startswith("text/") or name.endswith((".txt", ".text")):
+        return "text"
+    return None
+
+
+async def _text_document_pipeline(
+    compiled: CompiledSchema,
+    form_id: str,
+    form_version: Optional[str],
+    upload: StoredUpload,
+    preferred: Optional[ModelPreference],
+) -> ExtractionResponse:
+    def read() -> str:
+        with upload.open() as f:
+            return f.read().decode("utf-8", errors="replace")
+
+    text = await asyncio.to_thread(read)
+    return await _text_pipeline(compiled, form_id, form_version, text, preferred)
+
+
+@app.post(
+    "/process/bulk/files",
+    response_model=BulkResponse,
+    response_model_exclude_none=True,
+    tags=["AI"],
+)
+async def process_bulk_files(
+    request: Request,
+    form_id: str = Form(...),
+    form_schema: Optional[str] = Form(None),
+    form_version: Optional[str] = Form(None),
+    model_preference: Optional[ModelPreference] = Form(None),
+    language: LanguagePreference = Form(LanguagePreference.English, description="ASR language for audio documents"),
+    use_vision: bool = Form(True),
+    chunk_audio: Optional[bool] = Form(None),
+    max_concurrency: Optional[int] = Form(None),
+    files: List[UploadFile] = File(...),
+):
+    """Extract many independent uploaded documents against one schema.
+
+    Every file is its own document, routed by type: images go through the
+    /process/image pipeline, audio through /process/audio and plain-text files
+    through /process/text. Results come back in upload order with per-document
+    errors (unsupported types are reported as 415 entries); see /process/bulk.
+    """
+    _check_bulk_size(len(files))
+    compiled, form_version = _resolve_schema(form_id, form_schema, form_version)
+    # Plain-text documents share the per-image size limit
+    limits = {"image": settings.MAX_IMAGE_UPLOAD_MB, "audio": settings.MAX_AUDIO_UPLOAD_MB, "text": settings.MAX_IMAGE_UPLOAD_MB}
+
+    with upload_scratch.session() as scratch:
+        jobs: List[Tuple[Optional[str], Callable[[], Awaitable[ExtractionResponse]]]] = []
+        for f in files:
+            kind = _document_kind(f)
+            if kind is None:
+                await f.close()
+                detail = f"unsupported document type {f.content_type or 'unknown'} ({f.filename})"
+                jobs.append((f.filename, functools.partial(_unsupported_document, detail)))
+                continue
+            # Spooled to disk: a bulk run holds its documents for its whole duration
+            doc = await _store_upload(scratch, f, limits[kind], settings.MAX_BULK_UPLOAD_TOTAL_MB, in_memory=False)
+            if kind == "image":
+                start = functools.partial(
+                    _image_pipeline, compiled, form_id, form_version, [doc], use_vision, model_preference
+                )
+            elif kind == "audio":
+                start = functools.partial(
+                    _audio_pipeline, compiled, form_id, form_version, doc, language, model_preference, chunk_audio,
+                    request.is_disconnected,
+                )
             else:
-                out[fid] = val_raw
-        else:
-            out[fid] = val_raw
-    return out
+                start = functools.partial(_text_document_pipeline, compiled, form_id, form_version, doc, model_preference)
+            jobs.append((f.filename, start))
+        return await _run_bulk(form_id, form_version, jobs, max_concurrency)
+
+
+async def _unsupported_document(detail: str) -> ExtractionResponse:
+    raise HTTPException(status_code=415, detail=detail)
+
+
+job_store = JobStore(job_db_path(settings.JOBS_DATA_DIR)) if settings.JOBS_ENABLED else None
+
+
+def _job_uploads(job: Job) -> List[StoredUpload]:
+    return [StoredUpload(**f) for f in job.params.get("files", [])]
+
+
+def _job_pipeline(job: Job) -> Awaitable[Any]:
+    p = job.params
+    compiled = compile_schema(p["form_schema"])
+    args = (compiled, p["form_id"], p.get("form_version"))
+    preferred = ModelPreference(p["model_preference"]) if p.get("model_preference") else None
+    if job.kind == "text":
+        return _text_pipeline(*args, p["text"], preferred)
+    if job.kind == "text_batch":
+        return _text_batch_pipeline(*args, p["text"], preferred, p.get("locale"))
+    if job.kind in ("audio", "audio_batch"):
+        pipeline = _audio_pipeline if job.kind == "audio" else _audio_batch_pipeline
+        (audio,) = _job_uploads(job)
+        return pipeline(*args, audio, LanguagePreference(p["language"]), preferred, p.get("chunk_audio"))
+    if job.kind == "image":
+        return _image_pipeline(*args, _job_uploads(job), p.get("use_vision", True), preferred)
+    return _image_batch_pipeline(*args, _job_uploads(job), p.get("use_vision", True), preferred, p.get("per_page"))
+
+
+async def _run_job(job: Job) -> Dict[str, Any]:
+    """Job handler: run the stored request through its /process/* pipeline."""
+    try:
+        result = await _job_pipeline(job)
+    except HTTPException as e:
+        # Client errors (bad language, schema, ...) will not succeed on retry
+        raise JobError(str(e.detail), retryable=e.status_code >= 500)
+    return result.model_dump(exclude_none=True)
+
+
+_JOB_KINDS = ("text", "text_batch", "audio", "audio_batch", "image", "image_batch")
+job_runner = (
+    JobRunner(
+        job_store,
+        {kind: _run_job for kind in _JOB_KINDS},
+        workers=settings.JOBS_WORKERS,
+        retry_backoff_seconds=settings.JOBS_RETRY_BACKOFF_SECONDS,
+        retention_seconds=settings.JOBS_RETENTION_SECONDS,
+        files_root=job_files_root(settings.JOBS_DATA_DIR),
+        callback_allowed_hosts=settings.JOBS_CALLBACK_ALLOWED_HOSTS,
+    )
+    if job_store is not None
+    else None
+)
+
+
+@app.on_event("startup")
+async def _start_job_workers() -> None:
+    if job_runner is not None:
+        job_store.open()
+        job_runner.start()
+
+
+@app.on_event("shutdown")
+async def _stop_job_workers() -> None:
+    if job_runner is not None:
+        await job_runner.stop()
+
+
+def _job_info(job: Job) -> JobInfo:
+    return JobInfo(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        progress=job.progress,
+        error=job.error,
+        callback_url=job.callback_url,
+        callback_status=job.callback_status,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        next_attempt_at=job.next_attempt_at if job.status == "queued" and job.attempts else None,
+        result_url=f"/jobs/{job.id}/result" if job.status == "succeeded" else None,
+    )
+
+
+def _jobs() -> JobStore:
+    if job_store is None:
+        raise HTTPException(status_code=404, detail="asynchronous jobs are disabled (JOBS_ENABLED=false)")
+    return job_store
+
+
+def _check_callback(callback_url: Optional[str]) -> None:
+    """422 for a callback_url results must not be sent to (see check_callback_url)."""
+    if callback_url:
+        try:
+            check_callback_url(callback_url, settings.JOBS_CALLBACK_ALLOWED_HOSTS)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+
+def _submit_job(
+    response: Response,
+    kind: str,
+    params: Dict[str, Any],
+    callback_url: Optional[str],
+    max_attempts: Optional[int],
+    files_dir: Optional[str] = None,
+    job_id: Optional[str] = None,
+    callback_checked: bool = False,
+) -> JobInfo:
+    """Queue a job and answer 202 with its status and a Location header.
+
+    Poll GET /jobs/{job_id} for per-stage progress and fetch the response from
+    GET /jobs/{job_id}/result. Failed attempts are retried with backoff up to
+    `max_attempts`; `callback_url` receives the final status as JSON.
+    """
+    if not callback_checked:
+        _check_callback(callback_url)
+    job = _jobs().create(
+        kind,
+        params,
+        max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        files_dir=files_dir,
+        callback_url=callback_url,
+        job_id=job_id,
+    )
+    job_runner.notify()
+    response.status_code = 202
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return _job_info(job)
+
+
+def _job_params(compiled: CompiledSchema, form_id: str, form_version: Optional[str], **extra: Any) -> Dict[str, Any]:
+    # The resolved schema is stored with the job so it runs even if the registry changes
+    params = {"form_id": form_id, "form_version": form_version, "form_schema": compiled.schema}
+    for key, value in extra.items():
+        params[key] = value.value if isinstance(value, Enum) else value
+    return params
+
+
+async def _submit_upload_job(
+    response: Response,
+    kind: str,
+    files: List[UploadFile],
+    max_mb: int,
+    max_total_mb: Optional[int],
+    params: Dict[str, Any],
+    callback_url: Optional[str],
+    max_attempts: Optional[int],
+) -> JobInfo:
+    """Store uploads in the job's own directory (kept until it finishes) and queue the job."""
+    _jobs()
+    await asyncio.to_thread(_check_callback, callback_url)
+    job_id = uuid.uuid4().hex
+    scratch = ScratchSession(job_files_root(settings.JOBS_DATA_DIR), job_id)
+    try:
+        stored = [await _store_upload(scratch, f, max_mb, max_total_mb, in_memory=False) for f in files]
+        params["files"] = [
+            {"filename": u.filename, "size": u.size, "sha256": u.sha256, "path": u.path} for u in stored
+        ]
+        return _submit_job(
+            response, kind, params, callback_url, max_attempts, files_dir=scratch.dir, job_id=job_id,
+            callback_checked=True,
+        )
+    except BaseException:
+        scratch.release()
+        raise
+
+
+@app.post("/jobs/text", response_model=JobInfo, response_model_exclude_none=True, status_code=202, tags=["Jobs"])
+def submit_text_job(
+    req: TextRequest,
+    response: Response,
+    callback_url: Optional[str] = Query(None),
+    max_attempts: Optional[int] = Query(None, ge=1),
+):
+    """Queue a /process/text extraction; returns 202 with the job status."""
+    compiled, form_version = _resolve_schema(req.form_id, req.form_schema, req.form_version)
+    params = _job_params(compiled, req.form_id, form_version, text=req.text, model_preference=req.model_preference)
+    return _submit_job(response, "text", params, callback_url, max_attempts)
+
+
+@app.post("/jobs/text/batch", response_model=JobInfo, response_model_exclude_none=True, status_code=202, tags=["Jobs"])
+def submit_text_batch_job(
+    req: TextBatchRequest,
+    response: Response,
+    callback_url: Optional[str] = Query(None),
+    max_attempts: Optional[int] = Query(None, ge=1),
+):
+    """Queue a /process/text/batch extraction; returns 202 with the job status."""
+    compiled, form_version = _resolve_schema(req.form_id, req.form_schema, req.form_version)
+    params = _job_params(
+        compiled, req.form_id, form_version, text=req.text, model_preference=req.model_preference, locale=req.locale
+    )
+    return _submit_job(response, "text_batch", params, callback_url, max_attempts)
+
+
+async def _submit_audio_job(
+    kind: str,
+    response: Response,
+    form_id: str,
+    form_schema: Optional[str],
+    form_version: Optional[str],
+    language: LanguagePreference,
+    model_preference: Optional[ModelPreference],
+    chunk_audio: Optional[bool],
+    audio_file: UploadFile,
+    callback_url: Optional[str],
+    max_attempts: Optional[int],
+) -> JobInfo:
+    compiled, form_version = _resolve_schema(form_id, form_schema, form_version)
+    params = _job_params(
+        compiled, form_id, form_version, language=language, model_preference=model_preference, chunk_audio=chunk_audio
+    )
+    return await _submit_upload_job(
+        response, kind, [audio_file], settings.MAX_AUDIO_UPLOAD_MB, None, params, callback_url, max_attempts
+    )
+
+
+@app.post("/jobs/audio", response_model=JobInfo, response_model_exclude_none=True, status_code=202, tags=["Jobs"])
+async def submit_audio_job(
+    response: Response,
+    form_id: str = Form(...),
+    form_schema: Optional[str] = Form(None),
+    form_version: Optional[str] = Form(None),
+    language: LanguagePreference = Form(LanguagePreference.English),
+    model_preference: Optional[ModelPreference] = Form(None),
+    chunk_audio: Optional[bool] = Form(None),
+    callback_url: Optional[str] = Form(None),
+    max_attempts: Optional[int] = Form(None, ge=1),
+    audio_file: UploadFile = File(...),
+):
+    """Queue a /process/audio extraction; returns 202 with the job status."""
+    return await _submit_audio_job(
+        "audio", response, form_id, form_schema, form_version, language, model_preference, chunk_audio,
+        audio_file, callback_url, max_attempts,
+    )
+
+
+@app.post("/jobs/audio/batch", response_model=JobInfo, response_model_exclude_none=True, status_code=202, tags=["Jobs"])
+async def submit_audio_batch_job(
+    response: Response,
+    form_id: str = Form(...),
+    form_schema: Optional[str] = Form(None),
+    form_version: Optional[str] = Form(None),
+    language: LanguagePreference = Form(LanguagePreference.English),
+    model_preference: Optional[ModelPreference] = Form(None),
+    chunk_audio: Optional[bool] = Form(None),
+    callback_url: Optional[str] = Form(None),
+    max_attempts: Optional[int] = Form(None, ge=1),
+    audio_file: UploadFile = File(...),
+):
+    """Queue a /process/audio/batch extraction; returns 202 with the job status."""
+    return await _submit_audio_job(
+        "audio_batch", response, form_id, form_schema, form_version, language, model_preference, chunk_audio,
+        audio_file, callback_url, max_attempts,
+    )
+
+
+async def _submit_image_job(
+    kind: str,
+    response: Response,
+    form_id: str,
+    form_schema: Optional[str],
+    form_version: Optional[str],
+    use_vision: bool,
+    model_preference: Optional[ModelPreference],
+    images: List[UploadFile],
+    callback_url: Optional[str],
+    max_attempts: Optional[int],
+    **extra: Any,
+) -> JobInfo:
+    compiled, form_version = _resolve_schema(form_id, form_schema, form_version)
+    params = _job_params(
+        compiled, form_id, form_version, use_vision=use_vision, model_preference=model_preference, **extra
+    )
+    return await _submit_upload_job(
+        response, kind, images, settings.MAX_IMAGE_UPLOAD_MB, settings.MAX_IMAGE_UPLOAD_TOTAL_MB, params,
+        callback_url, max_attempts,
+    )
+
+
+@app.post("/jobs/image", response_model=JobInfo, response_model_exclude_none=True, status_code=202, tags=["Jobs"])
+async def submit_image_job(
+    response: Response,
+    form_id: str = Form(...),
+    form_schema: Optional[str] = Form(None),
+    form_version: Optional[str] = Form(None),
+    use_vision: bool = Form(True),
+    model_preference: Optional[ModelPreference] = Form(None),
+    callback_url: Optional[str] = Form(None),
+    max_attempts: Optional[int] = Form(None, ge=1),
+    images: List[UploadFile] = File(...),
+):
+    """Queue a /process/image extraction; returns 202 with the job status."""
+    return await _submit_image_job(
+        "image", response, form_id, form_schema, form_version, use_vision, model_preference, images,
+        callback_url, max_attempts,
+    )
+
+
+@app.post("/jobs/image/batch", response_model=JobInfo, response_model_exclude_none=True, status_code=202, tags=["Jobs"])
+async def submit_image_batch_job(
+    response: Response,
+    form_id: str = Form(...),
+    form_schema: Optional[str] = Form(None),
+    form_version: Optional[str] = Form(None),
+    use_vision: bool = Form(True),
+    model_preference: Optional[ModelPreference] = Form(None),
+    per_page: Optional[bool] = Form(None),
+    callback_url: Optional[str] = Form(None),
+    max_attempts: Optional[int] = Form(None, ge=1),
+    images: List[UploadFile] = File(...),
+):
+    """Queue a /process/image/batch extraction; returns 202 with the job status."""
+    return await _submit_image_job(
+        "image_batch", response, form_id, form_schema, form_version, use_vision, model_preference, images,
+        callback_url, max_attempts, per_page=per_page,
+    )
+
+
+def _get_job(job_id: str) -> Job:
+    job = _jobs().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job '{job_id}' not found")
+    return job
+
+
+@app.get("/jobs/{job_id}", response_model=JobInfo, response_model_exclude_none=True, tags=["Jobs"])
+def get_job(job_id: str):
+    """Job status with per-stage progress (upload, asr/ocr, translation, llm, validation)."""
+    return _job_info(_get_job(job_id))
+
+
+@app.get("/jobs/{job_id}/result", tags=["Jobs"])
+def get_job_result(job_id: str):
+    """The finished job's ExtractionResponse / MultiRowExtractionResponse; 409 until it succeeded."""
+    job = _get_job(job_id)
+    if job.status != "succeeded":
+        detail = f"job is {job.status}" + (f": {job.error}" if job.error else "")
+        raise HTTPException(status_code=409, detail=detail)
+    return job.result
+
+
+@app.delete("/jobs/{job_id}", response_model=JobInfo, response_model_exclude_none=True, tags=["Jobs"])
+def cancel_job(job_id: str):
+    """Cancel a job that has not started running yet (409 otherwise)."""
+    job = _get_job(job_id)
+    if not _jobs().cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"job is {job.status} and can no longer be cancelled")
+    if job.files_dir:
+        shutil.rmtree(job.files_dir, ignore_errors=True)
+    return _job_info(_get_job(job_id))
+
+
+def _finalize_deferred(item: BatchItem, output: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a batch output line into the stored /process/text response, priced at batch rates."""
+    p = item.payload
+    compiled = compile_schema(p["form_schema"])
+    content = output["content"]
+    data = safe_json_parse(content)
+    usage = output.get("usage") or {}
+    tokens_in = usage.get("prompt_tokens") or estimate_tokens(item.prompt)
+    tokens_out = usage.get("completion_tokens") or estimate_tokens(content)
+    cached_tokens = min(usage.get("cached_tokens") or 0, tokens_in)
+    model = output.get("model") or item.model
+    cost = router.estimate_cost(item.provider, model, tokens_in, tokens_out, cached_tokens) * settings.BATCH_PRICE_RATIO
+    response = _text_response(
+        compiled, p["form_id"], p.get("form_version"), p["text"], data,
+        {k: 0.8 for k in data.keys()} if isinstance(data, dict) else {},
+        None, tokens_in, tokens_out, cost, item.provider, model,
+        {"cache_hit": False, "cached_tokens": cached_tokens},
+        meta={"deferred": True, "batch_id": item.batch_id},
+    )
+    return response.model_dump(exclude_none=True)
+
+
+deferred_extractor: Optional[DeferredExtractor] = None
+if settings.BATCH_MODE_ENABLED:
+    if settings.BATCH_BACKEND != "local" and settings.BATCH_DB_PATH in (None, "", ":memory:"):
+        # Submitted (and billed) provider batches could not be matched back to their items after a restart
+        raise RuntimeError("BATCH_BACKEND=openai needs a persistent BATCH_DB_PATH, e.g. cache/batches.sqlite3")
+    deferred_extractor = DeferredExtractor(
+        BatchStore(settings.BATCH_DB_PATH),
+        LocalBatchBackend(router.providers)
+        if settings.BATCH_BACKEND == "local"
+        else OpenAIBatchBackend(router.providers.get, settings.BATCH_COMPLETION_WINDOW),
+        _finalize_deferred,
+        max_per_file=settings.BATCH_MAX_REQUESTS_PER_FILE,
+        flush_seconds=settings.BATCH_FLUSH_SECONDS,
+        poll_seconds=settings.BATCH_POLL_SECONDS,
+    )
+
+
+@app.on_event("startup")
+async def _start_batch_reconciler() -> None:
+    if deferred_extractor is not None:
+        deferred_extractor.start()
+
+
+@app.on_event("shutdown")
+async def _stop_batch_reconciler() -> None:
+    if deferred_extractor is not None:
+        await deferred_extractor.stop()
+
+
+def _deferred() -> DeferredExtractor:
+    if deferred_extractor is None:
+        raise HTTPException(status_code=404, detail="batch mode is disabled (BATCH_MODE_ENABLED=false)")
+    return deferred_extractor
+
+
+def _deferred_item(item: BatchItem, index: Optional[int] = None) -> DeferredItem:
+    return DeferredItem(
+        index=index,
+        id=item.payload.get("id"),
+        custom_id=item.custom_id,
+        status=item.status,
+        batch_id=item.batch_id,
+        error=item.error,
+        result=item.result,
+    )
+
+
+@app.post(
+    "/batch/text",
+    response_model=DeferredSubmission,
+    response_model_exclude_none=True,
+    status_code=202,
+    tags=["Batch"],
+)
+def submit_deferred_text(req: BulkTextRequest):
+    """Queue text documents for offline extraction through the provider Batch API.
+
+    For backlogs that do not need an answer now: prompts are collected into batch
+    files (one per provider and model) and billed at batch rates. Each document gets
+    a `custom_id`; GET /batch/items/{custom_id} returns its ExtractionResponse once
+    the batch has been reconciled, usually within BATCH_COMPLETION_WINDOW.
+    """
+    deferred = _deferred()
+    _check_bulk_size(len(req.items))
+    compiled, form_version = _resolve_schema(req.form_id, req.form_schema, req.form_version)
+    provider_name, model_override = router.pick(req.model_preference, need_vision=False)
+    if not deferred.backend.available(provider_name):
+        raise HTTPException(
+            status_code=503, detail=f"no batch-capable client configured for provider '{provider_name}'"
+        )
+    model = model_override or router.providers[provider_name].model
+    queued = []
+    for index, doc in enumerate(req.items):
+        instructions, prompt = router.build_prompt_parts(compiled.schema, doc.text)
+        payload = {
+            "id": doc.id,
+            "form_id": req.form_id,
+            "form_version": form_version,
+            "form_schema": compiled.schema,
+            "text": doc.text,
+        }
+        item = deferred.enqueue(provider_name, model, instructions, prompt, payload)
+        queued.append(_deferred_item(item, index))
+    return DeferredSubmission(form_id=req.form_id, form_version=form_version, items=queued)
+
+
+@app.post("/batch/flush", tags=["Batch"])
+async def flush_deferred():
+    """Submit every pending deferred item now instead of waiting for BATCH_FLUSH_SECONDS."""
+    deferred = _deferred()
+    try:
+        submitted = await deferred.tick(force_flush=True)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"batch backend error: {type(e).__name__}: {e}")
+    return {"submitted_batches": submitted}
+
+
+@app.get("/batch/items/{custom_id}", response_model=DeferredItem, response_model_exclude_none=True, tags=["Batch"])
+def get_deferred_item(custom_id: str):
+    """Status of one deferred document, with its ExtractionResponse once completed."""
+    item = _deferred().store.get(custom_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"deferred item '{custom_id}' not found")
+    return _deferred_item(item)
 
 
 # keep only one clean version of this helper
@@ -19,16 +19,24 @@ class LanguagePreference(str, Enum):
     Yoruba = "Yoruba"
 
 
+class StreamFormat(str, Enum):
+    ndjson = "ndjson"
+    sse = "sse"
+
+
 class ExtractionMetrics(BaseModel):
     asr_seconds: Optional[float] = None
-    vision_seconds: Optional[float] = None
+    vision_seconds: Optional[float] = None  # summed across images
+    vision_wall_seconds: Optional[float] = None  # wall-clock for concurrent OCR
     llm_seconds: Optional[float] = None
     total_seconds: Optional[float] = None
     tokens_in: Optional[int] = None
     tokens_out: Optional[int] = None
+    cached_tokens_in: Optional[int] = None  # input tokens served from the provider's prompt cache
     cost_usd: Optional[float] = None
     provider: Optional[str] = None
     model: Optional[str] = None
+    cache_hit: Optional[bool] = None  # LLM extraction served from the result cache
 
 
 class ExtractionResponse(BaseModel):
@@ -49,6 +57,9 @@ class ExtractedRow(BaseModel):
     row_index: int = Field(..., description="0-based index of the row")
     extracted: Dict[str, Any] = Field(default_factory=dict)
     missing_required: List[str] = Field(default_factory=list)
+    source_page: Optional[int] = Field(
+        default=None, description="1-based page (uploaded image) the row was read from, in per-page mode"
+    )
 
 
 class MultiRowExtractionResponse(BaseModel):
@@ -69,7 +80,8 @@ class MultiRowExtractionResponse(BaseModel):
 
 class TextRequest(BaseModel):
     form_id: str
-    form_schema: Dict[str, Any]
+    form_schema: Optional[Dict[str, Any]] = None  # omit to use the registered schema
+    form_version: Optional[str] = None
     text: str
     model_preference: Optional[ModelPreference] = None
     locale: Optional[str] = None
@@ -79,7 +91,8 @@ class TextBatchRequest(BaseModel):
     """Request for multi-row text extraction."""
 
     form_id: str
-    form_schema: Dict[str, Any]
+    form_schema: Optional[Dict[str, Any]] = None  # omit to use the registered schema
+    form_version: Optional[str] = None
     text: str
     model_preference: Optional[ModelPreference] = None
     locale: Optional[str] = None
@@ -87,13 +100,112 @@ class TextBatchRequest(BaseModel):
 
 class AudioRequest(BaseModel):
     form_id: str
-    form_schema: Dict[str, Any]
+    form_schema: Optional[Dict[str, Any]] = None  # omit to use the registered schema
+    form_version: Optional[str] = None
     language: Optional[str] = None
     model_preference: Optional[ModelPreference] = None
 
 
 class ImageRequest(BaseModel):
     form_id: str
-    form_schema: Dict[str, Any]
+    form_schema: Optional[Dict[str, Any]] = None  # omit to use the registered schema
+    form_version: Optional[str] = None
     use_vision: bool = True
     model_preference: Optional[ModelPreference] = None
+
+
+class SchemaRegistration(BaseModel):
+    """Register a form schema once so extraction requests can reference it by id."""
+
+    form_id: str
+    form_version: str
+    form_schema: Dict[str, Any]
+
+
+class RegisteredSchemaInfo(BaseModel):
+    form_id: str
+    form_version: str
+    schema_hash: str
+    field_count: int
+    required_fields: List[str] = Field(default_factory=list)
+    registered_at: float
+    created: Optional[bool] = None  # False when an identical registration already existed
+    form_schema: Optional[Dict[str, Any]] = None
+
+
+class BulkItem(BaseModel):
+    """One independent document in a bulk request."""
+
+    id: Optional[str] = None  # caller's reference, echoed back in the result
+    text: str
+
+
+class BulkTextRequest(BaseModel):
+    """Many independent documents extracted against one schema."""
+
+    form_id: str
+    form_schema: Optional[Dict[str, Any]] = None  # omit to use the registered schema
+    form_version: Optional[str] = None
+    items: List[BulkItem]
+    model_preference: Optional[ModelPreference] = None
+    max_concurrency: Optional[int] = None  # capped at the server's BULK_CONCURRENCY
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    ok: bool
+    result: Optional[ExtractionResponse] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None  # HTTP status the item would have failed with on its own
+
+
+class BulkResponse(BaseModel):
+    form_id: str
+    form_version: Optional[str] = None
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult] = Field(default_factory=list)
+    metrics: Optional[ExtractionMetrics] = None  # summed over items; total_seconds is wall-clock
+    meta: Optional[Dict[str, Any]] = None
+
+
+class JobStage(BaseModel):
+    stage: str  # upload | asr | ocr | translation | llm | validation
+    status: str  # running | done | failed
+    started_at: float
+    finished_at: Optional[float] = None
+    attempt: Optional[int] = None
+
+
+class JobInfo(BaseModel):
+    job_id: str
+    kind: str
+    status: str  # queued | running | succeeded | failed | cancelled
+    attempts: int
+    max_attempts: int
+    progress: List[JobStage] = Field(default_factory=list)
+    error: Optional[str] = None
+    callback_url: Optional[str] = None
+    callback_status: Optional[str] = None
+    created_at: float
+    updated_at: float
+    next_attempt_at: Optional[float] = None  # set while a retry is pending
+    result_url: Optional[str] = None
+
+
+class DeferredItem(BaseModel):
+    index: Optional[int] = None  # position in the submitted items
+    id: Optional[str] = None
+    custom_id: str  # poll GET /batch/items/{custom_id}
+    status: str  # pending | submitted | completed | failed
+    batch_id: Optional[str] = None
+    error: Optional[str] = None
+    result: Optional[ExtractionResponse] = None
+
+
+class DeferredSubmission(BaseModel):
+    form_id: str
+    form_version: Optional[str] = None
+    items: List[DeferredItem] = Field(default_factory=list)
@@ -0,0 +1,102 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+
+class ASRCancelled(Exception):
+    """Raised when the client went away before its ASR job finished."""
+
+
+class ASRExecutor:
+    """Dedicated thread pool for blocking ASR and translation calls.
+
+    faster-whisper (CTranslate2) and the SDK HTTP calls release the GIL while they
+    work, so a thread pool keeps the event loop free without pickling models or
+    clients into worker processes. Jobs that are still queued when the client
+    disconnects are dropped before they start; a running job is left to finish but
+    its result is discarded.
+    """
+
+    def __init__(self, max_workers: int, poll_interval: float = 0.5) -> None:
+        self.max_workers = max(1, max_workers)
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="asr")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+
+    def _call(self, fn: Callable[..., Any], submitted: float, args: tuple, kwargs: dict) -> Tuple[Any, int]:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        queue_ms = int((time.perf_counter() - submitted) * 1000)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+        with self._lock:
+            self._completed += 1
+        return result, queue_ms
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        **kwargs: Any,
+    ) -> Tuple[Any, int]:
+        """Run `fn(*args, **kwargs)` on the pool.
+
+        Returns: (result, queue_wait_ms). Raises ASRCancelled if `is_disconnected`
+        reports the client has gone away while the job is pending.
+        """
+        with self._lock:
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+        fut = self._pool.submit(self._call, fn, time.perf_counter(), args, kwargs)
+        afut = asyncio.wrap_future(fut)
+        try:
+            while True:
+                done, _ = await asyncio.wait({afut}, timeout=self.poll_interval)
+                if done:
+                    return afut.result()
+                if is_disconnected is not None and await is_disconnected():
+                    self._cancel(fut)
+                    raise ASRCancelled("client disconnected before ASR finished")
+        except asyncio.CancelledError:
+            self._cancel(fut)
+            raise
+
+    def _cancel(self, fut) -> None:
+        if fut.cancel():
+            # Never started: undo the queued count taken at submit time
+            with self._lock:
+                self._queued -= 1
+        with self._lock:
+            self._cancelled += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "peak_queued": self._peak_queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
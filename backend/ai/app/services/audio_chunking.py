@@ -0,0 +1,292 @@
+from typing import Any, BinaryIO, List, Optional, Tuple, Union
+from dataclasses import dataclass
+import io
+import os
+import re
+import wave
+
+try:
+    import av
+    import numpy as np
+except Exception:
+    av = None
+    np = None
+
+
+SAMPLE_RATE = 16000
+_FRAME_SECONDS = 0.03
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    start: float  # seconds
+    end: float  # seconds
+    wav_bytes: bytes
+
+
+@dataclass
+class PreparedAudio:
+    """A recording decoded to 16 kHz mono, silence-trimmed and re-encoded for ASR."""
+
+    samples: Any  # float32 mono samples at SAMPLE_RATE, after trimming
+    data: bytes  # `samples` encoded in the output format
+    filename: str
+    duration_seconds: float  # decoded length before trimming
+    speech_seconds: float  # length actually sent to ASR
+    bytes_before: Optional[int]
+    bytes_after: int
+
+
+def chunking_available() -> bool:
+    return av is not None and np is not None
+
+
+def decode_audio(source: Union[str, bytes, BinaryIO], sample_rate: int = SAMPLE_RATE):
+    """Decode any container/codec PyAV understands to mono float32 samples at `sample_rate`.
+
+    `source` may be a path, in-memory bytes or a binary file object.
+    """
+    if not chunking_available():
+        raise RuntimeError("audio chunking requires the 'av' and 'numpy' packages")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+    parts = []
+    with av.open(source) as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                parts.append(out.to_ndarray().reshape(-1))
+        for out in resampler.resample(None):
+            parts.append(out.to_ndarray().reshape(-1))
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(parts).astype(np.float32) / 32768.0
+
+
+def encode_wav(samples, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Encode float32 samples as 16-bit PCM mono WAV bytes."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+
+_CONTAINERS = {"flac": ("flac", "flac"), "ogg": ("ogg", "libopus"), "mp3": ("mp3", "libmp3lame")}
+
+
+def encode_audio(samples, fmt: str = "wav", sample_rate: int = SAMPLE_RATE) -> Tuple[bytes, str]:
+    """Encode float32 mono samples as `fmt` (wav, flac, ogg/Opus or mp3). Returns (bytes, extension)."""
+    if fmt not in _CONTAINERS:
+        return encode_wav(samples, sample_rate), ".wav"
+    container_format, codec = _CONTAINERS[fmt]
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").reshape(1, -1)
+    buf = io.BytesIO()
+    with av.open(buf, "w", format=container_format) as container:
+        stream = container.add_stream(codec, rate=sample_rate)
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(pcm, format="s16", layout="mono")
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buf.getvalue(), f".{fmt}"
+
+
+def _frame_energy(samples, sample_rate: int):
+    frame = max(1, int(sample_rate * _FRAME_SECONDS))
+    n = len(samples) // frame
+    if n == 0:
+        return np.zeros(0, dtype=np.float32), frame
+    frames = samples[: n * frame].reshape(n, frame)
+    return np.sqrt(np.mean(frames ** 2, axis=1)), frame
+
+
+def trim_silence(
+    samples,
+    sample_rate: int = SAMPLE_RATE,
+    threshold_db: float = -35.0,
+    max_gap_seconds: float = 1.0,
+    padding_seconds: float = 0.2,
+):
+    """Energy VAD: drop leading/trailing silence and shorten long pauses.
+
+    A 30 ms frame counts as speech when its RMS is within `threshold_db` of the
+    loudest frame; speech is padded by `padding_seconds` on both sides and internal
+    pauses longer than `max_gap_seconds` are cut down to that length. Recordings
+    with no detectable speech are returned unchanged.
+    """
+    energy, frame = _frame_energy(samples, sample_rate)
+    if not len(energy) or energy.max() <= 0:
+        return samples
+    speech = energy >= energy.max() * (10 ** (threshold_db / 20))
+    pad = int(padding_seconds / _FRAME_SECONDS)
+    if pad:
+        speech = np.convolve(speech, np.ones(2 * pad + 1), mode="same") > 0
+    idx = np.flatnonzero(speech)
+    first, last = int(idx[0]), int(idx[-1]) + 1
+    keep = speech.copy()
+    keep[first:last] = True
+    max_gap = int(max_gap_seconds / _FRAME_SECONDS)
+    # Internal pauses: keep `max_gap` frames, half from each edge
+    edges = np.flatnonzero(np.diff(speech[first:last].astype(np.int8))) + first + 1
+    for start, end in zip(edges[::2], edges[1::2]):
+        if end - start > max_gap:
+            keep[start + max_gap // 2:end - (max_gap - max_gap // 2)] = False
+    keep[:first] = False
+    keep[last:] = False
+    n = len(energy)
+    return samples[: n * frame].reshape(n, frame)[keep].reshape(-1)
+
+
+def prepare_audio(
+    source: Union[str, bytes, BinaryIO],
+    fmt: str = "flac",
+    trim: bool = True,
+    threshold_db: float = -35.0,
+    max_gap_seconds: float = 1.0,
+    padding_seconds: float = 0.2,
+    filename: str = "audio",
+) -> Optional[PreparedAudio]:
+    """Decode to 16 kHz mono, optionally trim silence, and re-encode as `fmt`.
+
+    Returns None when the audio cannot be decoded locally (the caller then sends the
+    original upload as-is). Blocking; run it on the ASR executor.
+    """
+    try:
+        samples = decode_audio(source)
+    except Exception:
+        return None
+    if not len(samples):
+        return None
+    duration = len(samples) / SAMPLE_RATE
+    if trim:
+        samples = trim_silence(samples, SAMPLE_RATE, threshold_db, max_gap_seconds, padding_seconds)
+    data, ext = encode_audio(samples, fmt)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        bytes_before = len(source)
+    elif isinstance(source, str):
+        bytes_before = os.path.getsize(source)
+    else:
+        bytes_before = None
+    return PreparedAudio(
+        samples=samples,
+        data=data,
+        filename=f"{os.path.splitext(os.path.basename(filename))[0] or 'audio'}{ext}",
+        duration_seconds=round(duration, 3),
+        speech_seconds=round(len(samples) / SAMPLE_RATE, 3),
+        bytes_before=bytes_before,
+        bytes_after=len(data),
+    )
+
+
+def find_split_points(
+    samples, sample_rate: int, chunk_seconds: float, search_seconds: Optional[float] = None
+) -> List[int]:
+    """Pick sample offsets near every `chunk_seconds` where the signal is quietest.
+
+    Each cut is searched for within +/- `search_seconds` (default: a quarter of the
+    chunk) of its nominal position, so segments end in pauses rather than mid-word.
+    """
+    total = len(samples)
+    step = int(chunk_seconds * sample_rate)
+    if step <= 0 or total <= step:
+        return []
+    energy, frame = _frame_energy(samples, sample_rate)
+    search = int((search_seconds if search_seconds is not None else chunk_seconds / 4) * sample_rate)
+    cuts: List[int] = []
+    last = 0
+    nominal = step
+    while nominal < total - step // 4:
+        lo = max(last + step // 2, nominal - search) // frame
+        hi = min(total, nominal + search) // frame
+        if hi > lo and len(energy):
+            best = lo + int(np.argmin(energy[lo:hi]))
+            cut = best * frame + frame // 2
+        else:
+            cut = nominal
+        cuts.append(cut)
+        last = cut
+        nominal = cut + step
+    return cuts
+
+
+def split_on_silence(
+    samples,
+    sample_rate: int = SAMPLE_RATE,
+    chunk_seconds: float = 60.0,
+    overlap_seconds: float = 1.0,
+) -> List[AudioChunk]:
+    """Split samples at quiet points into WAV chunks, each starting `overlap_seconds` early."""
+    bounds = [0] + find_split_points(samples, sample_rate, chunk_seconds) + [len(samples)]
+    overlap = int(overlap_seconds * sample_rate)
+    chunks: List[AudioChunk] = []
+    for i in range(len(bounds) - 1):
+        start = max(0, bounds[i] - overlap) if i else 0
+        end = bounds[i + 1]
+        chunks.append(
+            AudioChunk(
+                index=i,
+                start=round(start / sample_rate, 3),
+                end=round(end / sample_rate, 3),
+                wav_bytes=encode_wav(samples[start:end], sample_rate),
+            )
+        )
+    return chunks
+
+
+def _norm_word(w: str) -> str:
+    return re.sub(r"[^\w]", "", w.lower())
+
+
+def stitch_transcripts(texts: List[str], max_overlap_words: int = 12) -> str:
+    """Join chunk transcripts, dropping words the overlap made both chunks hear.
+
+    For each next chunk, the longest run of up to `max_overlap_words` words that ends
+    the text so far and also starts the chunk (compared case/punctuation-insensitively)
+    is removed from the chunk before appending.
+    """
+    words: List[str] = []
+    for text in texts:
+        nxt = (text or "").split()
+        if not nxt:
+            continue
+        tail = [_norm_word(w) for w in words[-max_overlap_words:]]
+        head = [_norm_word(w) for w in nxt[:max_overlap_words]]
+        drop = 0
+        for k in range(min(len(tail), len(head)), 0, -1):
+            if tail[-k:] == head[:k] and any(head[:k]):
+                drop = k
+                break
+        words.extend(nxt[drop:])
+    return " ".join(words)
+
+
+def plan_chunks(
+    path: Union[str, bytes, BinaryIO], chunk_seconds: float, overlap_seconds: float, min_seconds: float
+) -> Optional[List[AudioChunk]]:
+    """Decode and split `path` when it is longer than `min_seconds`.
+
+    Returns None when the recording is short enough for a single ASR call or when it
+    cannot be decoded locally (the caller then sends the original file as-is).
+    """
+    try:
+        samples = decode_audio(path)
+    except Exception:
+        return None
+    return chunk_samples(samples, chunk_seconds, overlap_seconds, min_seconds)
+
+
+def chunk_samples(
+    samples, chunk_seconds: float, overlap_seconds: float, min_seconds: float
+) -> Optional[List[AudioChunk]]:
+    """Split already-decoded 16 kHz samples when longer than `min_seconds`, else None."""
+    if len(samples) <= min_seconds * SAMPLE_RATE:
+        return None
+    chunks = split_on_silence(samples, SAMPLE_RATE, chunk_seconds, overlap_seconds)
+    return chunks if len(chunks) > 1 else None
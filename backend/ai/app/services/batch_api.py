@@ -0,0 +1,438 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    """One deferred extraction prompt and, once reconciled, its result."""
+
+    custom_id: str
+    provider: str
+    model: str
+    instructions: Optional[str]
+    prompt: str
+    payload: Dict[str, Any]  # what the finalizer needs to build the response (form, text, caller id)
+    status: str  # pending | submitted | completed | failed
+    batch_id: Optional[str] = None
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+
+
+_ITEM_COLUMNS = (
+    "custom_id, provider, model, instructions, prompt, payload, status, batch_id, attempts, result, error, "
+    "created_at, updated_at"
+)
+
+
+def _row_to_item(row) -> BatchItem:
+    (custom_id, provider, model, instructions, prompt, payload, status, batch_id, attempts, result, error,
+     created_at, updated_at) = row
+    return BatchItem(
+        custom_id=custom_id,
+        provider=provider,
+        model=model,
+        instructions=instructions,
+        prompt=prompt,
+        payload=json.loads(payload),
+        status=status,
+        batch_id=batch_id,
+        attempts=attempts,
+        result=json.loads(result) if result else None,
+        error=error,
+        created_at=created_at,
+        updated_at=updated_at,
+    )
+
+
+class BatchStore:
+    """SQLite record of deferred items and the provider batches they were submitted in."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS batch_items (custom_id TEXT PRIMARY KEY, provider TEXT NOT NULL, "
+            "model TEXT NOT NULL, instructions TEXT, prompt TEXT NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, batch_id TEXT, attempts INTEGER NOT NULL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS batch_items_status ON batch_items (status, batch_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS batches (batch_id TEXT PRIMARY KEY, provider TEXT NOT NULL, "
+            "model TEXT NOT NULL, status TEXT NOT NULL, item_count INTEGER NOT NULL, "
+            "submitted_at REAL NOT NULL, finished_at REAL)"
+        )
+        self._conn.commit()
+
+    def add(self, item: BatchItem) -> None:
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO batch_items ({_ITEM_COLUMNS}) VALUES ({', '.join('?' * 13)})",
+                (item.custom_id, item.provider, item.model, item.instructions, item.prompt,
+                 json.dumps(item.payload), item.status, item.batch_id, item.attempts, None, None,
+                 item.created_at, item.updated_at),
+            )
+            self._conn.commit()
+
+    def get(self, custom_id: str) -> Optional[BatchItem]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_ITEM_COLUMNS} FROM batch_items WHERE custom_id = ?", (custom_id,)
+            ).fetchone()
+        return _row_to_item(row) if row else None
+
+    def pending_groups(self) -> Dict[Tuple[str, str], List[BatchItem]]:
+        """Pending items grouped by (provider, model), oldest first; a batch file holds one model."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_ITEM_COLUMNS} FROM batch_items WHERE status = 'pending' ORDER BY created_at"
+            ).fetchall()
+        groups: Dict[Tuple[str, str], List[BatchItem]] = {}
+        for row in rows:
+            item = _row_to_item(row)
+            groups.setdefault((item.provider, item.model), []).append(item)
+        return groups
+
+    def mark_submitted(self, batch_id: str, provider: str, model: str, items: List[BatchItem]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO batches (batch_id, provider, model, status, item_count, submitted_at) "
+                "VALUES (?, ?, ?, 'submitted', ?, ?)",
+                (batch_id, provider, model, len(items), now),
+            )
+            self._conn.executemany(
+                "UPDATE batch_items SET status = 'submitted', batch_id = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE custom_id = ?",
+                [(batch_id, now, item.custom_id) for item in items],
+            )
+            self._conn.commit()
+
+    def open_batches(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self._conn.execute("SELECT batch_id, provider FROM batches WHERE status = 'submitted'").fetchall()
+
+    def batch_items(self, batch_id: str) -> List[BatchItem]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_ITEM_COLUMNS} FROM batch_items WHERE batch_id = ? AND status = 'submitted'", (batch_id,)
+            ).fetchall()
+        return [_row_to_item(r) for r in rows]
+
+    def finish_item(self, item: BatchItem) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batch_items SET status = ?, result = ?, error = ?, batch_id = ?, updated_at = ? "
+                "WHERE custom_id = ?",
+                (item.status, json.dumps(item.result) if item.result is not None else None, item.error,
+                 item.batch_id, time.time(), item.custom_id),
+            )
+            self._conn.commit()
+
+    def finish_batch(self, batch_id: str, status: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batches SET status = ?, finished_at = ? WHERE batch_id = ?", (status, time.time(), batch_id)
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            items = self._conn.execute("SELECT status, COUNT(*) FROM batch_items GROUP BY status").fetchall()
+            batches = self._conn.execute("SELECT status, COUNT(*) FROM batches GROUP BY status").fetchall()
+        return {"items": dict(items), "batches": dict(batches)}
+
+
+class BatchBackend:
+    """Where batch files go. Subclasses submit items, report batch status and return outputs.
+
+    `fetch` maps custom_id -> {"content", "usage", "model"} on success or {"error"}.
+    Status strings follow the OpenAI Batch API ("completed", "failed", "expired",
+    "cancelled", anything else meaning still in progress).
+    """
+
+    name = "base"
+
+    def available(self, provider: str) -> bool:
+        """Whether items for `provider` can be submitted at all."""
+        return True
+
+    async def submit(self, provider: str, model: str, items: List[BatchItem]) -> str:
+        raise NotImplementedError
+
+    async def poll(self, batch_id: str, provider: str) -> str:
+        raise NotImplementedError
+
+    async def fetch(self, batch_id: str, provider: str) -> Dict[str, Dict[str, Any]]:
+        raise NotImplementedError
+
+
+def _parse_output_line(line: Dict[str, Any]) -> Dict[str, Any]:
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code", 200) >= 400:
+        error = line.get("error") or (response.get("body") or {}).get("error") or response.get("status_code")
+        return {"error": json.dumps(error) if not isinstance(error, str) else error}
+    body = response.get("body") or {}
+    choices = body.get("choices") or [{}]
+    usage = body.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "content": (choices[0].get("message") or {}).get("content") or "{}",
+        "usage": {
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "completion_tokens": usage.get("completion_tokens"),
+            "cached_tokens": details.get("cached_tokens"),
+        },
+        "model": body.get("model"),
+    }
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API (also spoken by Groq): JSONL upload, batch create, output download.
+
+    `providers(name)` returns the extraction provider, or None. Its async SDK
+    `client` does the uploads, and each line's body comes from its `request_body`,
+    so deferred calls use the same messages and settings (e.g. temperature) as
+    synchronous ones.
+    """
+
+    name = "openai"
+
+    def __init__(self, providers: Callable[[str], Any], completion_window: str = "24h") -> None:
+        self.providers = providers
+        self.completion_window = completion_window
+
+    def available(self, provider: str) -> bool:
+        return getattr(self.providers(provider), "client", None) is not None
+
+    def _client(self, provider: str):
+        client = getattr(self.providers(provider), "client", None)
+        if client is None:
+            raise RuntimeError(f"no batch-capable client configured for provider '{provider}'")
+        return client
+
+    async def submit(self, provider: str, model: str, items: List[BatchItem]) -> str:
+        client = self._client(provider)
+        request_body = self.providers(provider).request_body
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": item.custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": request_body(item.prompt, model=model, instructions=item.instructions),
+                }
+            )
+            for item in items
+        ]
+        upload = await client.files.create(file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window=self.completion_window
+        )
+        return batch.id
+
+    async def poll(self, batch_id: str, provider: str) -> str:
+        batch = await self._client(provider).batches.retrieve(batch_id)
+        return batch.status
+
+    async def fetch(self, batch_id: str, provider: str) -> Dict[str, Dict[str, Any]]:
+        client = self._client(provider)
+        batch = await client.batches.retrieve(batch_id)
+        outputs: Dict[str, Dict[str, Any]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for raw in content.text.splitlines():
+                if raw.strip():
+                    line = json.loads(raw)
+                    outputs[line["custom_id"]] = _parse_output_line(line)
+        return outputs
+
+
+class LocalBatchBackend(BatchBackend):
+    """In-process stand-in for a provider Batch API, for development and tests.
+
+    A "batch" runs its items through the regular providers' `complete` in the
+    background (at most `concurrency` at a time). Batches live in memory only; after
+    a restart they report "expired" and their items are re-queued.
+    """
+
+    name = "local"
+
+    def __init__(self, providers: Dict[str, Any], concurrency: int = 4) -> None:
+        self.providers = providers
+        self.concurrency = max(1, concurrency)
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def submit(self, provider: str, model: str, items: List[BatchItem]) -> str:
+        batch_id = f"local_{uuid.uuid4().hex}"
+        self._tasks[batch_id] = asyncio.ensure_future(self._run(self.providers[provider], model, items))
+        return batch_id
+
+    async def _run(self, provider, model: str, items: List[BatchItem]) -> Dict[str, Dict[str, Any]]:
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(item: BatchItem) -> Tuple[str, Dict[str, Any]]:
+            async with sem:
+                try:
+                    content, usage = await provider.complete(
+                        prompt=item.prompt, model=model, instructions=item.instructions
+                    )
+                except Exception as e:
+                    return item.custom_id, {"error": f"{type(e).__name__}: {e}"}
+            return item.custom_id, {"content": content, "usage": usage, "model": usage.get("model") or model}
+
+        return dict(await asyncio.gather(*(one(item) for item in items)))
+
+    async def poll(self, batch_id: str, provider: str) -> str:
+        task = self._tasks.get(batch_id)
+        if task is None:
+            return "expired"
+        if not task.done():
+            return "in_progress"
+        return "failed" if task.cancelled() or task.exception() else "completed"
+
+    async def fetch(self, batch_id: str, provider: str) -> Dict[str, Dict[str, Any]]:
+        return self._tasks.pop(batch_id).result()
+
+
+Finalizer = Callable[[BatchItem, Dict[str, Any]], Dict[str, Any]]
+
+
+class DeferredExtractor:
+    """Accumulates extraction prompts into provider batch files and reconciles the results.
+
+    Items are queued per (provider, model). A group is submitted as one batch file
+    once it reaches `max_per_file` items or its oldest item has waited
+    `flush_seconds`. Open batches are polled every `poll_seconds`; completed outputs
+    are turned into stored responses by `finalize(item, output)`. Items of failed
+    or expired batches are re-queued once, then marked failed.
+    """
+
+    def __init__(
+        self,
+        store: BatchStore,
+        backend: BatchBackend,
+        finalize: Finalizer,
+        max_per_file: int = 5000,
+        flush_seconds: float = 300.0,
+        poll_seconds: float = 60.0,
+        max_attempts: int = 2,
+    ) -> None:
+        self.store = store
+        self.backend = backend
+        self.finalize = finalize
+        self.max_per_file = max(1, max_per_file)
+        self.flush_seconds = flush_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.last_error: Optional[str] = None
+
+    def enqueue(
+        self, provider: str, model: str, instructions: Optional[str], prompt: str, payload: Dict[str, Any]
+    ) -> BatchItem:
+        now = time.time()
+        item = BatchItem(
+            custom_id=f"item_{uuid.uuid4().hex}",
+            provider=provider,
+            model=model,
+            instructions=instructions,
+            prompt=prompt,
+            payload=payload,
+            status="pending",
+            created_at=now,
+            updated_at=now,
+        )
+        self.store.add(item)
+        return item
+
+    async def flush(self, force: bool = False) -> List[str]:
+        """Submit due groups (all pending groups when `force`). Returns the new batch ids."""
+        submitted: List[str] = []
+        now = time.time()
+        for (provider, model), items in self.store.pending_groups().items():
+            due = force or now - items[0].created_at >= self.flush_seconds
+            while items and (due or len(items) >= self.max_per_file):
+                chunk, items = items[: self.max_per_file], items[self.max_per_file:]
+                batch_id = await self.backend.submit(provider, model, chunk)
+                self.store.mark_submitted(batch_id, provider, model, chunk)
+                submitted.append(batch_id)
+        return submitted
+
+    async def reconcile(self) -> int:
+        """Poll open batches and store the results of finished ones. Returns items reconciled."""
+        done = 0
+        for batch_id, provider in self.store.open_batches():
+            status = await self.backend.poll(batch_id, provider)
+            if status == "completed":
+                outputs = await self.backend.fetch(batch_id, provider)
+            elif status in ("failed", "expired", "cancelled"):
+                outputs = {}
+            else:
+                continue
+            for item in self.store.batch_items(batch_id):
+                output = outputs.get(item.custom_id)
+                if output is None or "error" in output:
+                    reason = (output or {}).get("error") or f"batch {status}"
+                    if output is None and item.attempts < self.max_attempts:
+                        item.status, item.batch_id, item.error = "pending", None, None
+                    else:
+                        item.status, item.error = "failed", reason
+                else:
+                    try:
+                        item.result = self.finalize(item, output)
+                        item.status = "completed"
+                    except Exception as e:
+                        item.status, item.error = "failed", f"{type(e).__name__}: {e}"
+                self.store.finish_item(item)
+                done += 1
+            self.store.finish_batch(batch_id, status)
+        return done
+
+    async def tick(self, force_flush: bool = False) -> List[str]:
+        """Flush due groups and reconcile open batches; returns the newly submitted batch ids."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            submitted = await self.flush(force=force_flush)
+            await self.reconcile()
+        return submitted
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.tick()
+                self.last_error = None
+            except Exception as e:
+                # Provider hiccups must not kill the loop; the next tick retries
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("deferred batch tick failed")
+            await asyncio.sleep(min(self.poll_seconds, self.flush_seconds))
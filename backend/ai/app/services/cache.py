@@ -0,0 +1,138 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def make_cache_key(*parts: Any) -> str:
+    """SHA-256 over a canonical JSON encoding of `parts`."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    """Stream a file through SHA-256 without loading it whole."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with optional per-entry TTL (seconds, 0 = no expiry)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value = item
+            if expires and expires < time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        expires = time.time() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class DiskCache:
+    """SQLite-backed JSON value store that survives restarts.
+
+    Entries past their TTL are ignored on read and pruned on write; when the table
+    grows past `max_entries` the least recently written rows are dropped.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float = 0) -> None:
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires REAL NOT NULL, written REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires and expires < time.time():
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        expires = now + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires, written) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, default=str), expires, now),
+            )
+            self._conn.execute("DELETE FROM cache WHERE expires > 0 AND expires < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY written DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+
+class TieredCache:
+    """Memory LRU in front of an optional DiskCache; disk hits are promoted to memory."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[DiskCache] = None) -> None:
+        self.memory = memory
+        self.disk = disk
+
+    @classmethod
+    def build(cls, max_entries: int, ttl_seconds: float, disk_path: Optional[str] = None) -> "TieredCache":
+        disk = DiskCache(disk_path, max_entries=max_entries, ttl_seconds=ttl_seconds) if disk_path else None
+        return cls(LRUCache(max_entries, ttl_seconds), disk)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.memory.stats(), "disk": self.disk is not None}
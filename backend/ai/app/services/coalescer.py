@@ -0,0 +1,107 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+from .cache import LRUCache
+
+DisconnectCheck = Callable[[], Awaitable[bool]]
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused with a different request payload."""
+
+
+class _Flight:
+    def __init__(self, fingerprint: Optional[str]) -> None:
+        self.fingerprint = fingerprint
+        self.task: Optional[asyncio.Task] = None
+        self.waiters: Dict[object, Optional[DisconnectCheck]] = {}
+
+    async def all_disconnected(self) -> bool:
+        """True only when every caller attached to this flight has gone away."""
+        if not self.waiters:
+            return False
+        for check in list(self.waiters.values()):
+            if check is None or not await check():
+                return False
+        return True
+
+
+class RequestCoalescer:
+    """Share one in-flight computation between identical concurrent requests.
+
+    Requests are matched on a key (an Idempotency-Key or a content hash). The first
+    caller starts the work as a task; later callers with the same key await that
+    task instead of starting their own, and once it succeeds the result is replayed
+    for `retention_seconds`. Failures are propagated to every waiter and not kept,
+    so a retry after an error runs again. The work is told the client is gone only
+    when all attached callers have disconnected.
+    """
+
+    def __init__(self, retention_seconds: float, max_entries: int) -> None:
+        self._done = LRUCache(max_entries, retention_seconds)
+        self._inflight: Dict[str, _Flight] = {}
+        self.started = 0
+        self.joined = 0
+        self.replayed = 0
+
+    @staticmethod
+    def _check(fingerprint: Optional[str], expected: Optional[str]) -> None:
+        if fingerprint and expected and fingerprint != expected:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[DisconnectCheck], Awaitable[Any]],
+        is_disconnected: Optional[DisconnectCheck] = None,
+        fingerprint: Optional[str] = None,
+    ) -> Tuple[Any, str]:
+        """Return (result, status) where status is "started", "joined" or "replayed".
+
+        `factory(is_disconnected)` is only called for the first request with `key`.
+        Raises IdempotencyConflict when `fingerprint` differs from the original one.
+        """
+        done = self._done.get(key)
+        if done is not None:
+            self._check(fingerprint, done[0])
+            self.replayed += 1
+            return done[1], "replayed"
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            flight = _Flight(fingerprint)
+            # factory is called right away so it can claim resources synchronously
+            flight.task = asyncio.ensure_future(self._execute(key, flight, factory(flight.all_disconnected)))
+            # Retrieve the exception even if every waiter has been cancelled
+            flight.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[key] = flight
+            status = "started"
+            self.started += 1
+        else:
+            self._check(fingerprint, flight.fingerprint)
+            status = "joined"
+            self.joined += 1
+
+        token = object()
+        flight.waiters[token] = is_disconnected
+        try:
+            # shield: one caller being cancelled must not cancel the shared work
+            return await asyncio.shield(flight.task), status
+        finally:
+            flight.waiters.pop(token, None)
+
+    async def _execute(self, key: str, flight: _Flight, work: Awaitable[Any]) -> Any:
+        try:
+            result = await work
+            self._done.set(key, (flight.fingerprint, result))
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "started": self.started,
+            "joined": self.joined,
+            "replayed": self.replayed,
+            "retained": self._done.stats()["entries"],
+        }
@@ -1,12 +1,21 @@
-from typing import Dict, Any, Optional, Tuple
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from enum import Enum
+import copy
+import json
 from .metrics import timer, estimate_tokens
 from .utils import safe_json_parse
+from .cache import TieredCache, make_cache_key
+from .rate_limit import provider_limiter
+from .row_stream import RowStreamParser
 from ..config import settings
 
 from .providers.openai_provider import OpenAIProvider
 from .providers.groq_provider import GroqProvider
 
+# Bump whenever build_prompt or the provider message layout changes so cached
+# extractions produced by an older prompt are not served.
+PROMPT_VERSION = "2"
+
 
 class ExtractionRouter:
     def __init__(self):
@@ -24,6 +33,14 @@ class ExtractionRouter:
             "groq-qwen3-32b": ("groq", "qwen/qwen3-32b"),
         }
 
+        self.cache: Optional[TieredCache] = None
+        if settings.EXTRACTION_CACHE_ENABLED:
+            self.cache = TieredCache.build(
+                max_entries=settings.EXTRACTION_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.EXTRACTION_CACHE_TTL_SECONDS,
+                disk_path=settings.EXTRACTION_CACHE_DISK_PATH,
+            )
+
     def pick(self, preferred: Optional[str], need_vision: bool) -> Tuple[str, Optional[str]]:
         """Pick a provider name and optional model override from a preferred hint.
 
@@ -64,6 +81,34 @@ class ExtractionRouter:
         # Always return tuple (provider_name, model_hint)
         return name, model_hint
 
+    def build_instructions(self, form_schema: Dict[str, Any], hints: Optional[Dict[str, Any]] = None) -> str:
+        """Static single-object extraction instructions for `form_schema` (no source text)."""
+        examples_hint = hints.get("examples") if hints else None
+        return (
+            "You are an information extraction engine.\n"
+            "Return ONLY a valid JSON object that matches the given form field IDs.\n"
+            "Rules: No prose, no explanations, no Markdown. Keys must exactly match field 'id' values.\n"
+            f"Fields schema (IDs/types/enums): {form_schema.get('fields', [])}\n"
+            + (f"Examples: {examples_hint}\n" if examples_hint else "")
+        )
+
+    def build_prompt_parts(
+        self, form_schema: Dict[str, Any], text_blob: str, header: Optional[str] = None
+    ) -> Tuple[Optional[str], str]:
+        """Split the prompt into (static instructions, variable prompt).
+
+        With PROMPT_LAYOUT "cache_prefix" the instructions (`header`, or the default
+        single-object rules) depend only on the schema and are sent first as the
+        system message, so repeated calls share a byte-identical prefix that
+        OpenAI/Groq prompt caching can reuse; only the source text follows. The
+        "legacy" layout returns no instructions and the previous single user prompt.
+        """
+        if settings.PROMPT_LAYOUT == "legacy":
+            if header:
+                text_blob = f"{header}\n\n---\nSOURCE TEXT:\n{text_blob}"
+            return None, self.build_prompt(form_schema, text_blob)
+        return header or self.build_instructions(form_schema), f"SOURCE TEXT:\n{text_blob}"
+
     def build_prompt(self, form_schema: Dict[str, Any], text_blob: str, hints: Optional[Dict[str, Any]] = None) -> str:
         examples_hint = hints.get("examples") if hints else None
         return (
@@ -75,14 +120,38 @@ class ExtractionRouter:
             + (f"Examples: {examples_hint}\n" if examples_hint else "")
         )
 
-    def extract(self, provider_name: str, form_schema: Dict[str, Any], text_blob: str,
-                images: Optional[list[str]] = None, ocr_blocks: Optional[list[dict]] = None,
-                locale: Optional[str] = None, model_override: Optional[str] = None, **kwargs) -> tuple[Dict[str, Any], Dict[str, Any], int, int, int, float, str]:
+    async def extract(self, provider_name: str, form_schema: Dict[str, Any], text_blob: str,
+                      images: Optional[list[str]] = None, ocr_blocks: Optional[list[dict]] = None,
+                      locale: Optional[str] = None, model_override: Optional[str] = None,
+                      header: Optional[str] = None, **kwargs) -> tuple[Dict[str, Any], Dict[str, Any], int, int, int, float, str, Dict[str, Any]]:
+        """Run the LLM extraction.
+
+        `header` replaces the default instructions (e.g. the multi-row header) and is
+        placed in the static prompt prefix; see build_prompt_parts.
+
+        Returns (data, confidence, llm_ms, tokens_in, tokens_out, cost, model, info) where
+        info carries per-call flags: cache_hit, and cached_tokens (input tokens the
+        provider served from its prompt cache). Identical requests are answered from the
+        content-addressed cache without a provider call (zero tokens/cost).
+        """
         provider = self.providers[provider_name]
-        prompt = self.build_prompt(form_schema, text_blob)
+        cache_key = self.cache_key(provider_name, model_override, form_schema, header, text_blob, images, ocr_blocks, locale)
+        hit = self.cached(cache_key)
+        if hit is not None:
+            return hit
+
+        instructions, prompt = self.build_prompt_parts(form_schema, text_blob, header)
         try:
-            with timer() as t_llm:
-                raw, usage = provider.complete(prompt=prompt, images=images or None, ocr_blocks=ocr_blocks or None, locale=locale, model=model_override)
+            async with provider_limiter.slot(provider_name):
+                with timer() as t_llm:
+                    raw, usage = await provider.complete(
+                        prompt=prompt,
+                        images=images or None,
+                        ocr_blocks=ocr_blocks or None,
+                        locale=locale,
+                        model=model_override,
+                        instructions=instructions,
+                    )
         except Exception as e:
             # Map common provider errors to clearer responses for the API layer
             # Avoid importing fastapi here to keep this module framework-agnostic; re-raise a ValueError with message
@@ -93,23 +162,202 @@ class ExtractionRouter:
             data = safe_json_parse(raw)
         except Exception:
             strict_prompt = prompt + "\nRespond ONLY with JSON. If a field is unknown, put null."
-            with timer() as t2:
-                raw2, usage2 = provider.complete(prompt=strict_prompt, images=images or None, ocr_blocks=ocr_blocks or None, locale=locale, model=model_override)
+            async with provider_limiter.slot(provider_name):
+                with timer() as t2:
+                    raw2, usage2 = await provider.complete(
+                        prompt=strict_prompt,
+                        images=images or None,
+                        ocr_blocks=ocr_blocks or None,
+                        locale=locale,
+                        model=model_override,
+                        instructions=instructions,
+                    )
             llm_ms += t2()
             usage = usage2 or usage
             data = safe_json_parse(raw2)
 
         confidence = {k: 0.8 for k in data.keys()}
 
-        tokens_in = usage.get("prompt_tokens") or estimate_tokens(prompt)
+        tokens_in = usage.get("prompt_tokens") or estimate_tokens((instructions or "") + prompt)
         tokens_out = usage.get("completion_tokens") or estimate_tokens(raw)
+        cached_tokens = min(usage.get("cached_tokens") or 0, tokens_in)
 
         # Determine which model was used: prefer provider-reported model (if present in usage),
         # then explicit override (requested), then provider's default
         model_from_usage = usage.get("model") if isinstance(usage, dict) else None
         model_used = model_from_usage or model_override or getattr(provider, "model", None) or "unknown"
 
-        # Compute cost using per-model pricing where available, otherwise use provider defaults
+        cost = self.estimate_cost(provider_name, model_used, tokens_in, tokens_out, cached_tokens)
+
+        self._remember(cache_key, data, confidence, model_used)
+
+        return data, confidence, llm_ms, tokens_in, tokens_out, cost, model_used, {"cache_hit": False, "cached_tokens": cached_tokens}
+
+    async def extract_stream(self, provider_name: str, form_schema: Dict[str, Any], text_blob: str,
+                             on_row: Callable[[Dict[str, Any]], None], ocr_blocks: Optional[list[dict]] = None,
+                             locale: Optional[str] = None, model_override: Optional[str] = None,
+                             header: Optional[str] = None) -> tuple:
+        """Multi-row extraction over a streaming completion.
+
+        Every object of the answer's "rows" array is passed to `on_row` as soon as it
+        closes (see RowStreamParser). Returns the extract() tuple once the stream
+        ends; its data is {"rows": <the rows handed to on_row>} when any were
+        streamed, else the parsed answer (on_row has then not been called). Cache
+        hits return without calling on_row. There is no stricter retry: rows may
+        already have been delivered.
+        """
+        provider = self.providers[provider_name]
+        cache_key = self.cache_key(provider_name, model_override, form_schema, header, text_blob, None, ocr_blocks, locale)
+        hit = self.cached(cache_key)
+        if hit is not None:
+            return hit
+
+        instructions, prompt = self.build_prompt_parts(form_schema, text_blob, header)
+        parser = RowStreamParser()
+        usage: Dict[str, Any] = {}
+        try:
+            async with provider_limiter.slot(provider_name):
+                with timer() as t_llm:
+                    async for delta, final_usage in provider.stream(
+                        prompt=prompt, ocr_blocks=ocr_blocks or None, model=model_override, instructions=instructions
+                    ):
+                        if final_usage is not None:
+                            usage = final_usage
+                        for row in parser.feed(delta):
+                            on_row(row)
+        except Exception as e:
+            raise ValueError(f"LLM provider error: {e}") from e
+        llm_ms = t_llm()
+
+        raw = parser.text
+        if parser.rows:
+            data: Any = {"rows": parser.rows}
+        else:
+            data = safe_json_parse(raw)
+        confidence = {k: 0.8 for row in parser.rows for k in row.keys()}
+        if not parser.rows and isinstance(data, dict):
+            confidence = {k: 0.8 for k in data.keys()}
+
+        tokens_in = usage.get("prompt_tokens") or estimate_tokens((instructions or "") + prompt)
+        tokens_out = usage.get("completion_tokens") or estimate_tokens(raw)
+        cached_tokens = min(usage.get("cached_tokens") or 0, tokens_in)
+        model_used = usage.get("model") or model_override or getattr(provider, "model", None) or "unknown"
+        cost = self.estimate_cost(provider_name, model_used, tokens_in, tokens_out, cached_tokens)
+
+        self._remember(cache_key, data, confidence, model_used)
+        return data, confidence, llm_ms, tokens_in, tokens_out, cost, model_used, {"cache_hit": False, "cached_tokens": cached_tokens}
+
+    def cache_key(self, provider_name: str, model_override: Optional[str], form_schema: Dict[str, Any],
+                  header: Optional[str], text_blob: str, images: Optional[list] = None,
+                  ocr_blocks: Optional[list] = None, locale: Optional[str] = None) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return make_cache_key(
+            PROMPT_VERSION,
+            settings.PROMPT_LAYOUT,
+            provider_name,
+            model_override or getattr(self.providers[provider_name], "model", None),
+            form_schema,
+            header,
+            text_blob,
+            images,
+            ocr_blocks,
+            locale,
+        )
+
+    def cached(self, cache_key: Optional[str]) -> Optional[tuple]:
+        """The extract() result stored under `cache_key`, or None."""
+        if cache_key is None:
+            return None
+        hit = self.cache.get(cache_key)
+        if hit is None:
+            return None
+        # Callers merge heuristics into data in place; never hand out the cached object
+        hit = copy.deepcopy(hit)
+        return hit["data"], hit["confidence"], 0, 0, 0, 0.0, hit["model"], {"cache_hit": True, "cached_tokens": 0}
+
+    def _remember(self, cache_key: Optional[str], data: Any, confidence: Dict[str, float], model_used: str) -> None:
+        if cache_key is not None and not (isinstance(data, dict) and "_dev_note" in data):
+            self.cache.set(cache_key, copy.deepcopy({"data": data, "confidence": confidence, "model": model_used}))
+
+    def build_packed_instructions(self, form_schema: Dict[str, Any]) -> str:
+        """Instructions for several independent documents answered in one completion.
+
+        A header of its own rather than build_instructions() plus an addendum, whose
+        "return ONLY a JSON object of field ids" would contradict the items wrapper.
+        """
+        return (
+            "You are an information extraction engine.\n"
+            "Several independent source texts follow, each introduced by a line '### ITEM <n> ###'.\n"
+            'Return ONLY a valid JSON object of the form {"items": [<object for item 1>, <object for item 2>, ...]} '
+            "with exactly one object per item, in item order.\n"
+            "Rules: No prose, no explanations, no Markdown. Keys of each item object must exactly match field 'id' "
+            "values. Extract each item separately; never carry values from one item into another.\n"
+            f"Fields schema (IDs/types/enums): {form_schema.get('fields', [])}\n"
+        )
+
+    async def extract_packed(self, provider_name: str, form_schema: Dict[str, Any], text_blobs: List[str],
+                             model_override: Optional[str] = None) -> Tuple[Optional[List[tuple]], Dict[str, Any]]:
+        """Extract several texts for one schema with a single completion.
+
+        The schema instructions are sent once for the whole group. Returns (results,
+        usage): one extract()-shaped tuple per text (tokens and cost apportioned by
+        size, info carries micro_batch_size), or None when the response cannot be
+        split back into exactly len(text_blobs) objects; callers then fall back to
+        extract(). `usage` ({llm_ms, tokens_in, tokens_out, cost}) is what the packed
+        call itself spent, so a fallback can still account for it.
+        Provider errors raise ValueError like extract().
+        """
+        provider = self.providers[provider_name]
+        instructions = self.build_packed_instructions(form_schema)
+        prompt = "\n\n".join(f"### ITEM {i} ###\n{t}" for i, t in enumerate(text_blobs, 1))
+        try:
+            async with provider_limiter.slot(provider_name):
+                with timer() as t_llm:
+                    raw, usage = await provider.complete(prompt=prompt, model=model_override, instructions=instructions)
+        except Exception as e:
+            raise ValueError(f"LLM provider error: {e}") from e
+        llm_ms = t_llm()
+
+        tokens_in = usage.get("prompt_tokens") or estimate_tokens(instructions + prompt)
+        tokens_out = usage.get("completion_tokens") or estimate_tokens(raw)
+        cached_tokens = min(usage.get("cached_tokens") or 0, tokens_in)
+        model_used = usage.get("model") or model_override or getattr(provider, "model", None) or "unknown"
+        spent = {
+            "llm_ms": llm_ms,
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "cost": self.estimate_cost(provider_name, model_used, tokens_in, tokens_out, cached_tokens),
+        }
+
+        try:
+            parsed = safe_json_parse(raw)
+        except Exception:
+            return None, spent
+        items = parsed.get("items") if isinstance(parsed, dict) else parsed
+        if not isinstance(items, list) or len(items) != len(text_blobs) or not all(isinstance(d, dict) for d in items):
+            return None, spent
+
+        in_weights = [len(t) or 1 for t in text_blobs]
+        out_weights = [len(json.dumps(d, default=str)) for d in items]
+        results = []
+        for i, (text_blob, data) in enumerate(zip(text_blobs, items)):
+            item_in = round(tokens_in * in_weights[i] / sum(in_weights))
+            item_out = round(tokens_out * out_weights[i] / sum(out_weights))
+            item_cached = round(cached_tokens * in_weights[i] / sum(in_weights))
+            confidence = {k: 0.8 for k in data.keys()}
+            self._remember(
+                self.cache_key(provider_name, model_override, form_schema, None, text_blob), data, confidence, model_used
+            )
+            cost = self.estimate_cost(provider_name, model_used, item_in, item_out, item_cached)
+            info = {"cache_hit": False, "cached_tokens": item_cached, "micro_batch_size": len(text_blobs)}
+            results.append((data, confidence, llm_ms, item_in, item_out, cost, model_used, info))
+        return results, spent
+
+    def estimate_cost(
+        self, provider_name: str, model_used: str, tokens_in: int, tokens_out: int, cached_tokens: int = 0
+    ) -> float:
+        """USD cost of one completion, using per-model pricing where available, otherwise provider defaults."""
         cost: float = 0.0
         model_key = (model_used or "").lower()
         pricing = None
@@ -125,8 +373,16 @@ class ExtractionRouter:
         except Exception:
             pricing = None
 
+        # Prompt-cache hits are billed at the discounted cached-input rate
+        uncached_in = tokens_in - cached_tokens
         if pricing:
-            cost = (tokens_in / 1000.0) * pricing.get("input", 0.0) + (tokens_out / 1000.0) * pricing.get("output", 0.0)
+            cin = pricing.get("input", 0.0)
+            cached_rate = pricing.get("cached_input", cin * settings.PROMPT_CACHE_PRICE_RATIO)
+            cost = (
+                (uncached_in / 1000.0) * cin
+                + (cached_tokens / 1000.0) * cached_rate
+                + (tokens_out / 1000.0) * pricing.get("output", 0.0)
+            )
         else:
             # fallback to provider-level defaults
             if provider_name == "openai":
@@ -137,6 +393,9 @@ class ExtractionRouter:
                 cout = getattr(settings, "PRICE_GROQ_PER_1K_OUTPUT", 0.0)
             else:
                 cin = cout = 0.0
-            cost = (tokens_in / 1000.0) * cin + (tokens_out / 1000.0) * cout
-        
-        return data, confidence, llm_ms, tokens_in, tokens_out, cost, model_used
+            cost = (
+                (uncached_in / 1000.0) * cin
+                + (cached_tokens / 1000.0) * cin * settings.PROMPT_CACHE_PRICE_RATIO
+                + (tokens_out / 1000.0) * cout
+            )
+        return cost
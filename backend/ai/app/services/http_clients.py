@@ -0,0 +1,136 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+import os
+import threading
+import httpx
+from ..config import settings
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+
+    HTTP2_AVAILABLE = True
+except Exception:
+    HTTP2_AVAILABLE = False
+
+try:
+    from openai import AsyncOpenAI, OpenAI
+except Exception:
+    AsyncOpenAI = OpenAI = None
+
+try:
+    from groq import AsyncGroq
+except Exception:
+    AsyncGroq = None
+
+
+# One keep-alive pool per upstream (and sync/async flavour), plus the SDK clients
+# built on top of them. Every provider, OCR, Whisper API and Spitch call goes
+# through these so TLS sessions and connections are reused process-wide.
+_lock = threading.RLock()  # SDK builders re-enter _shared for their httpx pool
+_clients: Dict[Tuple[str, ...], Any] = {}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS)
+
+
+def _http2() -> bool:
+    return settings.HTTP2_ENABLED and HTTP2_AVAILABLE
+
+
+def _shared(key: Tuple[str, ...], build: Callable[[], Any]) -> Any:
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = build()
+        return client
+
+
+def async_http_client(upstream: str) -> httpx.AsyncClient:
+    """Pooled async HTTP client for `upstream` (e.g. "openai", "groq")."""
+    return _shared(
+        ("httpx-async", upstream),
+        lambda: httpx.AsyncClient(limits=_limits(), timeout=_timeout(), http2=_http2()),
+    )
+
+
+def sync_http_client(upstream: str) -> httpx.Client:
+    """Pooled blocking HTTP client for `upstream`; safe to share across ASR threads."""
+    return _shared(
+        ("httpx-sync", upstream),
+        lambda: httpx.Client(limits=_limits(), timeout=_timeout(), http2=_http2()),
+    )
+
+
+def openai_async_client(api_key: Optional[str]):
+    """Shared AsyncOpenAI client, or None when the key or SDK is missing."""
+    if not (api_key and AsyncOpenAI):
+        return None
+    return _shared(
+        ("openai-async", api_key),
+        lambda: AsyncOpenAI(
+            api_key=api_key, http_client=async_http_client("openai"), max_retries=settings.HTTP_MAX_RETRIES
+        ),
+    )
+
+
+def openai_sync_client(api_key: Optional[str]):
+    """Shared blocking OpenAI client (Whisper API), or None when the key or SDK is missing."""
+    if not (api_key and OpenAI):
+        return None
+    return _shared(
+        ("openai-sync", api_key),
+        lambda: OpenAI(api_key=api_key, http_client=sync_http_client("openai"), max_retries=settings.HTTP_MAX_RETRIES),
+    )
+
+
+def groq_async_client(api_key: Optional[str]):
+    """Shared AsyncGroq client, or None when the key or SDK is missing."""
+    if not (api_key and AsyncGroq):
+        return None
+    return _shared(
+        ("groq-async", api_key),
+        lambda: AsyncGroq(api_key=api_key, http_client=async_http_client("groq"), max_retries=settings.HTTP_MAX_RETRIES),
+    )
+
+
+def spitch_client():
+    """Shared Spitch SDK client; raises if SPITCH_API_KEY or the SDK is unavailable."""
+    if not settings.SPITCH_API_KEY:
+        raise RuntimeError("SPITCH_API_KEY not configured")
+    api_key = settings.SPITCH_API_KEY
+
+    def build():
+        # Ensure the SDK sees the key (explicit arg + env for good measure)
+        os.environ.setdefault("SPITCH_API_KEY", api_key)
+        # Lazy import to avoid hard dependency when not used
+        from spitch import Spitch  # type: ignore
+
+        return Spitch(api_key=api_key, http_client=sync_http_client("spitch"), max_retries=settings.HTTP_MAX_RETRIES)
+
+    return _shared(("spitch", api_key), build)
+
+
+async def aclose_all() -> None:
+    """Close every pooled connection (application shutdown)."""
+    with _lock:
+        clients = list(_clients.items())
+        _clients.clear()
+    for (kind, _), client in clients:
+        if kind == "httpx-async":
+            await client.aclose()
+        elif kind == "httpx-sync":
+            client.close()
+
+
+def pool_stats() -> Dict[str, Any]:
+    with _lock:
+        upstreams = sorted(f"{k[0]}:{k[1]}" for k in _clients if k[0].startswith("httpx"))
+    return {"http2": _http2(), "pools": upstreams}
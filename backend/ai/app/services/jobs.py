@@ -0,0 +1,444 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+import asyncio
+import ipaddress
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from .http_clients import async_http_client
+
+# Pipeline stages in the order they normally run; not every job goes through all of them
+STAGES = ("upload", "asr", "ocr", "translation", "llm", "validation")
+TERMINAL = ("succeeded", "failed", "cancelled")
+
+
+def check_callback_url(url: str, allowed_hosts: Sequence[str] = ()) -> None:
+    """Raise ValueError unless job results may be POSTed to `url`.
+
+    With `allowed_hosts` the host must be one of them (or a subdomain). Otherwise it
+    must resolve to public addresses only: loopback, private, link-local (cloud
+    metadata) and other reserved ranges are refused. Resolves DNS, so it blocks.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    host = parts.hostname.lower().rstrip(".")
+    if allowed_hosts:
+        if not any(host == h or host.endswith("." + h) for h in (a.lower().strip(".") for a in allowed_hosts)):
+            raise ValueError(f"callback host '{host}' is not allowed")
+        return
+    try:
+        infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80), proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise ValueError(f"callback host '{host}' does not resolve")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global:
+            raise ValueError(f"callback host '{host}' resolves to a non-public address")
+
+
+class JobError(Exception):
+    """A job attempt failed; `retryable=False` stops further attempts."""
+
+    def __init__(self, message: str, retryable: bool = True) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str  # queued | running | succeeded | failed | cancelled
+    params: Dict[str, Any]
+    files_dir: Optional[str]
+    attempts: int
+    max_attempts: int
+    progress: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    callback_url: Optional[str] = None
+    callback_status: Optional[str] = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    next_attempt_at: float = 0.0
+
+
+_COLUMNS = (
+    "id, kind, status, params, files_dir, attempts, max_attempts, progress, result, error, "
+    "callback_url, callback_status, created_at, updated_at, next_attempt_at"
+)
+
+
+def _row_to_job(row) -> Job:
+    (id_, kind, status, params, files_dir, attempts, max_attempts, progress, result, error,
+     callback_url, callback_status, created_at, updated_at, next_attempt_at) = row
+    return Job(
+        id=id_,
+        kind=kind,
+        status=status,
+        params=json.loads(params),
+        files_dir=files_dir,
+        attempts=attempts,
+        max_attempts=max_attempts,
+        progress=json.loads(progress) if progress else [],
+        result=json.loads(result) if result else None,
+        error=error,
+        callback_url=callback_url,
+        callback_status=callback_status,
+        created_at=created_at,
+        updated_at=updated_at,
+        next_attempt_at=next_attempt_at,
+    )
+
+
+class JobStore:
+    """SQLite-backed job table. `path=None` keeps it in memory (lost on restart).
+
+    The database (and its directory) is only created by open(), or on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self._lock = threading.Lock()
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    def open(self) -> None:
+        with self._lock:
+            self._conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # Callers hold self._lock
+        if self._db is None:
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path or ":memory:", check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "params TEXT NOT NULL, files_dir TEXT, attempts INTEGER NOT NULL, max_attempts INTEGER NOT NULL, "
+                "progress TEXT, result TEXT, error TEXT, callback_url TEXT, callback_status TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, next_attempt_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, next_attempt_at)")
+            conn.commit()
+            self._db = conn
+        return self._db
+
+    def create(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        max_attempts: int,
+        files_dir: Optional[str] = None,
+        callback_url: Optional[str] = None,
+        job_id: Optional[str] = None,
+    ) -> Job:
+        now = time.time()
+        job = Job(
+            id=job_id or uuid.uuid4().hex,
+            kind=kind,
+            status="queued",
+            params=params,
+            files_dir=files_dir,
+            attempts=0,
+            max_attempts=max(1, max_attempts),
+            progress=[{"stage": "upload", "status": "done", "started_at": now, "finished_at": now}],
+            callback_url=callback_url,
+            created_at=now,
+            updated_at=now,
+            next_attempt_at=now,
+        )
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({_COLUMNS}) VALUES ({', '.join('?' * 15)})",
+                (job.id, kind, job.status, json.dumps(params), files_dir, 0, job.max_attempts,
+                 json.dumps(job.progress), None, None, callback_url, None, now, now, now),
+            )
+            self._conn.commit()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def claim_next(self) -> Optional[Job]:
+        """Atomically move the oldest due queued job to running and return it."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE status = 'queued' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            job = _row_to_job(row)
+            job.status = "running"
+            job.attempts += 1
+            job.updated_at = now
+            # Guarded on status so another process sharing the database cannot claim it too
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = ?, updated_at = ? WHERE id = ? AND status = 'queued'",
+                (job.attempts, now, job.id),
+            ).rowcount
+            self._conn.commit()
+        return job if claimed else None
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next queued job is due (0 if one is due now), None if none queued."""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_attempt_at) FROM jobs WHERE status = 'queued'").fetchone()
+        if row is None or row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def save(self, job: Job) -> None:
+        job.updated_at = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, progress = ?, result = ?, error = ?, "
+                "callback_status = ?, updated_at = ?, next_attempt_at = ? WHERE id = ?",
+                (job.status, job.attempts, json.dumps(job.progress),
+                 json.dumps(job.result) if job.result is not None else None, job.error,
+                 job.callback_status, job.updated_at, job.next_attempt_at, job.id),
+            )
+            self._conn.commit()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet. Returns False when it is running or done."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def requeue_running(self) -> int:
+        """Return jobs left running by a previous process to the queue (their attempt is not counted)."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), next_attempt_at = ? "
+                "WHERE status = 'running'",
+                (time.time(),),
+            )
+            self._conn.commit()
+        return cur.rowcount
+
+    def purge_finished(self, older_than_seconds: float) -> List[Job]:
+        cutoff = time.time() - older_than_seconds
+        placeholders = ", ".join("?" * len(TERMINAL))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE status IN ({placeholders}) AND updated_at < ?",
+                (*TERMINAL, cutoff),
+            ).fetchall()
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE status IN ({placeholders}) AND updated_at < ?", (*TERMINAL, cutoff)
+            )
+            self._conn.commit()
+        return [_row_to_job(r) for r in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+_progress: ContextVar[Optional[Callable[[str], None]]] = ContextVar("job_progress", default=None)
+
+
+def report_stage(stage: str) -> None:
+    """Mark `stage` as started for the job running in this context (no-op outside jobs)."""
+    callback = _progress.get()
+    if callback is not None:
+        callback(stage)
+
+
+Handler = Callable[[Job], Awaitable[Dict[str, Any]]]
+
+
+class JobRunner:
+    """Background workers that execute queued jobs from a JobStore.
+
+    Each job kind maps to a handler coroutine returning the JSON-ready result.
+    A failed attempt is retried with exponential backoff (`retry_backoff_seconds`
+    doubled per attempt) until `max_attempts`, unless it raised a non-retryable
+    JobError. Stage changes reported via `report_stage` are persisted as progress.
+    On a terminal state the job's files are deleted and, if set, its callback URL
+    receives the job status as JSON (after check_callback_url).
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        handlers: Dict[str, Handler],
+        workers: int = 2,
+        retry_backoff_seconds: float = 5.0,
+        retention_seconds: float = 7 * 24 * 3600,
+        poll_seconds: float = 1.0,
+        callback_attempts: int = 3,
+        files_root: Optional[str] = None,
+        callback_allowed_hosts: Sequence[str] = (),
+    ) -> None:
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.retention_seconds = retention_seconds
+        self.poll_seconds = poll_seconds
+        self.callback_attempts = callback_attempts
+        self.files_root = files_root
+        self.callback_allowed_hosts = callback_allowed_hosts
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        self.store.requeue_running()
+        self._purge()
+        self._sweep_orphans()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was submitted."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def _purge(self) -> None:
+        self._last_purge = time.time()
+        for job in self.store.purge_finished(self.retention_seconds):
+            if job.files_dir:
+                shutil.rmtree(job.files_dir, ignore_errors=True)
+
+    def _sweep_orphans(self) -> None:
+        # Upload directories of jobs the store no longer knows (e.g. an in-memory store before a restart)
+        if not self.files_root or not os.path.isdir(self.files_root):
+            return
+        for name in os.listdir(self.files_root):
+            path = os.path.join(self.files_root, name)
+            if os.path.isdir(path) and self.store.get(name) is None:
+                shutil.rmtree(path, ignore_errors=True)
+
+    async def _worker(self) -> None:
+        while True:
+            job = self.store.claim_next()
+            if job is None:
+                if time.time() - self._last_purge > 3600:
+                    self._purge()
+                due = self.store.next_due_in()
+                timeout = self.poll_seconds if due is None else min(max(due, 0.01), self.poll_seconds)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    def _stage_callback(self, job: Job) -> Callable[[str], None]:
+        def mark(stage: str) -> None:
+            now = time.time()
+            for entry in job.progress:
+                if entry["status"] == "running":
+                    entry["status"] = "done"
+                    entry["finished_at"] = now
+            job.progress.append({"stage": stage, "status": "running", "started_at": now, "attempt": job.attempts})
+            self.store.save(job)
+
+        return mark
+
+    async def _run(self, job: Job) -> None:
+        handler = self.handlers.get(job.kind)
+        token = _progress.set(self._stage_callback(job))
+        try:
+            if handler is None:
+                raise JobError(f"no handler for job kind '{job.kind}'", retryable=False)
+            result = await handler(job)
+        except asyncio.CancelledError:
+            # Shutdown: leave it for requeue_running on the next start
+            raise
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)
+            job.error = str(e) if isinstance(e, JobError) else f"{type(e).__name__}: {e}"
+            self._close_stages(job, "failed")
+            if retryable and job.attempts < job.max_attempts:
+                job.status = "queued"
+                job.next_attempt_at = time.time() + self.retry_backoff_seconds * (2 ** (job.attempts - 1))
+                self.store.save(job)
+                return
+            job.status = "failed"
+        else:
+            job.status = "succeeded"
+            job.result = result
+            job.error = None
+            self._close_stages(job, "done")
+        finally:
+            _progress.reset(token)
+        self.store.save(job)
+        if job.files_dir:
+            shutil.rmtree(job.files_dir, ignore_errors=True)
+        if job.callback_url:
+            await self._send_callback(job)
+
+    @staticmethod
+    def _close_stages(job: Job, status: str) -> None:
+        now = time.time()
+        for entry in job.progress:
+            if entry["status"] == "running":
+                entry["status"] = status
+                entry["finished_at"] = now
+
+    async def _send_callback(self, job: Job) -> None:
+        payload = {"job_id": job.id, "kind": job.kind, "status": job.status, "result": job.result, "error": job.error}
+        try:
+            # Checked again at delivery: DNS may have changed since the job was accepted
+            await asyncio.to_thread(check_callback_url, job.callback_url, self.callback_allowed_hosts)
+        except ValueError as e:
+            job.callback_status = f"rejected:{e}"
+            self.store.save(job)
+            return
+        client = async_http_client("callbacks")
+        for attempt in range(self.callback_attempts):
+            if attempt:
+                await asyncio.sleep(self.retry_backoff_seconds * (2 ** (attempt - 1)))
+            try:
+                resp = await client.post(job.callback_url, json=payload)
+            except Exception as e:
+                job.callback_status = f"failed:{type(e).__name__}"
+                continue
+            job.callback_status = f"{'delivered' if resp.status_code < 500 else 'failed'}:{resp.status_code}"
+            if resp.status_code < 500:
+                break
+        self.store.save(job)
+
+
+def job_db_path(data_dir: Optional[str] = None) -> Optional[str]:
+    """SQLite file of the job queue under `data_dir`; None (in memory) without one."""
+    return os.path.join(os.path.abspath(data_dir), "jobs.sqlite3") if data_dir else None
+
+
+def job_files_root(data_dir: Optional[str] = None) -> str:
+    """Directory under which each job keeps its uploaded files until it finishes."""
+    if data_dir:
+        return os.path.join(os.path.abspath(data_dir), "files")
+    return os.path.join(tempfile.gettempdir(), "tattara-jobs")
@@ -0,0 +1,193 @@
+from typing import Any, List, Optional, Tuple
+import io
+import threading
+from .audio_chunking import SAMPLE_RATE, _frame_energy, chunking_available
+
+try:
+    import av
+    import numpy as np
+except Exception:
+    av = None
+    np = None
+
+ENCODINGS = ("pcm_s16le", "container")
+
+
+def live_audio_available(encoding: str) -> bool:
+    """Raw PCM only needs numpy; container streams are decoded with PyAV as well."""
+    return chunking_available() if encoding != "pcm_s16le" else np is not None
+
+
+class _ByteStream(io.RawIOBase):
+    """Read side of bytes appended from another thread; reads block until data arrives or finish()."""
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._cond = threading.Condition()
+        self._finished = False
+
+    def readable(self) -> bool:
+        return True
+
+    def feed(self, data: bytes) -> None:
+        with self._cond:
+            self._buf.extend(data)
+            self._cond.notify()
+
+    def finish(self) -> None:
+        with self._cond:
+            self._finished = True
+            self._cond.notify()
+
+    def readinto(self, b) -> int:
+        with self._cond:
+            while not self._buf and not self._finished:
+                self._cond.wait()
+            n = min(len(b), len(self._buf))
+            b[:n] = self._buf[:n]
+            del self._buf[:n]
+            return n
+
+
+class LiveAudioBuffer:
+    """Audio arriving over a live connection, handed out as ASR-sized segments.
+
+    Frames are raw PCM (`pcm_s16le`, mono at `sample_rate`) or consecutive pieces of
+    one container stream (`container`, e.g. WebM/Opus from a browser MediaRecorder).
+    Container pieces cannot be decoded on their own, so one PyAV decoder runs in a
+    background thread for the whole stream and is fed only the new bytes.
+
+    A segment is released once `segment_seconds` of new audio is pending, cut at the
+    quietest 30 ms frame of its second half so words are not split. Segments whose
+    loudest frame stays under `silence_dbfs` are skipped (they are not worth an ASR
+    call and tend to produce hallucinated text). append() is cheap and may run on
+    the event loop; next_segment() may wait for the decoder and should run in a
+    worker thread. close() stops the decoder.
+    """
+
+    def __init__(
+        self,
+        encoding: str = "pcm_s16le",
+        sample_rate: int = SAMPLE_RATE,
+        segment_seconds: float = 5.0,
+        silence_dbfs: float = -45.0,
+    ) -> None:
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.segment_samples = max(1, int(segment_seconds * SAMPLE_RATE))
+        self.silence_level = 10 ** (silence_dbfs / 20.0)
+        self._lock = threading.Lock()
+        self._raw = bytearray()  # PCM not yet converted
+        self._decoded: List[Any] = []  # container samples decoded but not yet pulled
+        self._stream: Optional[_ByteStream] = None
+        self._decoder: Optional[threading.Thread] = None
+        self.decode_error: Optional[str] = None
+        self._samples: Any = np.zeros(0, dtype=np.float32) if np is not None else None
+        self._offset = 0  # absolute sample index of self._samples[0]
+        self._cut = 0  # absolute sample index up to which audio was handed out
+        self.received_bytes = 0
+        self.skipped_seconds = 0.0
+
+    def append(self, data: bytes) -> None:
+        with self._lock:
+            self.received_bytes += len(data)
+            if self.encoding == "pcm_s16le":
+                self._raw.extend(data)
+                return
+            if self._stream is None:
+                self._stream = _ByteStream()
+                self._decoder = threading.Thread(target=self._decode, name="live-audio-decoder", daemon=True)
+                self._decoder.start()
+        self._stream.feed(data)
+
+    def close(self) -> None:
+        """End of input: the decoder drains what it has and exits."""
+        if self._stream is not None:
+            self._stream.finish()
+
+    def _decode(self) -> None:
+        resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        try:
+            with av.open(self._stream, mode="r") as container:
+                for frame in container.decode(audio=0):
+                    self._push(resampler.resample(frame))
+                self._push(resampler.resample(None))
+        except Exception as e:
+            self.decode_error = f"{type(e).__name__}: {e}"
+
+    def _push(self, frames) -> None:
+        parts = [f.to_ndarray().reshape(-1).astype(np.float32) / 32768.0 for f in frames]
+        if parts:
+            with self._lock:
+                self._decoded.extend(parts)
+
+    @property
+    def received_seconds(self) -> float:
+        if self.encoding == "pcm_s16le":
+            return self.received_bytes / 2 / self.sample_rate
+        with self._lock:
+            pending = sum(len(p) for p in self._decoded)
+        return (self._offset + len(self._samples) + pending) / SAMPLE_RATE
+
+    def _pull(self, final: bool = False) -> None:
+        if self.encoding != "pcm_s16le":
+            if final and self._decoder is not None:
+                self.close()
+                self._decoder.join()
+            with self._lock:
+                parts, self._decoded = self._decoded, []
+            if parts:
+                self._samples = np.concatenate([self._samples, *parts])
+            return
+        with self._lock:
+            usable = len(self._raw) - len(self._raw) % 2
+            pcm = bytes(self._raw[:usable])
+            del self._raw[:usable]
+        new = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+        if self.sample_rate != SAMPLE_RATE and len(new):
+            n_out = int(len(new) * SAMPLE_RATE / self.sample_rate)
+            new = np.interp(
+                np.arange(n_out) * (self.sample_rate / SAMPLE_RATE), np.arange(len(new)), new
+            ).astype(np.float32)
+        self._samples = np.concatenate([self._samples, new])
+
+    def next_segment(self, final: bool = False) -> Optional[Tuple[float, float, Any]]:
+        """The next (start_seconds, end_seconds, samples) to transcribe, or None if none is due.
+
+        With `final` everything still pending is returned, however short.
+        """
+        self._pull(final)
+        while True:
+            start = self._cut - self._offset
+            pending = len(self._samples) - start
+            if pending <= 0 or (not final and pending < self.segment_samples):
+                return None
+            if final:
+                end = len(self._samples)
+            else:
+                end = start + self._cut_point(self._samples[start:])
+            segment = self._samples[start:end]
+            seg_start, seg_end = self._cut / SAMPLE_RATE, (self._offset + end) / SAMPLE_RATE
+            self._cut = self._offset + end
+            self._release(end)
+            energy, _ = _frame_energy(segment, SAMPLE_RATE)
+            if len(energy) and float(energy.max()) >= self.silence_level:
+                return round(seg_start, 3), round(seg_end, 3), segment
+            self.skipped_seconds += seg_end - seg_start
+            if not final and len(self._samples) - (self._cut - self._offset) < self.segment_samples:
+                return None
+
+    def _cut_point(self, pending) -> int:
+        energy, frame = _frame_energy(pending, SAMPLE_RATE)
+        lo = (self.segment_samples // 2) // frame
+        if len(energy) <= lo:
+            return len(pending)
+        best = lo + int(np.argmin(energy[lo:]))
+        return min(len(pending), best * frame + frame // 2)
+
+    def _release(self, upto: int) -> None:
+        # Handed-out samples are dropped
+        self._samples = self._samples[upto:]
+        self._offset += upto
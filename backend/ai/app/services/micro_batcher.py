@@ -0,0 +1,148 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+
+
+class _Group:
+    def __init__(self, form_schema: Dict[str, Any]) -> None:
+        self.form_schema = form_schema
+        self.items: List[Tuple[str, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """Pack concurrent single-document extractions for one schema and model into one call.
+
+    The first request for a (provider, model, schema) key opens a group and waits up
+    to `window_ms`; requests arriving meanwhile join it, and a full group
+    (`max_items`) is sent at once. Groups of one go through router.extract as usual.
+    Larger groups share one set of schema instructions via router.extract_packed,
+    saving the repeated header tokens and all but one request against the provider's
+    RPM budget. When the packed answer cannot be split back per item, every item is
+    retried with its own call, and the wasted packed call is added to their usage
+    and cost (split by document size) so spend is not under-reported.
+    """
+
+    def __init__(self, router, window_ms: float, max_items: int) -> None:
+        self.router = router
+        self.window = max(window_ms, 0) / 1000.0
+        self.max_items = max(max_items, 1)
+        self._groups: Dict[Tuple[str, Optional[str], str], _Group] = {}
+        self.requests = 0
+        self.packed_calls = 0
+        self.packed_items = 0
+        self.fallbacks = 0
+        self.wasted_tokens_in = 0
+        self.wasted_tokens_out = 0
+        self.wasted_cost = 0.0
+
+    async def extract(
+        self,
+        provider_name: str,
+        form_schema: Dict[str, Any],
+        schema_hash: str,
+        text_blob: str,
+        model_override: Optional[str] = None,
+    ) -> tuple:
+        """Same result tuple as router.extract(provider_name, form_schema, text_blob, ...)."""
+        self.requests += 1
+        hit = self.router.cached(self.router.cache_key(provider_name, model_override, form_schema, None, text_blob))
+        if hit is not None:
+            return hit
+
+        key = (provider_name, model_override, schema_hash)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(form_schema)
+            group.timer = asyncio.get_running_loop().call_later(self.window, self._flush, key, group)
+        future = asyncio.get_running_loop().create_future()
+        group.items.append((text_blob, future))
+        if len(group.items) >= self.max_items:
+            self._flush(key, group)
+        return await future
+
+    def _flush(self, key: Tuple[str, Optional[str], str], group: _Group) -> None:
+        if self._groups.get(key) is not group:
+            return
+        del self._groups[key]
+        if group.timer is not None:
+            group.timer.cancel()
+        task = asyncio.ensure_future(self._run(key[0], key[1], group))
+        # Outcomes are delivered through the item futures
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _run(self, provider_name: str, model_override: Optional[str], group: _Group) -> None:
+        items = [(text, fut) for text, fut in group.items if not fut.done()]
+        if not items:
+            return
+        wasted: Optional[Dict[str, Any]] = None
+        if len(items) > 1:
+            try:
+                results, spent = await self.router.extract_packed(
+                    provider_name, group.form_schema, [text for text, _ in items], model_override
+                )
+            except Exception as e:
+                for _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                return
+            if results is not None:
+                self.packed_calls += 1
+                self.packed_items += len(items)
+                for (_, fut), result in zip(items, results):
+                    if not fut.done():
+                        fut.set_result(result)
+                return
+            self.fallbacks += 1
+            self.wasted_tokens_in += spent["tokens_in"]
+            self.wasted_tokens_out += spent["tokens_out"]
+            self.wasted_cost += spent["cost"]
+            wasted = spent
+        weights = [len(text) or 1 for text, _ in items]
+        await asyncio.gather(
+            *(
+                self._single(
+                    provider_name, model_override, group.form_schema, text, fut,
+                    wasted, weights[i] / sum(weights), len(items),
+                )
+                for i, (text, fut) in enumerate(items)
+            )
+        )
+
+    async def _single(
+        self, provider_name: str, model_override: Optional[str], form_schema: Dict[str, Any], text_blob: str,
+        fut: asyncio.Future, wasted: Optional[Dict[str, Any]] = None, share: float = 1.0, group_size: int = 1,
+    ) -> None:
+        try:
+            result = await self.router.extract(
+                provider_name=provider_name, form_schema=form_schema, text_blob=text_blob, model_override=model_override
+            )
+        except Exception as e:
+            if not fut.done():
+                fut.set_exception(e)
+            return
+        if wasted is not None:
+            data, confidence, llm_ms, tokens_in, tokens_out, cost, model, info = result
+            result = (
+                data,
+                confidence,
+                llm_ms + wasted["llm_ms"],
+                tokens_in + round(wasted["tokens_in"] * share),
+                tokens_out + round(wasted["tokens_out"] * share),
+                cost + wasted["cost"] * share,
+                model,
+                {**info, "micro_batch_fallback": group_size},
+            )
+        if not fut.done():
+            fut.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_groups": len(self._groups),
+            "requests": self.requests,
+            "packed_calls": self.packed_calls,
+            "packed_items": self.packed_items,
+            "fallbacks": self.fallbacks,
+            "wasted_tokens_in": self.wasted_tokens_in,
+            "wasted_tokens_out": self.wasted_tokens_out,
+            "wasted_cost_usd": round(self.wasted_cost, 6),
+        }
@@ -1,9 +1,7 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
 
-try:
-    from groq import Groq as GroqClient
-except Exception:
-    GroqClient = None
+from ..http_clients import groq_async_client
+from ..utils import cached_prompt_tokens, system_prompt
 
 
 class GroqProvider:
@@ -13,13 +11,56 @@ class GroqProvider:
 
     def __init__(self, api_key: Optional[str], model: str):
         self.model = model
-        self.client = GroqClient(api_key=api_key) if (api_key and GroqClient) else None
+        self.client = groq_async_client(api_key)  # shared pooled client
 
-    def complete(self, prompt: str, images: Optional[List[str]] = None, ocr_blocks: Optional[List[dict]] = None, locale: Optional[str] = None, model: Optional[str] = None) -> tuple[str, Dict[str, Any]]:
+    async def complete(
+        self,
+        prompt: str,
+        images: Optional[List[str]] = None,
+        ocr_blocks: Optional[List[dict]] = None,
+        locale: Optional[str] = None,
+        model: Optional[str] = None,
+        instructions: Optional[str] = None,
+    ) -> tuple[str, Dict[str, Any]]:
         model_used = model or self.model
         if not self.client:
             return '{"_dev_note": "Groq client missing; echoing"}', {"prompt_tokens": 0, "completion_tokens": 0, "model": model_used}
 
+        resp = await self.client.chat.completions.create(
+            **self.request_body(prompt, images, ocr_blocks, model_used, instructions)
+        )
+        text = resp.choices[0].message.content or "{}"
+        model_from_resp = None
+        try:
+            model_from_resp = getattr(resp, "model", None)
+        except Exception:
+            model_from_resp = None
+        model_final = model_from_resp or model_used
+        usage = {
+            "prompt_tokens": getattr(resp, "usage", None).prompt_tokens if getattr(resp, "usage", None) else None,
+            "completion_tokens": getattr(resp, "usage", None).completion_tokens if getattr(resp, "usage", None) else None,
+            "cached_tokens": cached_prompt_tokens(resp),
+            "model": model_final,
+        }
+        return text, usage
+
+    def request_body(
+        self,
+        prompt: str,
+        images: Optional[List[str]] = None,
+        ocr_blocks: Optional[List[dict]] = None,
+        model: Optional[str] = None,
+        instructions: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Chat-completions request settings shared by complete(), stream() and batch files."""
+        return {
+            "model": model or self.model,
+            "messages": self._messages(prompt, images, ocr_blocks, instructions),
+            "temperature": 0,
+        }
+
+    @staticmethod
+    def _messages(prompt: str, images: Optional[List[str]], ocr_blocks: Optional[List[dict]], instructions: Optional[str]) -> List[Dict[str, Any]]:
         # Build a single string message. The Groq client expects message content to be a string
         # so we embed image data URLs and OCR blocks as plain text appended to the prompt.
         parts = [prompt]
@@ -37,25 +78,43 @@ class GroqProvider:
                 parts.append("OCR blocks present.")
 
         content_str = "\n\n".join(parts)
+        return [
+            {"role": "system", "content": system_prompt(instructions)},
+            {"role": "user", "content": content_str},
+        ]
 
-        resp = self.client.chat.completions.create(
-            model=model_used,
-            messages=[
-                {"role": "system", "content": "Respond ONLY with valid JSON. No markdown."},
-                {"role": "user", "content": content_str},
-            ],
-            temperature=0,
+    async def stream(
+        self,
+        prompt: str,
+        images: Optional[List[str]] = None,
+        ocr_blocks: Optional[List[dict]] = None,
+        model: Optional[str] = None,
+        instructions: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Streaming variant of complete(): yields (text_delta, None) as tokens arrive, then ("", usage) once."""
+        model_used = model or self.model
+        if not self.client:
+            yield '{"_dev_note": "Groq client missing; echoing"}', None
+            yield "", {"prompt_tokens": 0, "completion_tokens": 0, "model": model_used}
+            return
+
+        stream = await self.client.chat.completions.create(
+            **self.request_body(prompt, images, ocr_blocks, model_used, instructions),
+            stream=True,
         )
-        text = resp.choices[0].message.content or "{}"
-        model_from_resp = None
-        try:
-            model_from_resp = getattr(resp, "model", None)
-        except Exception:
-            model_from_resp = None
-        model_final = model_from_resp or model_used
-        usage = {
-            "prompt_tokens": getattr(resp, "usage", None).prompt_tokens if getattr(resp, "usage", None) else None,
-            "completion_tokens": getattr(resp, "usage", None).completion_tokens if getattr(resp, "usage", None) else None,
-            "model": model_final,
-        }
-        return text, usage
+        usage: Dict[str, Any] = {"model": model_used}
+        async for chunk in stream:
+            if getattr(chunk, "model", None):
+                usage["model"] = chunk.model
+            # Groq reports usage on the last chunk under x_groq
+            chunk_usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if chunk_usage is not None:
+                usage.update(
+                    prompt_tokens=chunk_usage.prompt_tokens,
+                    completion_tokens=chunk_usage.completion_tokens,
+                    # Same field cached_prompt_tokens() reads, wherever this chunk carries usage
+                    cached_tokens=getattr(getattr(chunk_usage, "prompt_tokens_details", None), "cached_tokens", None),
+                )
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content, None
+        yield "", usage
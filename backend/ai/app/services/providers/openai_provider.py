@@ -1,10 +1,8 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
 import base64
 
-try:
-    from openai import OpenAI as OpenAIClient
-except Exception:
-    OpenAIClient = None
+from ..http_clients import openai_async_client
+from ..utils import cached_prompt_tokens, system_prompt
 
 
 class OpenAIProvider:
@@ -13,27 +11,23 @@ class OpenAIProvider:
 
     def __init__(self, api_key: Optional[str], model: str):
         self.model = model
-        self.client = OpenAIClient(api_key=api_key) if (api_key and OpenAIClient) else None
+        self.client = openai_async_client(api_key)  # shared pooled client
 
-    def complete(self, prompt: str, images: Optional[List[str]] = None, ocr_blocks: Optional[List[dict]] = None, locale: Optional[str] = None, model: Optional[str] = None) -> tuple[str, Dict[str, Any]]:
+    async def complete(
+        self,
+        prompt: str,
+        images: Optional[List[str]] = None,
+        ocr_blocks: Optional[List[dict]] = None,
+        locale: Optional[str] = None,
+        model: Optional[str] = None,
+        instructions: Optional[str] = None,
+    ) -> tuple[str, Dict[str, Any]]:
         model_used = model or self.model
         if not self.client:
             return '{"_dev_note": "OpenAI client missing; echoing"}', {"prompt_tokens": 0, "completion_tokens": 0, "model": model_used}
 
-        content = [{"type": "text", "text": prompt}]
-        if images:
-            for url in images:
-                content.append({"type": "image_url", "image_url": {"url": url}})
-        if ocr_blocks:
-            content.append({"type": "text", "text": f"OCR blocks: {ocr_blocks[:10]}"})
-
-        resp = self.client.chat.completions.create(
-            model=(model or self.model),
-            messages=[
-                {"role": "system", "content": "Respond ONLY with valid JSON. No markdown."},
-                {"role": "user", "content": content},
-            ],
-            temperature=1,
+        resp = await self.client.chat.completions.create(
+            **self.request_body(prompt, images, ocr_blocks, model_used, instructions)
         )
         text = resp.choices[0].message.content or "{}"
         # Try to read model from the provider response if available (some SDKs include it)
@@ -46,16 +40,85 @@ class OpenAIProvider:
         usage = {
             "prompt_tokens": getattr(resp, "usage", None).prompt_tokens if getattr(resp, "usage", None) else None,
             "completion_tokens": getattr(resp, "usage", None).completion_tokens if getattr(resp, "usage", None) else None,
+            "cached_tokens": cached_prompt_tokens(resp),
             "model": model_final,
         }
         return text, usage
 
-    def process_image(self, image_bytes: bytes, filename: str) -> Dict[str, Any] | str:
+    def request_body(
+        self,
+        prompt: str,
+        images: Optional[List[str]] = None,
+        ocr_blocks: Optional[List[dict]] = None,
+        model: Optional[str] = None,
+        instructions: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Chat-completions request settings shared by complete(), stream() and batch files."""
+        return {
+            "model": model or self.model,
+            "messages": self._messages(prompt, images, ocr_blocks, instructions),
+            "temperature": 1,
+        }
+
+    @staticmethod
+    def _messages(prompt: str, images: Optional[List[str]], ocr_blocks: Optional[List[dict]], instructions: Optional[str]) -> List[Dict[str, Any]]:
+        content = [{"type": "text", "text": prompt}]
+        if images:
+            for url in images:
+                content.append({"type": "image_url", "image_url": {"url": url}})
+        if ocr_blocks:
+            content.append({"type": "text", "text": f"OCR blocks: {ocr_blocks[:10]}"})
+        return [
+            {"role": "system", "content": system_prompt(instructions)},
+            {"role": "user", "content": content},
+        ]
+
+    async def stream(
+        self,
+        prompt: str,
+        images: Optional[List[str]] = None,
+        ocr_blocks: Optional[List[dict]] = None,
+        model: Optional[str] = None,
+        instructions: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Streaming variant of complete(): yields (text_delta, None) as tokens arrive, then ("", usage) once."""
+        model_used = model or self.model
+        if not self.client:
+            yield '{"_dev_note": "OpenAI client missing; echoing"}', None
+            yield "", {"prompt_tokens": 0, "completion_tokens": 0, "model": model_used}
+            return
+
+        stream = await self.client.chat.completions.create(
+            **self.request_body(prompt, images, ocr_blocks, model_used, instructions),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        usage: Dict[str, Any] = {"model": model_used}
+        async for chunk in stream:
+            if getattr(chunk, "model", None):
+                usage["model"] = chunk.model
+            if getattr(chunk, "usage", None):
+                # Only the final chunk carries usage (stream_options.include_usage)
+                usage.update(
+                    prompt_tokens=chunk.usage.prompt_tokens,
+                    completion_tokens=chunk.usage.completion_tokens,
+                    cached_tokens=cached_prompt_tokens(chunk),
+                )
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content, None
+        yield "", usage
+
+    async def process_image(self, image_bytes: bytes, filename: str) -> Dict[str, Any] | str:
         if not self.client:
             return {"text": "", "blocks": [], "_error": "openai client not initialized"}
 
         fn = filename.lower()
-        mime = "image/jpeg" if fn.endswith((".jpg", ".jpeg")) else "image/png"
+        if fn.endswith((".jpg", ".jpeg")):
+            mime = "image/jpeg"
+        elif fn.endswith(".webp"):
+            mime = "image/webp"
+        else:
+            mime = "image/png"
         data_url = f"data:{mime};base64,{base64.b64encode(image_bytes).decode('ascii')}"
 
         content = [
@@ -63,7 +126,7 @@ class OpenAIProvider:
             {"type": "text", "text": "Transcribe all visible text. Return plain text only, no JSON."},
         ]
         try:
-            resp = self.client.chat.completions.create(
+            resp = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an OCR assistant. Return only raw text."},
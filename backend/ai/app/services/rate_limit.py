@@ -0,0 +1,105 @@
+from typing import Any, AsyncIterator, Dict, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import time
+from ..config import settings
+
+
+class _Bucket:
+    """Token bucket refilled at `rpm` per minute.
+
+    Providers enforce RPM over short windows, so the burst is limited to a tenth of
+    the per-minute budget rather than the whole minute's worth.
+    """
+
+    def __init__(self, rpm: int) -> None:
+        self.rate = rpm / 60.0
+        self.capacity = max(1.0, rpm / 10.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class ProviderRateLimiter:
+    """Per-provider pacing for upstream calls: requests per minute plus a concurrency cap.
+
+    Providers without a configured limit are not throttled. Waiting happens on the
+    event loop, so bursts (e.g. a bulk request fanning out) queue here instead of
+    turning into 429s and SDK retries.
+    """
+
+    def __init__(self, rpm: Optional[Dict[str, int]] = None, concurrency: Optional[Dict[str, int]] = None) -> None:
+        self._buckets = {name: _Bucket(n) for name, n in (rpm or {}).items() if n and n > 0}
+        self._concurrency = {name: n for name, n in (concurrency or {}).items() if n and n > 0}
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._waits: Dict[str, int] = {}
+        self._wait_seconds: Dict[str, float] = {}
+
+    def _semaphore(self, provider: str) -> Optional[asyncio.Semaphore]:
+        limit = self._concurrency.get(provider)
+        if limit is None:
+            return None
+        sem = self._sems.get(provider)
+        if sem is None:
+            sem = self._sems[provider] = asyncio.Semaphore(limit)
+        return sem
+
+    async def _pace(self, provider: str) -> float:
+        bucket = self._buckets.get(provider)
+        waited = 0.0
+        while bucket is not None:
+            delay = bucket.reserve()
+            if delay <= 0:
+                break
+            waited += delay
+            await asyncio.sleep(delay)
+        return waited
+
+    @asynccontextmanager
+    async def slot(self, provider: str) -> AsyncIterator[None]:
+        """Hold one request slot for `provider` for the duration of the block."""
+        start = time.perf_counter()
+        sem = self._semaphore(provider)
+        if sem is not None:
+            await sem.acquire()
+        try:
+            await self._pace(provider)
+            waited = time.perf_counter() - start
+            if waited > 0.001:
+                self._waits[provider] = self._waits.get(provider, 0) + 1
+                self._wait_seconds[provider] = self._wait_seconds.get(provider, 0.0) + waited
+            self._in_flight[provider] = self._in_flight.get(provider, 0) + 1
+            try:
+                yield
+            finally:
+                self._in_flight[provider] -= 1
+        finally:
+            if sem is not None:
+                sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        names = sorted(set(self._buckets) | set(self._concurrency) | set(self._in_flight))
+        return {
+            name: {
+                "rpm": round(self._buckets[name].rate * 60) if name in self._buckets else None,
+                "max_concurrency": self._concurrency.get(name),
+                "in_flight": self._in_flight.get(name, 0),
+                "throttled": self._waits.get(name, 0),
+                "throttled_seconds": round(self._wait_seconds.get(name, 0.0), 2),
+            }
+            for name in names
+        }
+
+
+# Shared by the extraction router and OCR so every call to a provider counts against one budget
+provider_limiter = ProviderRateLimiter(settings.PROVIDER_RPM_LIMITS, settings.PROVIDER_MAX_CONCURRENCY)
@@ -0,0 +1,236 @@
+from typing import Any, Dict, List, Optional, Tuple
+import re
+
+_SENTENCE_END = re.compile(r"(?<=[.;!?])\s+")
+_CELL_SEP = re.compile(r"\s*[|\t,;]\s*|\s{2,}")
+
+
+def _units(text: str, max_chars: int) -> Tuple[List[str], bool]:
+    """Row-sized pieces of `text`: its non-empty lines, with over-long lines split into sentences.
+
+    Transcripts usually arrive as one long line, so sentences stand in for rows there.
+    The flag is True when every unit is a whole line of the input.
+    """
+    units: List[str] = []
+    whole_lines = True
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if len(line) <= max_chars:
+            units.append(line)
+        else:
+            units.extend(s for s in _SENTENCE_END.split(line) if s.strip())
+            whole_lines = False
+    return units, whole_lines
+
+
+def _cells(line: str) -> List[str]:
+    cells = [c for c in _CELL_SEP.split(line.strip()) if c.strip()]
+    return cells if len(cells) > 1 else line.split()
+
+
+def _is_heading(line: str, headings: Optional[set]) -> bool:
+    """True for a column-heading line ("Name | Age | Result").
+
+    Headings carry no figures and are split into cells; with a vocabulary of field
+    ids and aliases, at least two cells and half of them must be known headings,
+    so a data row without figures ("Amina Bello | F | Malaria") is not taken for one.
+    """
+    if not line.strip() or any(c.isdigit() for c in line):
+        return False
+    if headings is None:
+        return len([c for c in _CELL_SEP.split(line.strip()) if c.strip()]) > 1
+    cells = _cells(line)
+    known = sum(1 for c in cells if " ".join(c.lower().strip(" :#*").split()) in headings)
+    return known >= 2 and known * 2 >= len(cells)
+
+
+def split_rows(
+    text: str, max_chars: int, overlap: int, alias_map: Optional[Dict[str, List[str]]] = None
+) -> List[str]:
+    """Split a multi-row document into chunks of at most ~`max_chars` on row boundaries.
+
+    Each chunk after the first starts with the last `overlap` rows of the previous
+    one, so a record cut at a seam is seen whole at least once (merge_chunk_rows drops
+    the duplicates). A leading column-heading line is repeated at the top of every
+    chunk so columns keep their meaning; headings are matched against the schema's
+    `alias_map` when given, and never looked for in sentence-split transcripts.
+    Returns [text] when it already fits.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    units, whole_lines = _units(text, max_chars)
+    heading: Optional[str] = None
+    headings = _heading_words(alias_map) if alias_map is not None else None
+    if whole_lines and len(units) > 1 and _is_heading(units[0], headings):
+        heading = units.pop(0)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    fresh = 0  # rows in `current` not carried over from the previous chunk
+    for unit in units:
+        if fresh and size + len(unit) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current = current[-overlap:] if overlap > 0 else []
+            size = sum(len(u) + 1 for u in current)
+            fresh = 0
+        current.append(unit)
+        size += len(unit) + 1
+        fresh += 1
+    if fresh:
+        chunks.append("\n".join(current))
+    if heading is not None:
+        chunks = [f"{heading}\n{c}" for c in chunks]
+    return chunks
+
+
+def _norm(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, list):
+        return tuple(sorted(str(_norm(v)) for v in value))
+    return value
+
+
+def _filled(row: Dict[str, Any], field_ids: List[str]) -> Dict[str, Any]:
+    return {fid: _norm(row.get(fid)) for fid in field_ids if row.get(fid) not in (None, "", [], {})}
+
+
+def _same_record(a: Dict[str, Any], b: Dict[str, Any], key: Optional[str] = None) -> bool:
+    """True when two extracted rows describe the same record.
+
+    Rows must agree on every field both have filled, and the smaller one must be
+    fully contained in the larger, so a row truncated at a seam still matches. A
+    single shared value only counts when it is the record's `key` (the schema's
+    first field, e.g. the name or ID): two sparse rows that merely share "sex: F"
+    are different records.
+    """
+    if not a or not b:
+        return False
+    small, large = (a, b) if len(a) <= len(b) else (b, a)
+    if len(small) == 1 and small != large and key not in small:
+        return False
+    return all(fid in large and large[fid] == v for fid, v in small.items())
+
+
+class SeamMerger:
+    """Incremental form of merge_chunk_rows: feed rows chunk by chunk, in chunk order.
+
+    Call next_chunk() before each chunk's rows; add() returns True when the row was
+    appended and False when it was folded into a row already merged.
+    """
+
+    def __init__(self, field_ids: List[str], window: int) -> None:
+        self.field_ids = field_ids
+        self.window = window
+        self.rows: List[Dict[str, Any]] = []
+        self._seam_start = 0
+        self._seen = 0  # rows added in the current chunk
+
+    def next_chunk(self) -> None:
+        self._seam_start = len(self.rows)
+        self._seen = 0
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        i = self._seen
+        self._seen += 1
+        match = None
+        if i < self.window and self._seam_start:
+            sig = _filled(row, self.field_ids)
+            for j in range(self._seam_start - 1, max(self._seam_start - self.window, 0) - 1, -1):
+                if _same_record(_filled(self.rows[j], self.field_ids), sig, self.field_ids[0] if self.field_ids else None):
+                    match = j
+                    break
+        if match is None:
+            self.rows.append(row)
+            return True
+        kept = self.rows[match]
+        for fid, value in row.items():
+            if kept.get(fid) in (None, "", [], {}) and value not in (None, "", [], {}):
+                kept[fid] = value
+        return False
+
+
+def merge_chunk_rows(chunk_rows: List[List[Dict[str, Any]]], field_ids: List[str], window: int) -> List[Dict[str, Any]]:
+    """Concatenate per-chunk rows in chunk order, collapsing duplicates at the seams.
+
+    The first `window` rows of each chunk are compared with the last `window` rows
+    already merged; a match is folded into the earlier row (filling its empty fields)
+    instead of being appended. Rows away from the seams are never compared, so
+    genuinely repeated records elsewhere in a register are kept.
+    """
+    merger = SeamMerger(field_ids, window)
+    for rows in chunk_rows:
+        merger.next_chunk()
+        for row in rows:
+            if isinstance(row, dict):
+                merger.add(row)
+    return merger.rows
+
+
+def _heading_words(alias_map: Dict[str, List[str]]) -> set:
+    words = set()
+    for fid, aliases in alias_map.items():
+        for alias in [fid.lower(), *aliases]:
+            words.add(alias)
+            words.update(alias.split())
+    return words
+
+
+def is_heading_row(row: Dict[str, Any], headings: set) -> bool:
+    """True when a "row" is just the register's column headings read back as data.
+
+    `headings` is the vocabulary of field ids, aliases and their words; every filled
+    value must be one of them, and a lone value is not enough to call it a heading.
+    """
+    values = [v for v in row.values() if v not in (None, "", [], {})]
+    if len(values) < 2:
+        return False
+    return all(isinstance(v, str) and " ".join(v.lower().strip(" :#*").split()) in headings for v in values)
+
+
+def merge_page_rows(
+    page_rows: List[List[Dict[str, Any]]],
+    field_ids: List[str],
+    required_ids: List[str],
+    alias_map: Dict[str, List[str]],
+) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, int]]:
+    """Merge rows extracted page by page into one register, in page order.
+
+    Repeated column-heading rows are dropped. At each page break the first row of
+    the new page is folded into the last row of the previous one when it is the same
+    record (overlapping photos), or when it continues it: the earlier row is missing
+    required values and the new one only fills fields the earlier row left empty.
+
+    Returns ([(page_index, row), ...], {"heading_rows": n, "stitched_rows": n}).
+    """
+    headings = _heading_words(alias_map)
+    merged: List[Tuple[int, Dict[str, Any]]] = []
+    counts = {"heading_rows": 0, "stitched_rows": 0}
+    for page, rows in enumerate(page_rows):
+        first = True
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+            if is_heading_row(row, headings):
+                counts["heading_rows"] += 1
+                continue
+            if first and merged and merged[-1][0] < page:
+                kept = merged[-1][1]
+                a, b = _filled(kept, field_ids), _filled(row, field_ids)
+                continues = (
+                    bool(b)
+                    and not set(a) & set(b)
+                    and any(kept.get(fid) in (None, "", [], {}) for fid in required_ids)
+                )
+                if _same_record(a, b, field_ids[0] if field_ids else None) or continues:
+                    for fid, value in row.items():
+                        if kept.get(fid) in (None, "", [], {}) and value not in (None, "", [], {}):
+                            kept[fid] = value
+                    counts["stitched_rows"] += 1
+                    first = False
+                    continue
+            first = False
+            merged.append((page, row))
+    return merged, counts
@@ -0,0 +1,77 @@
+from typing import Any, Callable, Dict, List, Optional
+from contextvars import ContextVar
+import json
+import re
+
+_ROWS_KEY = re.compile(r'"rows"\s*:\s*\[')
+
+# Set by a streaming request: multi-row extraction running in this context hands
+# every row to the callback as soon as the model has finished writing it.
+row_sink: ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = ContextVar("row_sink", default=None)
+
+
+class RowStreamParser:
+    """Incremental parser for a streamed multi-row answer ({"rows": [{...}, ...], ...}).
+
+    feed() takes text deltas and returns the row objects that closed within them,
+    so rows can be used while the rest of the completion is still being generated.
+    Only the bracket/string state is tracked; each closed object is then decoded
+    with json.loads. Malformed rows are skipped; the full text stays available in
+    `text` for a final parse.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.rows: List[Dict[str, Any]] = []
+        self.done = False
+        self._pos: Optional[int] = None  # scan position once the rows array has been found
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start: Optional[int] = None
+
+    def feed(self, delta: str) -> List[Dict[str, Any]]:
+        self.text += delta
+        if self._pos is None:
+            # Search a little before the new text in case the key was split across deltas
+            m = _ROWS_KEY.search(self.text, max(0, len(self.text) - len(delta) - 16))
+            if m is None:
+                return []
+            self._pos = m.end()
+
+        closed: List[Dict[str, Any]] = []
+        text = self.text
+        i = self._pos
+        while i < len(text) and not self.done:
+            c = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                if self._depth == 0 and c == "{":
+                    self._start = i
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 0:
+                    # End of the rows array
+                    self.done = True
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and self._start is not None:
+                        try:
+                            row = json.loads(text[self._start:i + 1])
+                        except ValueError:
+                            row = None
+                        if isinstance(row, dict):
+                            closed.append(row)
+                        self._start = None
+            i += 1
+        self._pos = i
+        self.rows.extend(closed)
+        return closed
@@ -0,0 +1,60 @@
+from typing import Any, Dict, List
+from .cache import LRUCache, make_cache_key
+from .validator import SchemaValidator
+from ..config import settings
+from ..utils.heuristics import build_field_tables
+from ..utils.prompting import build_extraction_header, build_multi_row_extraction_header
+from ..utils.schema import ensure_demo_schema
+import hashlib
+
+
+class CompiledSchema:
+    """Everything the pipelines derive from a form schema, built once per schema.
+
+    Holds the normalized schema, its validator, both prompt headers and the
+    heuristic alias/option/field lookup tables. Instances are shared between
+    concurrent requests and must be treated as read-only.
+    """
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        self.schema = schema
+        self.schema_hash = make_cache_key(schema)
+        self.fields: List[Dict[str, Any]] = schema.get("fields", [])
+        self.field_ids: List[str] = [f["id"] for f in self.fields]
+        self.required_ids: List[str] = [f["id"] for f in self.fields if f.get("required")]
+        self.validator = SchemaValidator(schema)
+        self.extraction_header = build_extraction_header(schema)
+        self.multi_row_header = build_multi_row_extraction_header(schema)
+        self.heuristic_tables = build_field_tables(schema)
+        self.fields_by_id: Dict[str, Dict[str, Any]] = self.heuristic_tables["fields_by_id"]
+        self.alias_map: Dict[str, List[str]] = self.heuristic_tables["alias_map"]
+        self.options_map: Dict[str, List[str]] = self.heuristic_tables["options_map"]
+
+
+_compiled = LRUCache(settings.SCHEMA_CACHE_MAX_ENTRIES)
+
+
+def _raw_key(schema_in: Any) -> str:
+    if isinstance(schema_in, (bytes, bytearray)):
+        return hashlib.sha256(bytes(schema_in)).hexdigest()
+    if isinstance(schema_in, str):
+        return hashlib.sha256(schema_in.encode("utf-8")).hexdigest()
+    return make_cache_key(schema_in)
+
+
+def compile_schema(schema_in: Any) -> CompiledSchema:
+    """Normalize `schema_in` (dict, JSON string or field list) and return its compiled form.
+
+    Results are held in a bounded LRU keyed by the raw input, so repeat requests skip
+    JSON parsing and normalization as well. Raises BadFormSchema like ensure_demo_schema.
+    """
+    key = _raw_key(schema_in)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = CompiledSchema(ensure_demo_schema(schema_in))
+        _compiled.set(key, compiled)
+    return compiled
+
+
+def compiled_schema_stats() -> Dict[str, int]:
+    return _compiled.stats()
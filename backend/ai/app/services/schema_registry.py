@@ -0,0 +1,103 @@
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+import json
+import os
+import sqlite3
+import threading
+import time
+from .schema_compiler import CompiledSchema, compile_schema
+
+
+class SchemaNotFound(LookupError):
+    """No schema is registered under the requested form_id / form_version."""
+
+
+class SchemaConflict(ValueError):
+    """A different schema is already registered under the same form_id + form_version."""
+
+
+@dataclass
+class RegisteredSchema:
+    form_id: str
+    form_version: str
+    compiled: CompiledSchema
+    registered_at: float
+
+
+class SchemaRegistry:
+    """Form schemas uploaded once and referenced by `form_id` (+ `form_version`).
+
+    Schemas are compiled at registration time and held for the life of the process.
+    When `path` is set they are also written to SQLite and re-compiled on start-up.
+    A version is immutable: re-registering identical content is a no-op, different
+    content raises SchemaConflict. Without an explicit version, lookups return the
+    most recently registered one.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], RegisteredSchema] = {}
+        self._latest: Dict[str, str] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS schemas (form_id TEXT NOT NULL, form_version TEXT NOT NULL, "
+                "schema TEXT NOT NULL, registered_at REAL NOT NULL, PRIMARY KEY (form_id, form_version))"
+            )
+            self._conn.commit()
+            self._load()
+
+    def _load(self) -> None:
+        rows = self._conn.execute(
+            "SELECT form_id, form_version, schema, registered_at FROM schemas ORDER BY registered_at"
+        ).fetchall()
+        for form_id, form_version, schema, registered_at in rows:
+            entry = RegisteredSchema(form_id, form_version, compile_schema(json.loads(schema)), registered_at)
+            self._entries[(form_id, form_version)] = entry
+            self._latest[form_id] = form_version
+
+    def register(self, form_id: str, form_version: str, schema_in: Any) -> Tuple[RegisteredSchema, bool]:
+        """Compile and store a schema. Returns (entry, created).
+
+        Raises BadFormSchema for an invalid schema and SchemaConflict when the version
+        already holds different content.
+        """
+        compiled = compile_schema(schema_in)
+        with self._lock:
+            existing = self._entries.get((form_id, form_version))
+            if existing is not None:
+                if existing.compiled.schema_hash != compiled.schema_hash:
+                    raise SchemaConflict(
+                        f"form '{form_id}' version '{form_version}' is already registered with a different schema"
+                    )
+                return existing, False
+            entry = RegisteredSchema(form_id, form_version, compiled, time.time())
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT INTO schemas (form_id, form_version, schema, registered_at) VALUES (?, ?, ?, ?)",
+                    (form_id, form_version, json.dumps(compiled.schema), entry.registered_at),
+                )
+                self._conn.commit()
+            self._entries[(form_id, form_version)] = entry
+            self._latest[form_id] = form_version
+            return entry, True
+
+    def get(self, form_id: str, form_version: Optional[str] = None) -> RegisteredSchema:
+        with self._lock:
+            version = form_version or self._latest.get(form_id)
+            entry = self._entries.get((form_id, version)) if version is not None else None
+        if entry is None:
+            label = f"form '{form_id}'" + (f" version '{form_version}'" if form_version else "")
+            raise SchemaNotFound(f"{label} is not registered; send form_schema or register it via POST /schemas")
+        return entry
+
+    def versions(self, form_id: str) -> List[RegisteredSchema]:
+        with self._lock:
+            found = [e for (fid, _), e in self._entries.items() if fid == form_id]
+        return sorted(found, key=lambda e: e.registered_at)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"forms": len(self._latest), "versions": len(self._entries), "persistent": self._conn is not None}
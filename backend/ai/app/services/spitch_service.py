@@ -1,7 +1,6 @@
-from typing import Tuple
+from typing import BinaryIO, Tuple, Union
 import time
-from ..config import settings
-import os
+from .http_clients import spitch_client
 
 
 class SpitchService:
@@ -13,23 +12,19 @@ class SpitchService:
 
     @staticmethod
     def _sdk_client():
-        """Return a Spitch SDK client using configured API key; raises if unavailable."""
-        # Ensure the SDK sees the key (explicit arg + env for good measure)
-        if not settings.SPITCH_API_KEY:
-            raise RuntimeError("SPITCH_API_KEY not configured")
-        os.environ.setdefault("SPITCH_API_KEY", settings.SPITCH_API_KEY)
-        # Lazy import to avoid hard dependency when not used
-        from spitch import Spitch  # type: ignore
-        # Pass api_key explicitly to avoid relying solely on env resolution
-        return Spitch(api_key=settings.SPITCH_API_KEY)
+        """Return the shared, pooled Spitch SDK client; raises if unavailable."""
+        return spitch_client()
 
     @staticmethod
-    def transcribe(file_path: str, lang_code: str) -> Tuple[str, int]:
-        """Transcribe audio using Spitch SDK only (no HTTP fallback)."""
+    def transcribe(audio: Union[str, bytes, BinaryIO], lang_code: str, filename: str = "audio.wav") -> Tuple[str, int]:
+        """Transcribe a file path, in-memory audio bytes or a binary file object using Spitch SDK only (no HTTP fallback)."""
         client = SpitchService._sdk_client()
         t0 = time.time()
-        with open(file_path, "rb") as fh:
-            resp = client.speech.transcribe(content=fh, language=lang_code)
+        if isinstance(audio, str):
+            with open(audio, "rb") as fh:
+                resp = client.speech.transcribe(content=fh, language=lang_code)
+        else:
+            resp = client.speech.transcribe(content=(filename, audio), language=lang_code)
         elapsed_ms = int((time.time() - t0) * 1000)
         text = getattr(resp, "text", None) or getattr(resp, "transcript", "") or ""
         return text, elapsed_ms
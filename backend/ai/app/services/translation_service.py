@@ -5,13 +5,13 @@ from .extraction_router import ExtractionRouter
 class TranslationService:
     """Translate arbitrary language text to English using the selected LLM provider/model.
 
-    Uses the same provider.complete interface as ExtractionRouter providers.
+    Uses the same async provider.complete interface as ExtractionRouter providers.
     """
 
     def __init__(self, router: ExtractionRouter) -> None:
         self.router = router
 
-    def translate_to_english(
+    async def translate_to_english(
         self,
         text: str,
         provider_name: str,
@@ -23,5 +23,5 @@ class TranslationService:
             "Return only the translation, no extra commentary or formatting.\n\n"
             f"Text:\n{text}"
         )
-        translated, usage = provider.complete(prompt=prompt, images=None, ocr_blocks=None, locale=None, model=model_override)
+        translated, usage = await provider.complete(prompt=prompt, images=None, ocr_blocks=None, locale=None, model=model_override)
         return (translated or "").strip(), (usage or {})
@@ -0,0 +1,160 @@
+from typing import BinaryIO, List, Optional, Union
+from dataclasses import dataclass
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+_COPY_BLOCK = 1 << 20  # 1 MiB per read; memory use stays flat regardless of upload size
+
+
+class UploadTooLarge(Exception):
+    """An upload (or the sum of a request's uploads) exceeded its configured limit."""
+
+
+@dataclass
+class StoredUpload:
+    """An ingested upload: held in memory (`data`) when small, otherwise spilled to `path`."""
+
+    filename: str
+    size: int
+    sha256: str
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """The in-memory bytes when available, else the scratch file path."""
+        return self.data if self.data is not None else self.path
+
+    def open(self) -> BinaryIO:
+        return io.BytesIO(self.data) if self.data is not None else open(self.path, "rb")
+
+
+def _safe_name(filename: Optional[str]) -> str:
+    base = os.path.basename(filename or "upload")
+    return re.sub(r"[^\w.\-]", "_", base)[-100:] or "upload"
+
+
+class ScratchSession:
+    """Per-request scratch directory, removed when the last holder releases it.
+
+    The request handler holds one reference; a pipeline that may outlive the
+    handler (e.g. a coalesced run other requests are waiting on) takes its own with
+    `hold()`, so files are never deleted underneath work that still reads them.
+    """
+
+    def __init__(self, root: str, name: Optional[str] = None) -> None:
+        self.dir = os.path.join(root, name or uuid.uuid4().hex)
+        self._refs = 1
+        self._lock = threading.Lock()
+        self._count = 0
+        self.total_bytes = 0
+
+    def hold(self) -> "ScratchSession":
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self) -> None:
+        with self._lock:
+            self._refs -= 1
+            last = self._refs == 0
+        if last:
+            shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __enter__(self) -> "ScratchSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def _check_total(self, size: int, max_total_bytes: Optional[int]) -> None:
+        if max_total_bytes is not None and self.total_bytes + size > max_total_bytes:
+            raise UploadTooLarge(f"uploads exceed the {max_total_bytes // (1 << 20)} MiB per-request limit")
+
+    def store(
+        self,
+        fileobj,
+        filename: Optional[str],
+        max_bytes: int,
+        max_total_bytes: Optional[int] = None,
+        size_hint: Optional[int] = None,
+        memory_max_bytes: int = 0,
+    ) -> StoredUpload:
+        """Ingest `fileobj`, hashing it on the way.
+
+        When `size_hint` says the upload fits in `memory_max_bytes` it is read once
+        into memory and handed to providers as-is (no scratch file). Otherwise it is
+        copied into the session in fixed-size blocks. Blocking; run it in a worker
+        thread. Raises UploadTooLarge as soon as a byte limit is crossed.
+        """
+        name = _safe_name(filename)
+        if size_hint is not None and size_hint <= min(memory_max_bytes, max_bytes):
+            data = fileobj.read(max_bytes + 1)
+            if len(data) > max_bytes:
+                raise UploadTooLarge(f"{name} exceeds the {max_bytes // (1 << 20)} MiB upload limit")
+            self._check_total(len(data), max_total_bytes)
+            self.total_bytes += len(data)
+            return StoredUpload(
+                filename=filename or name, size=len(data), sha256=hashlib.sha256(data).hexdigest(), data=data
+            )
+
+        os.makedirs(self.dir, exist_ok=True)
+        with self._lock:
+            self._count += 1
+            index = self._count
+        path = os.path.join(self.dir, f"{index:03d}_{name}")
+        h = hashlib.sha256()
+        size = 0
+        with open(path, "wb") as out:
+            for block in iter(lambda: fileobj.read(_COPY_BLOCK), b""):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"{name} exceeds the {max_bytes // (1 << 20)} MiB upload limit")
+                self._check_total(size, max_total_bytes)
+                h.update(block)
+                out.write(block)
+        self.total_bytes += size
+        return StoredUpload(filename=filename or name, size=size, sha256=h.hexdigest(), path=path)
+
+
+class ScratchArea:
+    """Managed upload scratch space for this process.
+
+    Each process writes under its own subdirectory of `base_dir`; directories left
+    behind by crashed processes are purged at start-up once older than
+    `stale_seconds`.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, stale_seconds: float = 3600) -> None:
+        self.base_dir = base_dir or os.path.join(tempfile.gettempdir(), "tattara-uploads")
+        self.stale_seconds = stale_seconds
+        self.root = os.path.join(self.base_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+
+    def purge_stale(self) -> List[str]:
+        removed: List[str] = []
+        if not os.path.isdir(self.base_dir):
+            return removed
+        cutoff = time.time() - self.stale_seconds
+        for entry in os.scandir(self.base_dir):
+            if entry.path == self.root:
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed.append(entry.path)
+            except OSError:
+                continue
+        return removed
+
+    def session(self) -> ScratchSession:
+        return ScratchSession(self.root)
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
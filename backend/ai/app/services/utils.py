@@ -1,6 +1,6 @@
 import json
 import re
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 def safe_json_parse(s: str) -> Dict[str, Any]:
@@ -18,3 +18,19 @@ def safe_json_parse(s: str) -> Dict[str, Any]:
             except Exception:
                 pass
         raise
+
+
+def system_prompt(instructions: Optional[str] = None) -> str:
+    """System message for JSON completions.
+
+    Static per-schema instructions are appended here so they form a byte-stable
+    prefix that provider-side prompt caching can reuse across requests.
+    """
+    base = "Respond ONLY with valid JSON. No markdown."
+    return f"{base}\n\n{instructions}" if instructions else base
+
+
+def cached_prompt_tokens(resp: Any) -> Optional[int]:
+    """Prompt tokens the provider served from its prompt cache (usage.prompt_tokens_details)."""
+    details = getattr(getattr(resp, "usage", None), "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) if details is not None else None
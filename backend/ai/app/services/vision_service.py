@@ -1,41 +1,198 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Union
 from pathlib import Path
 from PIL import Image, ImageOps
+from .cache import LRUCache, file_sha256, make_cache_key
 from .metrics import timer
+from .rate_limit import provider_limiter
+from ..config import settings
 from ..schemas import OCRBlock
+import asyncio
 import base64
+import hashlib
+import io
+
+
+def _sha256(image: Union[str, bytes]) -> str:
+    return file_sha256(image) if isinstance(image, str) else hashlib.sha256(image).hexdigest()
+
+
+_ENCODERS = {"jpeg": ("JPEG", ".jpg"), "webp": ("WEBP", ".webp")}
+
+
+def _preprocess_signature() -> Optional[tuple]:
+    """Settings that change what the provider sees; part of the OCR cache key."""
+    if not settings.IMAGE_PREPROCESS_ENABLED:
+        return None
+    fmt = settings.IMAGE_OUTPUT_FORMAT.lower()
+    quality = settings.IMAGE_WEBP_QUALITY if fmt == "webp" else settings.IMAGE_JPEG_QUALITY
+    return (fmt, settings.IMAGE_MAX_EDGE_PX, settings.IMAGE_GRAYSCALE, quality)
+
+
+def preprocess_image(img_bytes: bytes, filename: str) -> tuple[bytes, str]:
+    """Apply EXIF orientation, downscale, optional grayscale and re-encode.
+
+    Returns (bytes, filename) with the extension matching the new encoding. The
+    original is returned unchanged when preprocessing is disabled, the image cannot
+    be decoded, or nothing was rotated/resized and re-encoding would not shrink it.
+    Blocking; run it in a worker thread.
+    """
+    signature = _preprocess_signature()
+    if signature is None:
+        return img_bytes, filename
+    fmt, max_edge, grayscale, quality = signature
+    pil_format, ext = _ENCODERS.get(fmt, _ENCODERS["jpeg"])
+    try:
+        with Image.open(io.BytesIO(img_bytes)) as src:
+            changed = src.getexif().get(0x0112, 1) != 1  # EXIF Orientation
+            img = ImageOps.exif_transpose(src)  # always a detached copy
+            if max_edge and max(img.size) > max_edge:
+                img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+                changed = True
+            if grayscale and img.mode != "L":
+                img = ImageOps.grayscale(img)
+                changed = True
+            elif img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, format=pil_format, quality=quality, optimize=True)
+    except Exception:
+        return img_bytes, filename
+    data = out.getvalue()
+    if not changed and len(data) >= len(img_bytes):
+        return img_bytes, filename
+    return data, f"{Path(filename).stem or 'image'}{ext}"
 
 
 class VisionService:
     """Forward images to a provider for processing.
 
     This implementation does NOT run local OCR. Callers must supply a
-    provider client that exposes a `process_image(image_bytes: bytes, filename: str)`
-    method which returns either a dict {"text": str, "blocks": [...]}
+    provider client that exposes an async `process_image(image_bytes: bytes, filename: str)`
+    coroutine which returns either a dict {"text": str, "blocks": [...]}
     or a plain string (interpreted as full text).
+
+    Images are pre-processed (see `preprocess_image`) before upload to cut payload
+    size and vision input tokens. Successful results are cached by the SHA-256 of
+    the original image bytes (plus the provider model and preprocessing settings),
+    so re-submitted photos skip both preprocessing and the vision round trip.
     """
 
-    def ocr(self, img_path: str, provider_client) -> tuple[str, List[OCRBlock], int]:
+    def __init__(self) -> None:
+        self.cache: Optional[LRUCache] = None
+        if settings.OCR_CACHE_ENABLED:
+            self.cache = LRUCache(settings.OCR_CACHE_MAX_ENTRIES, settings.OCR_CACHE_TTL_SECONDS)
+
+    def _cache_key(self, digest: str, provider_client) -> str:
+        return make_cache_key("ocr", getattr(provider_client, "model", None), _preprocess_signature(), digest)
+
+    async def ocr(
+        self, image: Union[str, bytes], provider_client, filename: Optional[str] = None
+    ) -> tuple[str, List[OCRBlock], int]:
         """Send image bytes to provider_client.process_image and normalize response.
 
+        `image` is a file path or the image bytes themselves; in-memory uploads are
+        passed through without touching disk. `filename` (default: the path's name)
+        lets the provider pick the MIME type.
+
         Returns: (ocr_text, blocks, elapsed_ms)
         """
+        text, blocks, elapsed_ms, _info = await self._ocr(image, provider_client, filename=filename)
+        return text, blocks, elapsed_ms
+
+    async def _ocr(
+        self,
+        image: Union[str, bytes],
+        provider_client,
+        digest: Optional[str] = None,
+        filename: Optional[str] = None,
+    ) -> tuple[str, List[OCRBlock], int, Dict[str, Any]]:
+        """Returns (text, blocks, elapsed_ms, info); info has cache_hit and, for images
+        actually sent, bytes_before/bytes_after preprocessing."""
         if provider_client is None:
             raise ValueError("provider_client is required for remote image processing")
 
         with timer() as t:
-            with open(img_path, "rb") as fh:
-                img_bytes = fh.read()
+            if isinstance(image, str):
+                filename = filename or Path(image).name
+                img_bytes = await asyncio.to_thread(Path(image).read_bytes)
+            else:
+                img_bytes = image
+
+            key = None
+            if self.cache is not None:
+                key = self._cache_key(digest or hashlib.sha256(img_bytes).hexdigest(), provider_client)
+                hit = self.cache.get(key)
+                if hit is not None:
+                    return hit["text"], list(hit["blocks"]), t(), {"cache_hit": True}
+
+            upload, upload_name = await asyncio.to_thread(preprocess_image, img_bytes, filename or "image.jpg")
+            info = {"cache_hit": False, "bytes_before": len(img_bytes), "bytes_after": len(upload)}
 
             # Provider adapter: delegate to provider_client
-            resp = provider_client.process_image(img_bytes, filename=Path(img_path).name)
+            async with provider_limiter.slot(getattr(provider_client, "name", "vision")):
+                resp = await provider_client.process_image(upload, filename=upload_name)
 
             # Normalize provider response
             if isinstance(resp, dict):
                 text = resp.get("text", "")
                 blocks = resp.get("blocks", [])
+                failed = bool(resp.get("_error"))
             else:
                 text = str(resp)
                 blocks = []
+                failed = False
+
+            if key is not None and not failed:
+                self.cache.set(key, {"text": text, "blocks": list(blocks)})
+            return text, blocks, t(), info
+
+    async def ocr_many(
+        self,
+        images: List[Union[str, bytes]],
+        provider_client,
+        max_concurrency: Optional[int] = None,
+        digests: Optional[List[str]] = None,
+        filenames: Optional[List[str]] = None,
+    ) -> tuple[List[str], List[OCRBlock], int, int, Dict[str, Any]]:
+        """OCR several images concurrently, at most `max_concurrency` in flight.
+
+        `images` holds file paths and/or in-memory image bytes (with `filenames` for
+        the latter). Results keep their order so multi-page text merges in page order.
+        Byte-identical images within the upload are OCR'd once and only their first
+        occurrence contributes text. Pass `digests` (SHA-256 per path) when the
+        caller already hashed the files while storing them.
+
+        Returns: (ocr_texts, blocks, summed_ms, wall_ms, info) where info reports
+        cache_hits, duplicate_images and the image_bytes_before/image_bytes_after
+        preprocessing totals for the images sent to the provider.
+        """
+        limit = max_concurrency or settings.VISION_MAX_CONCURRENCY
+        sem = asyncio.Semaphore(max(1, limit))
+
+        if digests is None:
+            digests = await asyncio.to_thread(lambda: [_sha256(img) for img in images])
+        if filenames is None:
+            filenames = [Path(img).name if isinstance(img, str) else "image.jpg" for img in images]
+        unique: Dict[str, int] = {}
+        for i, d in enumerate(digests):
+            unique.setdefault(d, i)
+
+        async def _one(i: int, digest: str):
+            async with sem:
+                return await self._ocr(images[i], provider_client=provider_client, digest=digest, filename=filenames[i])
+
+        with timer() as t:
+            results = await asyncio.gather(*(_one(i, d) for d, i in unique.items()))
+            wall_ms = t()
 
-            return text, blocks, t()
+        texts = [text for text, _, _, _ in results]
+        blocks = [b for _, page_blocks, _, _ in results for b in page_blocks]
+        summed_ms = sum(ms for _, _, ms, _ in results)
+        sent = [i for *_, i in results if not i["cache_hit"]]
+        info = {
+            "cache_hits": len(results) - len(sent),
+            "duplicate_images": len(images) - len(unique),
+            "image_bytes_before": sum(i["bytes_before"] for i in sent),
+            "image_bytes_after": sum(i["bytes_after"] for i in sent),
+        }
+        return texts, blocks, summed_ms, wall_ms, info
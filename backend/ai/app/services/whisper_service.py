@@ -1,16 +1,131 @@
-from typing import Optional
+from typing import Any, BinaryIO, Dict, Optional, Union
+from contextlib import contextmanager
+import io
+import os
+import queue
+import threading
+from .http_clients import openai_sync_client
 from .metrics import timer
 from ..config import settings
 
 try:
-    from openai import OpenAI as OpenAIClient
+    from faster_whisper import WhisperModel
 except Exception:
-    OpenAIClient = None
+    WhisperModel = None
 
 try:
-    from faster_whisper import WhisperModel
+    from faster_whisper import BatchedInferencePipeline
 except Exception:
-    WhisperModel = None
+    BatchedInferencePipeline = None
+
+
+class LocalWhisperPool:
+    """A fixed set of faster-whisper model instances shared by ASR worker threads.
+
+    Each instance gets `cpu_threads` intra-op threads; `size` instances together cover
+    the host's cores. Callers block in `acquire()` until an instance is free, so the
+    waiters form the request queue in front of the models. Instances are loaded on
+    first use, not at import time.
+    """
+
+    def __init__(
+        self,
+        model_size: str,
+        device: str,
+        compute_type: str,
+        size: int,
+        cpu_threads: int,
+        num_workers: int,
+        batch_size: int = 0,
+    ) -> None:
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.size = max(1, size)
+        self.cpu_threads = max(0, cpu_threads)
+        self.num_workers = max(1, num_workers)
+        self.batch_size = batch_size if BatchedInferencePipeline else 0
+        self._idle: "queue.Queue[Any]" = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._waiting = 0
+        self._count_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "LocalWhisperPool":
+        cores = os.cpu_count() or 1
+        threads = settings.WHISPER_CPU_THREADS
+        size = settings.WHISPER_POOL_SIZE
+        if size <= 0:
+            # Auto: one instance per `threads` cores (4 when threads is also auto)
+            size = max(1, cores // (threads or 4))
+        if threads <= 0:
+            threads = max(1, cores // size)
+        return cls(
+            model_size=settings.WHISPER_LOCAL_MODEL,
+            device=settings.WHISPER_DEVICE,
+            compute_type=settings.WHISPER_COMPUTE_TYPE,
+            size=size,
+            cpu_threads=threads,
+            num_workers=settings.WHISPER_NUM_WORKERS,
+            batch_size=settings.WHISPER_BATCH_SIZE,
+        )
+
+    def load(self) -> None:
+        with self._load_lock:
+            if self._loaded:
+                return
+            if WhisperModel is None:
+                raise RuntimeError("faster-whisper is not installed")
+            for _ in range(self.size):
+                model = WhisperModel(
+                    self.model_size,
+                    device=self.device,
+                    compute_type=self.compute_type,
+                    cpu_threads=self.cpu_threads,
+                    num_workers=self.num_workers,
+                )
+                if self.batch_size:
+                    model = BatchedInferencePipeline(model=model)
+                self._idle.put(model)
+            self._loaded = True
+
+    @contextmanager
+    def acquire(self):
+        self.load()
+        with self._count_lock:
+            self._waiting += 1
+        try:
+            model = self._idle.get()
+        finally:
+            with self._count_lock:
+                self._waiting -= 1
+        try:
+            yield model
+        finally:
+            self._idle.put(model)
+
+    def transcribe(self, source: Any, language: Optional[str] = None) -> str:
+        with self.acquire() as model:
+            kwargs: Dict[str, Any] = {"language": language}
+            if self.batch_size:
+                kwargs["batch_size"] = self.batch_size
+            segments, _ = model.transcribe(source, **kwargs)
+            # segments is lazy; decode while we still hold the instance
+            return " ".join([s.text for s in segments])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._count_lock:
+            waiting = self._waiting
+        return {
+            "model": self.model_size,
+            "size": self.size,
+            "cpu_threads": self.cpu_threads,
+            "batch_size": self.batch_size,
+            "loaded": self._loaded,
+            "idle": self._idle.qsize() if self._loaded else self.size,
+            "waiting": waiting,
+        }
 
 
 class WhisperService:
@@ -18,25 +133,46 @@ class WhisperService:
         self.mode = settings.WHISPER_MODE
         self._openai = None
         self._local = None
-        if self.mode == "api" and settings.OPENAI_API_KEY and OpenAIClient:
-            self._openai = OpenAIClient(api_key=settings.OPENAI_API_KEY)
+        if self.mode == "api":
+            self._openai = openai_sync_client(settings.OPENAI_API_KEY)
         elif self.mode == "local" and WhisperModel:
-            self._local = WhisperModel("base", compute_type="int8")
+            self._local = LocalWhisperPool.from_settings()
+
+    def warm_up(self) -> None:
+        """Load local model instances ahead of the first request."""
+        if self._local:
+            self._local.load()
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        return self._local.stats() if self._local else None
+
+    def transcribe(self, audio: Union[str, bytes, BinaryIO], language: Optional[str] = None, filename: str = "audio.wav") -> tuple[str, int]:
+        """Transcribe a file path, in-memory audio bytes (e.g. a WAV chunk) or a binary file object.
 
-    def transcribe(self, file_path: str, language: Optional[str] = None) -> tuple[str, int]:
+        Buffers and file objects go to the provider/model directly, without a temp file;
+        `filename` tells the API the container format.
+        """
         with timer() as t:
             if self.mode == "api" and self._openai:
-                with open(file_path, "rb") as f:
+                if isinstance(audio, str):
+                    with open(audio, "rb") as f:
+                        resp = self._openai.audio.transcriptions.create(
+                            model="whisper-1",
+                            file=f,
+                            language=language,
+                            response_format="text",
+                        )
+                else:
                     resp = self._openai.audio.transcriptions.create(
                         model="whisper-1",
-                        file=f,
+                        file=(filename, audio),
                         language=language,
                         response_format="text",
                     )
                 text = str(resp)
             elif self.mode == "local" and self._local:
-                segments, _ = self._local.transcribe(file_path, language=language)
-                text = " ".join([s.text for s in segments])
+                source = io.BytesIO(audio) if isinstance(audio, (bytes, bytearray, memoryview)) else audio
+                text = self._local.transcribe(source, language=language)
             else:
                 raise RuntimeError("WhisperService not configured or dependencies missing")
             return text, t()
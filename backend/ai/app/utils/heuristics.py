@@ -0,0 +1,415 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import re
+import unicodedata
+
+
+# --- Heuristic helpers for the medical schema ---
+
+
+def _norm_line(s: str) -> str:
+    s = unicodedata.normalize("NFKC", s or "")
+    return s.strip("•·-—–*☒☐✓✔✗[]() \t\r\n")
+
+
+def _parse_bool(v: Optional[str]) -> Optional[bool]:
+    if not v:
+        return None
+    x = v.strip().lower()
+    if x in {"yes", "y", "true", "t", "1"}:
+        return True
+    if x in {"no", "n", "false", "f", "0"}:
+        return False
+    return None
+
+
+def _parse_date_any(s: str) -> Optional[str]:
+    s = s or ""
+    s = s.strip()
+    # 2025-09-21 / 2025/09/21
+    m = re.search(r"\b(\d{4})[-/](\d{1,2})[-/](\d{1,2})\b", s)
+    if m:
+        y, mo, d = map(int, m.groups())
+        try:
+            return datetime(y, mo, d).strftime("%Y-%m-%d")
+        except Exception:
+            pass
+    # 21/09/2025 or 09/21/2025
+    m = re.search(r"\b(\d{1,2})[-/](\d{1,2})[-/](\d{4})\b", s)
+    if m:
+        a, b, y = map(int, m.groups())
+        try:
+            if a > 12:
+                d, mo = a, b
+            else:
+                mo, d = a, b
+            return datetime(y, mo, d).strftime("%Y-%m-%d")
+        except Exception:
+            pass
+    # 21 Sep 2025 / September 21, 2025
+    m = re.search(r"\b(\d{1,2})\s+([A-Za-z]{3,})\s*,?\s*(\d{4})\b", s)
+    if m:
+        d, mon, y = int(m.group(1)), m.group(2), int(m.group(3))
+        for fmt in ("%d %B %Y", "%d %b %Y"):
+            try:
+                return datetime.strptime(f"{d} {mon} {y}", fmt).strftime("%Y-%m-%d")
+            except Exception:
+                continue
+    return None
+
+
+_SYMPTOM_VOCAB = {
+    "fever",
+    "headache",
+    "chills",
+    "cough",
+    "nausea",
+    "vomiting",
+    "diarrhea",
+    "fatigue",
+    "body pain",
+    "muscle pain",
+    "sore throat",
+    "loss of appetite",
+    "sweats",
+    "weakness",
+    "dizziness",
+}
+
+
+def _split_symptoms(s: str) -> List[str]:
+    s = (s or "").lower()
+    parts = re.split(r"[;,]", s)
+    out: List[str] = []
+    for p in parts:
+        p = p.strip()
+        if not p:
+            continue
+        if p in _SYMPTOM_VOCAB:
+            out.append(p)
+        else:
+            for vocab in _SYMPTOM_VOCAB:
+                if vocab in p and vocab not in out:
+                    out.append(vocab)
+    return out
+
+
+def heuristic_extract_from_text(text: str, form_schema: dict) -> dict:
+    # Initialize defaults based on schema
+    fields = {}
+    for f in form_schema.get("fields", []):
+        fid = f.get("id")
+        ftype = (f.get("type") or "").lower()
+        if not isinstance(fid, str):
+            continue
+        if ftype == "number":
+            fields[fid] = None
+        elif ftype == "multiselect":
+            fields[fid] = []
+        elif ftype == "boolean":
+            fields[fid] = None
+        else:
+            fields[fid] = ""
+
+    # Pass 1: key:value style lines
+    for raw in (text or "").splitlines():
+        line = _norm_line(raw)
+        if not line:
+            continue
+        key, value = (line.split(":", 1) + [""])[:2] if ":" in line else (line, "")
+        key = key.strip().lower()
+        value = value.strip()
+
+        if "patient name" in key or key == "name":
+            if "patientName" in fields and value:
+                fields["patientName"] = value
+        elif "age" in key:
+            if "patientAge" in fields:
+                m = re.search(r"\b(\d{1,3})\b", value or line)
+                if m:
+                    fields["patientAge"] = int(m.group(1))
+        elif "gender" in key or "sex" in key:
+            if "patientGender" in fields:
+                v = (value or line).lower()
+                if "female" in v or v.strip() in {"f"}:
+                    fields["patientGender"] = "Female"
+                elif "male" in v or v.strip() in {"m"}:
+                    fields["patientGender"] = "Male"
+        elif (
+            "symptoms date" in key
+            or "date of symptoms" in key
+            or key == "date"
+            or "onset date" in key
+        ):
+            if "symptomsDate" in fields:
+                d = _parse_date_any(value or line)
+                if d:
+                    fields["symptomsDate"] = d
+        elif "reported symptoms" in key or key == "symptoms":
+            if "reportedSymptoms" in fields:
+                vals = _split_symptoms(value or "")
+                if vals:
+                    fields["reportedSymptoms"] = vals
+        elif "test result" in key or key == "result":
+            if "testResult" in fields:
+                v = (value or line).lower()
+                if "positive" in v:
+                    fields["testResult"] = "Positive"
+                elif "negative" in v:
+                    fields["testResult"] = "Negative"
+                elif "inconclusive" in v:
+                    fields["testResult"] = "Inconclusive"
+                else:
+                    fields["testResult"] = value
+        elif (
+            "treatment provided" in key
+            or key == "treatment"
+            or "therapy" in key
+            or "medication" in key
+        ):
+            if "treatmentProvided" in fields:
+                fields["treatmentProvided"] = value or fields["treatmentProvided"]
+        elif (
+            "health worker id" in key
+            or "hw id" in key
+            or "staff id" in key
+            or "worker id" in key
+        ):
+            if "healthWorkerId" in fields:
+                v = re.sub(r"[^A-Za-z0-9\-_]", "", value or "")
+                fields["healthWorkerId"] = v
+        elif "location" in key:
+            if "location" in fields:
+                fields["location"] = value or fields["location"]
+        elif "follow up" in key or "follow-up" in key or "followup" in key:
+            if "followUpRequired" in fields:
+                b = _parse_bool(value or line)
+                if b is not None:
+                    fields["followUpRequired"] = b
+        elif (
+            "notes" in key
+            or "remarks" in key
+            or "comments" in key
+            or "observation" in key
+        ):
+            if "notes" in fields:
+                fields["notes"] = value or fields["notes"]
+
+    # Pass 2: fallbacks from free text
+    if "patientName" in fields and not fields["patientName"]:
+        m = re.search(
+            r"\b(Patient\s+Name|Name)\s*:\s*([A-Za-z][A-Za-z.'-]+\s+[A-Za-z][A-Za-z.'-]+)",
+            text,
+            re.IGNORECASE,
+        )
+        if m:
+            fields["patientName"] = m.group(2).strip()
+
+    if "patientAge" in fields and fields["patientAge"] is None:
+        m = re.search(r"\bAge\s*:\s*(\d{1,3})\b", text, re.IGNORECASE)
+        if m:
+            fields["patientAge"] = int(m.group(1))
+
+    if "patientGender" in fields and not fields["patientGender"]:
+        m = re.search(r"\b(Gender|Sex)\s*:\s*(Male|Female|M|F)\b", text, re.IGNORECASE)
+        if m:
+            v = m.group(2).lower()
+            fields["patientGender"] = "Female" if v.startswith("f") else "Male"
+
+    if "symptomsDate" in fields and not fields["symptomsDate"]:
+        d = _parse_date_any(text)
+        if d:
+            fields["symptomsDate"] = d
+
+    if "reportedSymptoms" in fields and not fields["reportedSymptoms"]:
+        fields["reportedSymptoms"] = _split_symptoms(text)
+
+    if "followUpRequired" in fields and fields["followUpRequired"] is None:
+        b = _parse_bool(text)
+        if b is not None:
+            fields["followUpRequired"] = b
+
+    return fields
+
+
+# ---------------- Generic (schema-agnostic) heuristic extraction utilities -----------------
+
+
+def _generate_field_aliases(field_id: str) -> List[str]:
+    """Generate alias candidates for fuzzy key matching of arbitrary schema field IDs."""
+    base = field_id.strip()
+    aliases = set()
+    simple = re.sub(r"[^A-Za-z0-9]", "", base).lower()
+    if simple:
+        aliases.add(simple)
+    tokens = re.findall(r"[A-Z]?[a-z]+|[0-9]+", base)
+    if not tokens:
+        tokens = [base]
+    tokens_lower = [t.lower() for t in tokens]
+    spaced = " ".join(tokens_lower)
+    aliases.add(spaced)
+    aliases.add("".join(tokens_lower))
+    if spaced.endswith(" id"):
+        aliases.add(spaced[:-3])
+    if spaced.endswith(" date"):
+        aliases.add(spaced[:-5])
+    if "date" in tokens_lower and "birth" in tokens_lower:
+        aliases.add("dob")
+        aliases.add("birth date")
+    if tokens_lower[-1] == "name" and len(tokens_lower) > 1:
+        aliases.add("name")
+    if tokens_lower[-1] == "id" and len(tokens_lower) > 1:
+        aliases.add("id")
+    return list(aliases)
+
+
+def _best_field_match(
+    key_norm: str, field_alias_map: Dict[str, List[str]]
+) -> Optional[str]:
+    best_id = None
+    best_score = 0
+    for fid, aliases in field_alias_map.items():
+        for a in aliases:
+            if not a:
+                continue
+            score = 0
+            if key_norm == a:
+                score = 100
+            elif a in key_norm or key_norm in a:
+                score = 80
+            else:
+                toks_a = set(a.split())
+                toks_k = set(key_norm.split())
+                if toks_a and toks_k:
+                    overlap = len(toks_a & toks_k) / len(toks_a | toks_k)
+                    score = int(overlap * 60)
+            if score > best_score:
+                best_score = score
+                best_id = fid
+    return best_id if best_score >= 40 else None
+
+
+_KV_LINE_RE = re.compile(r"^\s*([A-Za-z0-9 ._/()\-]{1,64})\s*[:=\-]\s*(.+)$")
+
+
+def build_field_tables(form_schema: dict) -> Dict[str, Any]:
+    """Alias, option and field lookup tables used by generic_heuristic_extract.
+
+    These depend only on the schema, so callers that see the same schema repeatedly
+    should build them once and pass them in.
+    """
+    fields_def = form_schema.get("fields", [])
+    alias_map: Dict[str, List[str]] = {
+        f.get("id"): _generate_field_aliases(f.get("id"))
+        for f in fields_def
+        if f.get("id")
+    }
+    options_map: Dict[str, List[str]] = {}
+    for f in fields_def:
+        fid = f.get("id")
+        opts = f.get("options") or []
+        if isinstance(opts, list):
+            options_map[fid] = [str(o) for o in opts]
+    return {
+        "alias_map": alias_map,
+        "options_map": options_map,
+        "fields_by_id": {f.get("id"): f for f in fields_def if f.get("id")},
+    }
+
+
+def generic_heuristic_extract(
+    text: str, form_schema: dict, tables: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Schema-agnostic extraction using fuzzy key:value line parsing."""
+    fields_def = form_schema.get("fields", [])
+    out: Dict[str, Any] = {}
+    for f in fields_def:
+        fid = f.get("id")
+        ftype = (f.get("type") or "").lower()
+        if ftype == "number":
+            out[fid] = None
+        elif ftype == "multiselect":
+            out[fid] = []
+        elif ftype == "boolean":
+            out[fid] = None
+        else:
+            out[fid] = ""
+
+    tables = tables or build_field_tables(form_schema)
+    alias_map: Dict[str, List[str]] = tables["alias_map"]
+    options_map: Dict[str, List[str]] = tables["options_map"]
+    fields_by_id: Dict[str, Dict[str, Any]] = tables["fields_by_id"]
+
+    for raw in (text or "").splitlines():
+        raw = raw.strip()
+        if not raw:
+            continue
+        m = _KV_LINE_RE.match(raw)
+        if not m:
+            continue
+        key_raw, val_raw = m.group(1).strip(), m.group(2).strip()
+        key_norm = re.sub(r"[^a-z0-9 ]", "", key_raw.lower())
+        fid = _best_field_match(key_norm, alias_map)
+        if not fid:
+            continue
+        fdef = fields_by_id.get(fid, {})
+        ftype = (fdef.get("type") or "").lower()
+        if ftype == "number":
+            mnum = re.search(r"\b\d+(?:\.\d+)?\b", val_raw)
+            if mnum:
+                try:
+                    out[fid] = (
+                        float(mnum.group(0))
+                        if "." in mnum.group(0)
+                        else int(mnum.group(0))
+                    )
+                except Exception:
+                    pass
+        elif ftype == "boolean":
+            b = _parse_bool(val_raw)
+            if b is not None:
+                out[fid] = b
+        elif ftype == "date":
+            d = _parse_date_any(val_raw)
+            if d:
+                out[fid] = d
+        elif ftype == "multiselect":
+            parts = [p.strip() for p in re.split(r"[;,]", val_raw) if p.strip()]
+            opts = options_map.get(fid)
+            if opts:
+                norm_opts = {o.lower(): o for o in opts}
+                matched = []
+                for p in parts:
+                    pl = p.lower()
+                    if pl in norm_opts:
+                        matched.append(norm_opts[pl])
+                    else:
+                        for ol, orig in norm_opts.items():
+                            if pl in ol or ol in pl:
+                                matched.append(orig)
+                                break
+                if matched:
+                    out[fid] = matched
+            else:
+                if parts:
+                    out[fid] = parts
+        elif ftype == "select":
+            opts = options_map.get(fid)
+            if opts:
+                vl = val_raw.lower()
+                chosen = None
+                for o in opts:
+                    if o.lower() == vl:
+                        chosen = o
+                        break
+                if not chosen:
+                    for o in opts:
+                        if o.lower() in vl or vl in o.lower():
+                            chosen = o
+                            break
+                out[fid] = chosen if chosen else val_raw
+            else:
+                out[fid] = val_raw
+        else:
+            out[fid] = val_raw
+    return out
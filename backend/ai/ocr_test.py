@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path
 import json
@@ -26,7 +27,7 @@ if not img_path.exists():
 
 img_bytes = img_path.read_bytes()
 provider = OpenAIProvider(api_key=API_KEY, model=MODEL)
-res = provider.process_image(img_bytes, img_path.name)
+res = asyncio.run(provider.process_image(img_bytes, img_path.name))
 
 if isinstance(res, dict) and res.get("_error"):
     print("Provider error:", res["_error"])
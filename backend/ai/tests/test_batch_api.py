@@ -0,0 +1,125 @@
+import asyncio
+
+from app.services.batch_api import BatchStore, DeferredExtractor, LocalBatchBackend
+
+
+class FakeProvider:
+    model = "fake-model"
+
+    async def complete(self, prompt, images=None, ocr_blocks=None, locale=None, model=None, instructions=None):
+        if "RAISE" in prompt:
+            raise RuntimeError("provider down")
+        return '{"patientName": "Jane"}', {"prompt_tokens": 10, "completion_tokens": 5, "model": model}
+
+
+def _extractor(finalize=None, **kwargs):
+    backend = LocalBatchBackend({"fake": FakeProvider()})
+    finalize = finalize or (lambda item, output: {"content": output["content"], "id": item.payload["id"]})
+    return DeferredExtractor(BatchStore(), backend, finalize, **kwargs)
+
+
+def _enqueue(extractor, n, prompt="SOURCE TEXT: x"):
+    return [extractor.enqueue("fake", "fake-model", "instructions", prompt, {"id": i}) for i in range(n)]
+
+
+async def _settle(backend):
+    await asyncio.gather(*backend._tasks.values(), return_exceptions=True)
+
+
+def test_flush_by_size_leaves_the_remainder_pending():
+    async def run():
+        extractor = _extractor(max_per_file=2, flush_seconds=3600)
+        _enqueue(extractor, 3)
+        submitted = await extractor.flush()
+        assert len(submitted) == 1
+        assert extractor.store.stats()["items"] == {"submitted": 2, "pending": 1}
+        await _settle(extractor.backend)
+
+    asyncio.run(run())
+
+
+def test_flush_by_age():
+    async def run():
+        extractor = _extractor(max_per_file=100, flush_seconds=3600)
+        _enqueue(extractor, 2)
+        assert await extractor.flush() == []
+        extractor.flush_seconds = 0
+        assert len(await extractor.flush()) == 1
+        assert extractor.store.stats()["items"] == {"submitted": 2}
+        await _settle(extractor.backend)
+
+    asyncio.run(run())
+
+
+def test_reconcile_completed_batch():
+    async def run():
+        extractor = _extractor(flush_seconds=0)
+        ok, bad = _enqueue(extractor, 1) + _enqueue(extractor, 1, prompt="RAISE")
+        await extractor.flush()
+        await _settle(extractor.backend)
+        assert await extractor.reconcile() == 2
+        done = extractor.store.get(ok.custom_id)
+        assert done.status == "completed"
+        assert done.result == {"content": '{"patientName": "Jane"}', "id": 0}
+        failed = extractor.store.get(bad.custom_id)
+        # A per-item error is final; only whole-batch failures are retried
+        assert failed.status == "failed" and "provider down" in failed.error
+        assert extractor.store.stats()["batches"] == {"completed": 1}
+
+    asyncio.run(run())
+
+
+def test_expired_batch_is_requeued_until_max_attempts():
+    async def run():
+        extractor = _extractor(flush_seconds=0, max_attempts=2)
+        (item,) = _enqueue(extractor, 1)
+        for attempt in (1, 2):
+            await extractor.flush()
+            await _settle(extractor.backend)
+            # A restart loses the in-process batches; they then poll as "expired"
+            extractor.backend._tasks.clear()
+            await extractor.reconcile()
+            item = extractor.store.get(item.custom_id)
+            assert item.attempts == attempt
+        assert item.status == "failed"
+        assert item.error == "batch expired"
+        assert await extractor.flush() == []
+
+    asyncio.run(run())
+
+
+def test_failed_batch_is_requeued():
+    async def run():
+        extractor = _extractor(flush_seconds=0, max_attempts=2)
+        (item,) = _enqueue(extractor, 1)
+        await extractor.flush()
+        await _settle(extractor.backend)
+
+        async def failed(batch_id, provider):
+            return "failed"
+
+        extractor.backend.poll = failed
+        await extractor.reconcile()
+        item = extractor.store.get(item.custom_id)
+        assert (item.status, item.batch_id, item.attempts) == ("pending", None, 1)
+        assert extractor.store.stats()["batches"] == {"failed": 1}
+
+    asyncio.run(run())
+
+
+def test_finalizer_error_fails_the_item():
+    def finalize(item, output):
+        raise ValueError("bad output")
+
+    async def run():
+        extractor = _extractor(finalize, flush_seconds=0)
+        (item,) = _enqueue(extractor, 1)
+        await extractor.flush()
+        await _settle(extractor.backend)
+        await extractor.reconcile()
+        item = extractor.store.get(item.custom_id)
+        assert item.status == "failed"
+        assert item.error == "ValueError: bad output"
+        assert item.result is None
+
+    asyncio.run(run())
@@ -0,0 +1,108 @@
+from app.services.row_chunking import SeamMerger, merge_chunk_rows, merge_page_rows, split_rows
+from app.services.schema_compiler import compile_schema
+
+SCHEMA = {
+    "fields": [
+        {"id": "patientName", "type": "text", "label": "Name", "required": True},
+        {"id": "sex", "type": "text", "label": "Sex"},
+        {"id": "diagnosis", "type": "text", "label": "Diagnosis"},
+    ]
+}
+
+
+def test_dictated_transcript_does_not_repeat_first_sentence():
+    transcript = " ".join(
+        [
+            "Patient Amina Bello is female and came with fever.",
+            "Next is Chidi Okafor, male, with malaria.",
+            "Then Ngozi Eze, female, with typhoid.",
+            "Finally Musa Ali, male, with a cough.",
+        ]
+        * 3
+    )
+    chunks = split_rows(transcript, 120, 0, compile_schema(SCHEMA).alias_map)
+    assert len(chunks) > 2
+    assert sum(c.count("Amina Bello") for c in chunks) == 3
+    assert "Amina Bello" not in chunks[1]
+
+
+def test_heading_line_is_repeated_in_every_chunk():
+    rows = ["Name | Sex | Diagnosis"] + [f"Patient {chr(65 + i)} | F | Malaria" for i in range(12)]
+    chunks = split_rows("\n".join(rows), 80, 0, compile_schema(SCHEMA).alias_map)
+    assert len(chunks) > 1
+    assert all(c.splitlines()[0] == "Name | Sex | Diagnosis" for c in chunks)
+
+
+def test_data_row_without_figures_is_not_a_heading():
+    rows = ["Amina Bello | F | Malaria"] + [f"Patient {chr(65 + i)} | M | Fever" for i in range(12)]
+    chunks = split_rows("\n".join(rows), 80, 0, compile_schema(SCHEMA).alias_map)
+    assert len(chunks) > 1
+    assert sum(c.count("Amina Bello") for c in chunks) == 1
+
+
+FIELDS = ["patientName", "sex", "diagnosis"]
+
+
+def test_seam_duplicates_are_folded_into_the_earlier_row():
+    chunk_rows = [
+        [{"patientName": "Amina Bello", "sex": "F"}, {"patientName": "Chidi Okafor", "sex": "M", "diagnosis": None}],
+        # The overlap repeats Chidi (now with a diagnosis) before the new rows
+        [{"patientName": "Chidi Okafor", "sex": "M", "diagnosis": "Malaria"}, {"patientName": "Ngozi Eze", "sex": "F"}],
+    ]
+    rows = merge_chunk_rows(chunk_rows, FIELDS, window=2)
+    assert [r["patientName"] for r in rows] == ["Amina Bello", "Chidi Okafor", "Ngozi Eze"]
+    assert rows[1]["diagnosis"] == "Malaria"
+
+
+def test_repeated_records_away_from_seams_are_kept():
+    visit = {"patientName": "Musa Ali", "sex": "M", "diagnosis": "Cough"}
+    chunk_rows = [
+        [dict(visit), {"patientName": "A", "sex": "F"}, {"patientName": "B", "sex": "F"}],
+        [{"patientName": "C", "sex": "M"}, {"patientName": "D", "sex": "M"}, dict(visit)],
+    ]
+    rows = merge_chunk_rows(chunk_rows, FIELDS, window=2)
+    assert [r["patientName"] for r in rows] == ["Musa Ali", "A", "B", "C", "D", "Musa Ali"]
+
+
+def test_sparse_rows_sharing_one_value_are_not_merged():
+    chunk_rows = [[{"patientName": "Amina Bello", "sex": "F"}], [{"sex": "F"}]]
+    assert len(merge_chunk_rows(chunk_rows, FIELDS, window=2)) == 2
+
+
+def test_seam_merger_reports_appended_and_folded_rows():
+    merger = SeamMerger(FIELDS, window=1)
+    merger.next_chunk()
+    assert merger.add({"patientName": "Amina Bello", "sex": "F"})
+    merger.next_chunk()
+    assert not merger.add({"patientName": "amina  bello", "sex": "F", "diagnosis": "Fever"})
+    assert merger.add({"patientName": "Chidi Okafor", "sex": "M"})
+    assert merger.rows == [
+        {"patientName": "Amina Bello", "sex": "F", "diagnosis": "Fever"},
+        {"patientName": "Chidi Okafor", "sex": "M"},
+    ]
+
+
+def test_row_truncated_to_its_name_at_a_seam_is_merged():
+    chunk_rows = [[{"patientName": "Amina Bello"}], [{"patientName": "Amina Bello", "sex": "F", "diagnosis": "Fever"}]]
+    rows = merge_chunk_rows(chunk_rows, FIELDS, window=2)
+    assert rows == [{"patientName": "Amina Bello", "sex": "F", "diagnosis": "Fever"}]
+
+
+def test_merge_page_rows_drops_headings_and_stitches_continuations():
+    compiled = compile_schema(SCHEMA)
+    pages = [
+        [
+            {"patientName": "Name", "sex": "Sex", "diagnosis": "Diagnosis"},
+            {"patientName": "Amina Bello", "sex": "F", "diagnosis": "Malaria"},
+            {"patientName": "Chidi Okafor", "sex": "M"},
+        ],
+        [
+            {"patientName": "Name", "sex": "Sex", "diagnosis": "Diagnosis"},
+            {"diagnosis": "Typhoid"},
+            {"patientName": "Ngozi Eze", "sex": "F", "diagnosis": "Fever"},
+        ],
+    ]
+    merged, counts = merge_page_rows(pages, FIELDS, ["patientName", "diagnosis"], compiled.alias_map)
+    assert counts == {"heading_rows": 2, "stitched_rows": 1}
+    assert [(page, row["patientName"]) for page, row in merged] == [(0, "Amina Bello"), (0, "Chidi Okafor"), (1, "Ngozi Eze")]
+    assert merged[1][1] == {"patientName": "Chidi Okafor", "sex": "M", "diagnosis": "Typhoid"}